@@ -11,7 +11,8 @@ from fastapi import FastAPI, Depends, Header, HTTPException
 from fastapi.responses import JSONResponse, FileResponse
 from fastapi.staticfiles import StaticFiles
 from pathlib import Path
-from src.infra.database import init_db
+from contextlib import asynccontextmanager
+from src.infra.database import init_db, engine
 from src.core.config import settings
 from src.core import processor as logic
 
@@ -21,11 +22,29 @@ STATIC_DIR = Path(__file__).parent.parent / "static"
 # --- Initialize Database ---
 init_db()
 
+# --- ♻️ Lifecycle ---
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Startup: プロンプト・モデル変更で使われなくなったキャッシュをバックグラウンドで回収
+    if settings.CACHE_RECLAIM_ON_STARTUP:
+        core_processor.cache_manager.schedule_reclaim(engine)
+    # 期限切れの一括削除と人気エントリの先回り再生成
+    if settings.CACHE_MAINTENANCE_ENABLED:
+        core_processor.maintainer.start()
+    yield
+    # Shutdown: 保守・先読みワーカーを止め、未完了のキャッシュ書き込みと貯めた参照時刻を書き切る
+    await core_processor.maintainer.stop()
+    await core_processor.prefetcher.stop()
+    await core_processor.cache_manager.flush_writes()
+    core_processor.cache_manager.flush_touches()
+
+
 # --- Create FastAPI App ---
 app = FastAPI(
     title="Flow AI v4.0",
     description="Pre-processing × Speed - The Seasoning Update",
-    version="4.0.0"
+    version="4.0.0",
+    lifespan=lifespan,
 )
 
 # --- 🔐 認証ミドルウェア ---
@@ -71,6 +90,7 @@ from src.api.routes import (
     health_router,
     core_router,
     safety_router,
+    prefetch_router,
     features_router,
     vision_router,
     legacy_router,
@@ -93,6 +113,7 @@ set_sync_processor(core_processor)
 app.include_router(health_router)
 app.include_router(core_router, dependencies=[Depends(verify_token)])
 app.include_router(safety_router)  # No auth for scan
+app.include_router(prefetch_router, dependencies=[Depends(verify_token)])  # 先読みは API 枠を使うので認証必須
 app.include_router(features_router, dependencies=[Depends(verify_token)])
 app.include_router(vision_router, dependencies=[Depends(verify_token)])
 app.include_router(audit_router, dependencies=[Depends(verify_token)])
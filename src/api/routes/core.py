@@ -1,7 +1,7 @@
 """
 Core Processing Routes - Main text processing endpoints
 """
-from fastapi import APIRouter, Depends, HTTPException, Header, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, Header, BackgroundTasks, Request
 from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from src.infra.database import get_db, SessionLocal
@@ -9,10 +9,21 @@ from src.core.models import TextRequest
 from src.core.config import settings
 from src.core import processor as logic
 from src.core.seasoning import SeasoningManager
+from src.core.cache import CacheManager
+from src.core.snapshot import CONFLICT_NEWER, CONFLICT_POLICIES, SnapshotError, import_snapshot, iter_snapshot
+from datetime import datetime
 from typing import Optional
+import asyncio
+import logging
+import tempfile
+
+logger = logging.getLogger("api_core")
 
 router = APIRouter(tags=["Core"])
 
+# スナップショットのアップロードはこれを超えたらディスクに逃がす
+SNAPSHOT_SPOOL_BYTES = 1024 * 1024
+
 # Reference to core processor (will be set by main.py)
 core_processor: Optional[logic.CoreProcessor] = None
 
@@ -49,7 +60,7 @@ async def process_text(req: TextRequest, db: Session = Depends(get_db)):
     if "error" in result:
         if result["error"] in ["blocked", "safety_blocked"]:
             raise HTTPException(status_code=400, detail=result)
-        elif result["error"] == "api_not_configured":
+        elif result["error"] in ["api_not_configured", "circuit_open"]:
             raise HTTPException(status_code=503, detail=result)
         else:
             raise HTTPException(status_code=500, detail=result)
@@ -59,15 +70,24 @@ async def process_text(req: TextRequest, db: Session = Depends(get_db)):
 
 # --- 🌊 ストリーミング ---
 @router.post("/process/stream")
-async def process_text_stream(req: TextRequest):
+async def process_text_stream(req: TextRequest, request: Request):
     """リアルタイム整形（ストリーミング）"""
     system_prompt = SeasoningManager.get_system_prompt(req.seasoning)
     config = {"system": system_prompt, "params": {"temperature": 0.3}}
     
-    def event_generator():
-        for chunk in logic.execute_gemini_stream(req.text, config):
-            yield f"data: {chunk}\n\n"
-        yield "data: [DONE]\n\n"
+    async def event_generator():
+        # client.aio 経由: スレッドプールを使わない
+        stream = logic.execute_gemini_stream_async(req.text, config)
+        try:
+            async for chunk in stream:
+                # クライアント切断後は上流を読み続けない（クォータ節約）
+                if await request.is_disconnected():
+                    logger.info("🔌 Stream client disconnected. Cancelling upstream.")
+                    return
+                yield f"data: {chunk}\n\n"
+            yield "data: [DONE]\n\n"
+        finally:
+            await stream.aclose()
 
     return StreamingResponse(event_generator(), media_type="text/event-stream")
 
@@ -99,6 +119,73 @@ def process_text_async(req: TextRequest, bg_tasks: BackgroundTasks, db: Session
     }
 
 
+@router.get("/cache/stats", tags=["Performance"])
+def get_cache_stats():
+    """L1キャッシュのヒット率、先読みキュー・追い出し方針・保守タスクの状況など"""
+    if not core_processor:
+        raise HTTPException(status_code=500, detail="Processor not initialized")
+    return {
+        "l1": core_processor.cache_manager.l1.stats(),
+        "prefetch": core_processor.prefetcher.stats(),
+        "eviction": core_processor.cache_manager.policy.stats(),
+        "maintenance": core_processor.maintainer.stats(),
+    }
+
+
+# --- 📦 キャッシュのスナップショット ---
+@router.get("/cache/snapshot", tags=["Performance"])
+def export_cache_snapshot(all_fingerprints: bool = False):
+    """キャッシュをスナップショット (gzip JSON Lines) として書き出す。既定は現在の構成指紋の行のみ"""
+    fingerprint = None if all_fingerprints else CacheManager.current_fingerprint()
+
+    def stream():
+        db = SessionLocal()
+        try:
+            yield from iter_snapshot(db, fingerprint=fingerprint)
+        finally:
+            db.close()
+
+    filename = f"flow-cache-{datetime.utcnow():%Y%m%d-%H%M%S}.jsonl.gz"
+    return StreamingResponse(
+        stream(),
+        media_type="application/gzip",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@router.post("/cache/snapshot", tags=["Performance"])
+async def import_cache_snapshot(request: Request, on_conflict: str = CONFLICT_NEWER, all_fingerprints: bool = False):
+    """
+    スナップショットを取り込む (本文は GET /cache/snapshot で得た gzip をそのまま送る)
+    本文は一時ファイルに受けてから1行ずつ取り込む
+    """
+    if not core_processor:
+        raise HTTPException(status_code=500, detail="Processor not initialized")
+    if on_conflict not in CONFLICT_POLICIES:
+        raise HTTPException(status_code=400, detail=f"on_conflict must be one of {CONFLICT_POLICIES}")
+
+    spool = tempfile.SpooledTemporaryFile(max_size=SNAPSHOT_SPOOL_BYTES)
+    async for chunk in request.stream():
+        spool.write(chunk)
+    spool.seek(0)
+
+    def run():
+        db = SessionLocal()
+        try:
+            return import_snapshot(
+                db, core_processor.cache_manager, spool,
+                on_conflict=on_conflict, all_fingerprints=all_fingerprints,
+            )
+        finally:
+            db.close()
+            spool.close()
+
+    try:
+        return await asyncio.to_thread(run)
+    except SnapshotError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 @router.get("/jobs/{job_id}", tags=["Performance"])
 def get_job_status(job_id: str, db: Session = Depends(get_db)):
     """ジョブの状態確認"""
@@ -1,10 +1,11 @@
 """
 P2 Features Routes - Analysis, History, Diff
 """
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy.orm import Session
 from datetime import datetime
 from src.infra.database import get_db
+from src.core.config import settings
 from src.core.models import TextRequest, DiffResponse, ContextMode
 from src.core import processor as logic
 from typing import List, Dict, Any, Optional
@@ -78,8 +79,11 @@ _clipboard_history: List[Dict[str, Any]] = []
 
 
 @router.post("/history/add")
-def add_to_history(req: TextRequest):
-    """クリップボード履歴に追加"""
+async def add_to_history(req: TextRequest, request: Request):
+    """
+    クリップボード履歴に追加
+    SPECULATIVE_PREFETCH=True なら、続く /process に備えて低優先度で先読みする
+    """
     item = {
         "text": req.text[:MAX_TEXT_LENGTH_HISTORY],
         "timestamp": datetime.utcnow().isoformat(),
@@ -90,8 +94,13 @@ def add_to_history(req: TextRequest):
     _clipboard_history.insert(0, item)
     if len(_clipboard_history) > MAX_HISTORY_SIZE:
         _clipboard_history.pop()
+
+    speculative = False
+    if settings.SPECULATIVE_PREFETCH and core_processor:
+        user_id = request.client.host if request.client else "anonymous"
+        speculative = core_processor.prefetcher.submit_speculative(req.text, req.seasoning, user_id)
     
-    return {"status": "added", "history_size": len(_clipboard_history)}
+    return {"status": "added", "history_size": len(_clipboard_history), "speculative": speculative}
 
 
 @router.get("/history")
@@ -44,15 +44,24 @@ def detailed_health_check():
     else:
         checks["gemini"] = "not_configured"
     
+    # Gemini サーキットブレーカー
+    from src.core.breaker import get_circuit_breaker, STATE_CLOSED
+    circuit = get_circuit_breaker().snapshot()
+    checks["gemini_circuit"] = "ok" if circuit["state"] == STATE_CLOSED else circuit["state"]
+
     # 総合ステータス
     all_ok = all(v in ["ok", "configured"] for v in checks.values())
     
+    from src.core.limiter import get_limiter
+
     return {
         "status": "running" if all_ok else "degraded",
         "version": "4.0.0",
         "timestamp": datetime.utcnow().isoformat(),
         "auth_enabled": bool(settings.API_TOKEN),
-        "checks": checks
+        "checks": checks,
+        "gemini_circuit": circuit,
+        "gemini_limiter": get_limiter().stats()
     }
 
 
@@ -1,15 +1,16 @@
 """
 Safety & Background Routes - PII Scan, Prefetch
 """
-from fastapi import APIRouter, Depends, BackgroundTasks
+from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
 from src.infra.database import get_db
-from src.core.models import TextRequest, PrefetchRequest, ScanResponse, PrefetchCache
+from src.core.models import TextRequest, PrefetchRequest, ScanResponse
 from src.core import processor as logic
-import asyncio
 from typing import Optional
 
 router = APIRouter()
+# 先読みは Gemini を呼ぶので認証付きで載せる (main.py で verify_token を付ける)
+prefetch_router = APIRouter()
 
 # Reference to core processor (will be set by main.py)
 core_processor: Optional[logic.CoreProcessor] = None
@@ -34,18 +35,20 @@ def scan_text(req: TextRequest):
 
 
 # --- 🚀 先読み ---
-@router.post("/prefetch", tags=["Background"])
-async def trigger_prefetch(req: PrefetchRequest, bg_tasks: BackgroundTasks, db: Session = Depends(get_db)):
-    """スイッチON時のみ呼ばれる先読み"""
+@prefetch_router.post("/prefetch", tags=["Background"])
+async def trigger_prefetch(req: PrefetchRequest):
+    """スイッチON時のみ呼ばれる先読み（キューに積んで即応答）"""
+    queued = 0
     if core_processor:
-        bg_tasks.add_task(asyncio.create_task, core_processor.run_prefetch(req.text, req.target_seasoning_levels, db))
-    return {"status": "accepted", "hash": logic.get_text_hash(req.text)}
+        queued = await core_processor.run_prefetch(req.text, req.target_seasoning_levels)
+    return {"status": "accepted", "hash": logic.get_text_hash(req.text), "queued": queued}
 
 
-@router.get("/prefetch/{text_hash}", tags=["Background"])
+@prefetch_router.get("/prefetch/{text_hash}", tags=["Background"])
 def get_prefetch_result(text_hash: str, db: Session = Depends(get_db)):
-    """先読み結果取得（認証不要）"""
-    cache = db.query(PrefetchCache).filter(PrefetchCache.hash_id == text_hash).first()
-    if not cache:
-        return {"status": "not_found", "results": {}}
-    return {"status": "found", "results": cache.results}
+    """先読み結果取得"""
+    results = logic.CacheManager.get_results(db, text_hash)
+    pending = bool(core_processor and core_processor.prefetcher.is_pending(text_hash))
+    if not results:
+        return {"status": "pending" if pending else "not_found", "results": {}}
+    return {"status": "found", "results": results, "pending": pending}
@@ -82,7 +82,7 @@ async def process_pending_jobs(
     if _core_processor is None:
         raise HTTPException(status_code=500, detail="CoreProcessor is not initialized")
     
-    stats = mgr.process_pending(db, _core_processor, limit)
+    stats = await mgr.process_pending(db, _core_processor, limit)
     return ProcessResponse(**stats)
 
 
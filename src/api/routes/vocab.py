@@ -1,13 +1,34 @@
 """
 Vocabulary API Router - カスタム語彙管理
 """
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
+from datetime import datetime
 from typing import Optional
-from src.core.vocab_store import get_vocab_store
+import asyncio
+import io
+import tempfile
+from src.core.vocab_store import VOCAB_FORMATS, get_vocab_store
 
 router = APIRouter(prefix="/vocab", tags=["vocabulary"])
 
+# インポートの本文はこれを超えたらディスクに逃がす
+VOCAB_SPOOL_BYTES = 1024 * 1024
+
+EXPORT_MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "jsonl": "application/x-ndjson",
+}
+
+
+def _check_format(fmt: str) -> None:
+    if fmt not in VOCAB_FORMATS:
+        raise HTTPException(
+            status_code=400,
+            detail={"error": "bad_format", "message": f"format は {', '.join(VOCAB_FORMATS)} のいずれかです"}
+        )
+
 
 # --- Request/Response Models ---
 class VocabAddRequest(BaseModel):
@@ -78,17 +99,74 @@ async def remove_vocab(term: str):
         )
 
 
+@router.get("/export")
+def export_vocab(fmt: str = Query("csv", alias="format")):
+    """
+    全語彙を CSV / JSON Lines で書き出す (ストリーミング)
+    """
+    _check_format(fmt)
+    store = get_vocab_store()
+    filename = f"flow-vocab-{datetime.utcnow():%Y%m%d-%H%M%S}.{fmt}"
+    return StreamingResponse(
+        (chunk.encode("utf-8") for chunk in store.iter_export(fmt)),
+        media_type=EXPORT_MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@router.post("/import")
+async def import_vocab(request: Request, fmt: str = Query("csv", alias="format"), category: str = "custom"):
+    """
+    CSV / JSON Lines の語彙リストをまとめて追加
+    
+    本文は一時ファイルに受けてから、まとまった件数ごとに1トランザクションで登録する
+    """
+    _check_format(fmt)
+    store = get_vocab_store()
+
+    spool = tempfile.SpooledTemporaryFile(max_size=VOCAB_SPOOL_BYTES)
+    async for chunk in request.stream():
+        spool.write(chunk)
+    spool.seek(0)
+
+    def run():
+        with io.TextIOWrapper(spool, encoding="utf-8-sig", newline="") as text:
+            return store.import_terms(text, fmt, category=category)
+
+    try:
+        stats = await asyncio.to_thread(run)
+    except UnicodeDecodeError:
+        raise HTTPException(
+            status_code=400,
+            detail={"error": "bad_encoding", "message": "本文は UTF-8 で送ってください"}
+        )
+    return VocabResponse(
+        success=True,
+        message=f"{stats['added']}語を追加しました",
+        data=stats
+    )
+
+
 @router.get("/search")
-async def search_vocab(q: str, limit: int = 10):
+async def search_vocab(q: str, limit: int = 10, cursor: Optional[str] = None):
     """
-    語彙を検索（部分一致）
+    語彙を検索（部分一致・関連度順）
+    
+    次のページは応答の next_cursor を cursor に渡して取得する
     """
     store = get_vocab_store()
-    results = store.search(q, limit=limit)
+    try:
+        page = store.search_page(q, limit=limit, cursor=cursor)
+    except ValueError:
+        raise HTTPException(
+            status_code=400,
+            detail={"error": "bad_cursor", "message": "cursor が不正です"}
+        )
     return {
         "query": q,
-        "count": len(results),
-        "items": results
+        "count": len(page["items"]),
+        "items": page["items"],
+        "next_cursor": page["next_cursor"]
     }
 
 
@@ -0,0 +1,157 @@
+"""
+Aho-Corasick Module - 多数の語を1回の走査で探すオートマトン
+
+責務:
+- 語の追加・削除 (トライへの差分反映。失敗リンクは次の検索の前に張り直す)
+- テキストを1回なめて、重ならない最左最長一致を返す
+
+比喩: 2万語の名簿を1語ずつ照合するのではなく、文字を1つ読むたびに
+「ここまでで名簿のどの語の途中にいるか」を1つの状態として持ち続ける。
+
+注意: Termux 環境のため純 Python で実装する。大文字小文字は区別する (従来の `term in text` と同じ)。
+"""
+import threading
+from collections import deque
+from typing import Iterable
+
+
+class AhoCorasick:
+    """
+    語の集合から作る Aho-Corasick オートマトン
+
+    ノードは番号で管理し、遷移 (_goto)・失敗リンク (_fail)・ノードで終わる語の長さ (_out)・
+    失敗リンクを辿って最初に出会う語の終わり (_dict) を並列の配列で持つ。
+    """
+
+    def __init__(self, terms: Iterable[str] = ()):
+        self._goto: list[dict[str, int]] = [{}]
+        self._fail: list[int] = [0]
+        self._out: list[int] = [0]
+        self._dict: list[int] = [0]
+        self._terms: set[str] = set()
+        self._dirty = False
+        self._lock = threading.Lock()
+        self.add_many(terms)
+
+    def __len__(self) -> int:
+        return len(self._terms)
+
+    def __contains__(self, term: str) -> bool:
+        return term in self._terms
+
+    def add(self, term: str) -> bool:
+        """語を追加する (登録済み・空文字なら False)"""
+        with self._lock:
+            return self._add_locked(term)
+
+    def add_many(self, terms: Iterable[str]) -> int:
+        with self._lock:
+            return sum(1 for term in terms if self._add_locked(term))
+
+    def _add_locked(self, term: str) -> bool:
+        if not term or term in self._terms:
+            return False
+        node = 0
+        for ch in term:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(0)
+                self._dict.append(0)
+                self._goto[node][ch] = nxt
+            node = nxt
+        self._out[node] = len(term)
+        self._terms.add(term)
+        self._dirty = True
+        return True
+
+    def remove(self, term: str) -> bool:
+        """語を削除する (トライのノードは残し、語の終わりの印だけ消す)"""
+        with self._lock:
+            if term not in self._terms:
+                return False
+            node = 0
+            for ch in term:
+                node = self._goto[node][ch]
+            self._out[node] = 0
+            self._terms.discard(term)
+            self._dirty = True
+            return True
+
+    def _build_links(self) -> None:
+        """失敗リンクと出力リンクを幅優先で張り直す (ノード数に比例)"""
+        goto, fail, out, dict_link = self._goto, self._fail, self._out, self._dict
+        fail[0] = dict_link[0] = 0
+        queue = deque()
+        for child in goto[0].values():
+            fail[child] = 0
+            dict_link[child] = 0
+            queue.append(child)
+        while queue:
+            node = queue.popleft()
+            for ch, child in goto[node].items():
+                state = fail[node]
+                while state and ch not in goto[state]:
+                    state = fail[state]
+                target = goto[state].get(ch, 0)
+                fail[child] = target if target != child else 0
+                dict_link[child] = fail[child] if out[fail[child]] else dict_link[fail[child]]
+                queue.append(child)
+        self._dirty = False
+
+    def tables(self) -> tuple[list[int], list[int], list[int], list[list[tuple[int, int]]]]:
+        """
+        コンパイル用に内部表を書き出す (vocab_index.compile_index が使う)
+
+        Returns:
+            tuple: (fail, out, dict, children) children はノードごとの [(文字コード, 遷移先)] 文字コード順
+        """
+        with self._lock:
+            if self._dirty:
+                self._build_links()
+            children = [sorted((ord(ch), child) for ch, child in edges.items()) for edges in self._goto]
+            return list(self._fail), list(self._out), list(self._dict), children
+
+    def find_spans(self, text: str) -> list[tuple[int, int, str]]:
+        """
+        重ならない最左最長一致
+
+        Returns:
+            list: [(start, end, term)] 左から順
+        """
+        if not text or not self._terms:
+            return []
+        with self._lock:
+            if self._dirty:
+                self._build_links()
+            goto, fail, out, dict_link = self._goto, self._fail, self._out, self._dict
+            # 開始位置ごとの最長一致の長さ
+            longest: dict[int, int] = {}
+            state = 0
+            for i, ch in enumerate(text):
+                while state and ch not in goto[state]:
+                    state = fail[state]
+                state = goto[state].get(ch, 0)
+                node = state if out[state] else dict_link[state]
+                while node:
+                    length = out[node]
+                    start = i - length + 1
+                    if length > longest.get(start, 0):
+                        longest[start] = length
+                    node = dict_link[node]
+
+        spans = []
+        pos = 0
+        for start in sorted(longest):
+            if start < pos:
+                continue
+            end = start + longest[start]
+            spans.append((start, end, text[start:end]))
+            pos = end
+        return spans
+
+    def find_terms(self, text: str) -> list[str]:
+        """テキストに現れる語 (重複なし・出現順)"""
+        return list(dict.fromkeys(term for _, _, term in self.find_spans(text)))
@@ -0,0 +1,143 @@
+"""
+Micro-batching Module - 短文リクエストのまとめ送り
+
+責務:
+- 同じ設定 (モデル・システムプロンプト・温度) の短文を数ミリ秒だけ溜める
+- まとめて1回の構造化プロンプト (JSON配列) で送り、結果を呼び出し元ごとに配る
+- まとめ送りに失敗したら個別呼び出しにフォールバックする (上流障害による失敗なら送り直さない)
+
+比喩: 同じ行き先の乗客を数秒待って乗り合いタクシーにする。
+"""
+import asyncio
+import logging
+from typing import Awaitable, Callable, Hashable, Optional
+
+from .config import settings
+
+logger = logging.getLogger("core_batcher")
+
+
+class _Pending:
+    """溜まっているリクエスト群 (1グループ分)"""
+
+    def __init__(self, config: dict, model: str):
+        self.config = config
+        self.model = model
+        self.items: list[tuple[str, asyncio.Future]] = []
+        self.timer: Optional[asyncio.TimerHandle] = None
+
+
+class MicroBatcher:
+    """
+    短文リクエストのマイクロバッチャー
+
+    Args:
+        send_batch: (texts, config, model) -> {"success", "results", ...}
+        send_one: (text, config, model) -> generate_content と同じ形式の dict
+        send_fallback: まとめ送り失敗時の個別呼び出し (省略時は send_one)
+    """
+
+    def __init__(
+        self,
+        send_batch: Callable[[list[str], dict, str], Awaitable[dict]],
+        send_one: Callable[[str, dict, str], Awaitable[dict]],
+        window_ms: int = None,
+        max_batch: int = None,
+        send_fallback: Callable[[str, dict, str], Awaitable[dict]] = None,
+    ):
+        self._send_batch = send_batch
+        self._send_one = send_one
+        self._send_fallback = send_fallback or send_one
+        self.window = (settings.MICRO_BATCH_WINDOW_MS if window_ms is None else window_ms) / 1000
+        self.max_batch = settings.MICRO_BATCH_MAX_ITEMS if max_batch is None else max_batch
+        self._groups: dict[Hashable, _Pending] = {}
+        self._tasks: set[asyncio.Task] = set()
+        self.batches_sent = 0
+        self.fallbacks = 0
+
+    async def submit(self, text: str, config: dict, model: str) -> dict:
+        key = (model, config["system"], config["params"].get("temperature", 0.3))
+        loop = asyncio.get_running_loop()
+        group = self._groups.get(key)
+        if group is None:
+            group = self._groups[key] = _Pending(config, model)
+            group.timer = loop.call_later(self.window, self._flush, key)
+
+        fut = loop.create_future()
+        group.items.append((text, fut))
+        if len(group.items) >= self.max_batch:
+            self._flush(key)
+        return await fut
+
+    def _flush(self, key: Hashable) -> None:
+        group = self._groups.pop(key, None)
+        if group is None:
+            return
+        if group.timer is not None:
+            group.timer.cancel()
+        # 待ち切れずにキャンセルされた呼び出し元は除く
+        items = [(text, fut) for text, fut in group.items if not fut.done()]
+        if not items:
+            return
+        task = asyncio.get_running_loop().create_task(self._run(group, items))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, group: _Pending, items: list[tuple[str, asyncio.Future]]) -> None:
+        try:
+            if len(items) == 1:
+                text, fut = items[0]
+                _resolve(fut, await self._send_one(text, group.config, group.model))
+                return
+
+            texts = [text for text, _ in items]
+            batch = await self._send_batch(texts, group.config, group.model)
+            if batch.get("success"):
+                self.batches_sent += 1
+                for (_, fut), result in zip(items, batch["results"]):
+                    _resolve(fut, {"success": True, "result": result, "error": None, "blocked_reason": None})
+                return
+
+            # 上流障害で失敗した: N件に分けて送り直しても同じく失敗するだけなので、そのまま返す
+            if not batch.get("fallback", True):
+                logger.warning(f"📦 Batch of {len(items)} failed ({batch.get('error')}). Upstream unavailable, not retrying.")
+                for _, fut in items:
+                    _resolve(fut, {
+                        "success": False,
+                        "result": "",
+                        "error": batch.get("error"),
+                        "blocked_reason": batch.get("blocked_reason"),
+                    })
+                return
+
+            # まとめ送り失敗: 個別に送り直す
+            self.fallbacks += 1
+            logger.warning(f"📦 Batch of {len(items)} failed ({batch.get('error')}). Falling back to single calls.")
+            results = await asyncio.gather(
+                *[self._send_fallback(text, group.config, group.model) for text in texts],
+                return_exceptions=True,
+            )
+            for (_, fut), result in zip(items, results):
+                if isinstance(result, BaseException):
+                    _reject(fut, result)
+                else:
+                    _resolve(fut, result)
+        except BaseException as e:
+            for _, fut in items:
+                _reject(fut, e)
+            if not isinstance(e, Exception):
+                raise
+
+
+def _resolve(fut: asyncio.Future, value) -> None:
+    if not fut.done():
+        fut.set_result(value)
+
+
+def _reject(fut: asyncio.Future, exc: BaseException) -> None:
+    if fut.done():
+        return
+    if isinstance(exc, Exception):
+        fut.set_exception(exc)
+    else:
+        fut.cancel()
@@ -0,0 +1,118 @@
+"""
+Circuit Breaker Module - Gemini API 障害時の早期遮断
+
+責務: 連続失敗を検知して上流呼び出しを止め、一定時間後に試験的に再開する
+
+状態:
+- closed: 通常。失敗が閾値に達したら open へ
+- open: 上流を呼ばずに即座に失敗を返す。recovery_timeout 経過で half_open へ
+- half_open: 試験呼び出しを少数だけ通す。成功で closed、失敗で open に戻る
+
+比喩: ブレーカーが落ちたら家電を繋ぎ直さず、しばらくしてから1つだけ試す。
+"""
+import logging
+import threading
+import time
+from typing import Optional
+
+from .config import settings
+
+logger = logging.getLogger("core_breaker")
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """
+    3状態のサーキットブレーカー
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = None,
+        recovery_timeout: float = None,
+        half_open_max_calls: int = None,
+    ):
+        self.failure_threshold = (
+            settings.BREAKER_FAILURE_THRESHOLD if failure_threshold is None else failure_threshold
+        )
+        self.recovery_timeout = (
+            settings.BREAKER_RECOVERY_SEC if recovery_timeout is None else recovery_timeout
+        )
+        self.half_open_max_calls = (
+            settings.BREAKER_HALF_OPEN_CALLS if half_open_max_calls is None else half_open_max_calls
+        )
+        self._state = STATE_CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._half_open_calls = 0
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._maybe_half_open()
+            return self._state
+
+    def _maybe_half_open(self) -> None:
+        now = time.monotonic()
+        if self._state == STATE_OPEN and now - self._opened_at >= self.recovery_timeout:
+            self._state = STATE_HALF_OPEN
+            self._half_open_calls = 0
+            self._opened_at = now
+            logger.info("🔌 Circuit half-open: probing Gemini API")
+        elif self._state == STATE_HALF_OPEN and now - self._opened_at >= self.recovery_timeout:
+            # 試験呼び出しが結果を残さず終わった（キャンセル等）: 試験枠を補充する
+            self._half_open_calls = 0
+            self._opened_at = now
+
+    def allow_request(self) -> bool:
+        """上流を呼んでよいか (half_open では試験枠を1つ消費する)"""
+        with self._lock:
+            self._maybe_half_open()
+            if self._state == STATE_CLOSED:
+                return True
+            if self._state == STATE_HALF_OPEN and self._half_open_calls < self.half_open_max_calls:
+                self._half_open_calls += 1
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self._state != STATE_CLOSED:
+                logger.info("✅ Circuit closed: Gemini API recovered")
+            self._state = STATE_CLOSED
+            self._failures = 0
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._state == STATE_HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != STATE_OPEN:
+                    logger.warning(f"⛔ Circuit open after {self._failures} failures")
+                self._state = STATE_OPEN
+                self._opened_at = time.monotonic()
+
+    def snapshot(self) -> dict:
+        state = self.state
+        retry_in = 0.0
+        if state == STATE_OPEN:
+            retry_in = max(0.0, self.recovery_timeout - (time.monotonic() - self._opened_at))
+        return {
+            "state": state,
+            "consecutive_failures": self._failures,
+            "retry_in_sec": round(retry_in, 1),
+        }
+
+
+# シングルトン: プロセス内の全 GeminiClient で同じ状態を共有する
+_breaker: Optional[CircuitBreaker] = None
+
+def get_circuit_breaker() -> CircuitBreaker:
+    """サーキットブレーカーのシングルトン取得"""
+    global _breaker
+    if _breaker is None:
+        _breaker = CircuitBreaker()
+    return _breaker
@@ -1,24 +1,196 @@
 import logging
 import hashlib
-from typing import Optional
+import threading
+import time
+from collections import Counter, OrderedDict
+from typing import Callable, Optional
 from sqlalchemy.orm import Session
-from datetime import datetime
+from datetime import datetime, timedelta
 import asyncio
 
-from .models import PrefetchCache
+from sqlalchemy import bindparam, func, tuple_, update
+
+from .models import CacheEntry
 from .types import ProcessingSuccess
-from .seasoning import SeasoningManager, RESOLVED_LIGHT, RESOLVED_MEDIUM, RESOLVED_RICH
+from .seasoning import SeasoningManager, RESOLVED_LIGHT
+from .similarity import NearDuplicateIndex
+from .normalize import cache_key_text
+from .eviction import create_policy
 
 logger = logging.getLogger("core_cache")
 
+# 他プロセス (Warmupツール等) の書き込みとずれないよう、この回数ごとに件数を数え直す
+COUNT_REFRESH_INTERVAL = 500
+
+# 貯めた参照時刻をまとめて書く UPDATE (executemany)
+_TOUCH_STMT = (
+    update(CacheEntry.__table__)
+    .where(CacheEntry.__table__.c.id == bindparam("entry_id"))
+    .values(last_accessed_at=bindparam("accessed_at"))
+)
+
+
+class L1Cache:
+    """
+    プロセス内 L1 キャッシュ (LRU + TTL)
+
+    SQLite の CacheEntry (L2) の手前に置き、ホットな定型文を
+    ORM クエリなしで返す。キーは hash_id で、値は {result_key: (結果, L2 の行 id, 期限)} の辞書。
+    行 id は L1 ヒットでも L2 の参照時刻を進めるために持つ (LRU で追い出されないように)。
+    期限は結果ごとに持つ (同じテキストでも段階ごとに L2 の行の作成時刻が違う)。
+    """
+
+    def __init__(self, max_entries: Optional[int] = None, ttl_hours: Optional[int] = None):
+        self._max_entries = max_entries
+        self._ttl_hours = ttl_hours
+        self._entries: OrderedDict[str, dict[str, tuple[str, Optional[int], float]]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def max_entries(self) -> int:
+        from .config import settings
+        limit = self._max_entries or settings.CACHE_L1_MAX_ENTRIES
+        # L2 より大きくはしない
+        return max(0, min(limit, settings.CACHE_MAX_ENTRIES))
+
+    @property
+    def ttl_seconds(self) -> float:
+        from .config import settings
+        return (self._ttl_hours or settings.CACHE_TTL_HOURS) * 3600
+
+    def _deadline(self, created_at: Optional[datetime]) -> float:
+        """L2 の created_at を基準に期限を決める（L2 と同時に期限切れにする）"""
+        if isinstance(created_at, datetime):
+            created = (created_at - datetime(1970, 1, 1)).total_seconds()
+        else:
+            created = time.time()
+        return created + self.ttl_seconds
+
+    def get(self, text_hash: str, result_key: str) -> Optional[str]:
+        entry = self.get_entry(text_hash, result_key)
+        return entry[0] if entry is not None else None
+
+    def get_entry(self, text_hash: str, result_key: str) -> Optional[tuple[str, Optional[int]]]:
+        """(結果, L2 の行 id) を返す"""
+        with self._lock:
+            results = self._entries.get(text_hash)
+            item = results.get(result_key) if results is not None else None
+            if item is not None:
+                result, entry_id, deadline = item
+                if time.time() <= deadline:
+                    self._entries.move_to_end(text_hash)
+                    self.hits += 1
+                    return result, entry_id
+                del results[result_key]
+                if not results:
+                    del self._entries[text_hash]
+            self.misses += 1
+            return None
+
+    def put(
+        self,
+        text_hash: str,
+        result_key: str,
+        result: str,
+        created_at: Optional[datetime] = None,
+        entry_id: Optional[int] = None,
+    ) -> None:
+        if self.max_entries == 0:
+            return
+        with self._lock:
+            results = self._entries.get(text_hash)
+            if results is None:
+                results = self._entries[text_hash] = {}
+            results[result_key] = (result, entry_id, self._deadline(created_at))
+            self._entries.move_to_end(text_hash)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, text_hash: str) -> None:
+        with self._lock:
+            self._entries.pop(text_hash, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
+
+
 class CacheManager:
     """
     キャッシュ管理・Prefetchロジックの責務を持つクラス (v5.0 Phase 1)
     """
 
+    def __init__(self):
+        # L1: プロセス内キャッシュ (L2 = CacheEntry)
+        self.l1 = L1Cache()
+        # Write-behind: 応答を返した後にキャッシュへ書き込むタスク
+        self._pending_writes: set[asyncio.Task] = set()
+        # SQLiteへの書き込みはスレッド間で直列化する
+        self._write_lock = threading.Lock()
+        # 類似テキスト索引 (Light のみ。初回検索時にバックグラウンドで構築)
+        from .config import settings
+        self.near = NearDuplicateIndex(settings.CACHE_NEAR_DUP_THRESHOLD)
+        self._near_loading = False
+        # L2 の行数 (毎回 COUNT(*) しないための概算。None = 未計測)
+        self._row_count: Optional[int] = None
+        self._writes_since_count = 0
+        # 追い出し方針 (LRU / W-TinyLFU)。キーは (hash_id, seasoning, fingerprint)
+        self.policy = create_policy(
+            settings.CACHE_EVICTION_POLICY, settings.CACHE_MAX_ENTRIES, settings.CACHE_TINYLFU_WINDOW_RATIO
+        )
+        # ヒット時の参照時刻 (id -> 時刻)。リクエスト中は書かず、まとめて書く
+        self._touches: dict[int, datetime] = {}
+        self._touch_bind = None
+        self._touch_lock = threading.Lock()
+        self._last_touch_flush = time.monotonic()
+        # 最近のヒット数 ((hash_id, seasoning, fingerprint) -> 回数)。保守のたびに半減する
+        self.recent_hits: Counter = Counter()
+
     @staticmethod
     def get_text_hash(text: str) -> str:
-        return hashlib.sha256(text.encode()).hexdigest()[:32]
+        """キャッシュキー (TEXT_NORMALIZE=True なら正規化後の文字列 + 規則のバージョンから作る)"""
+        return hashlib.sha256(cache_key_text(text).encode()).hexdigest()[:32]
+
+    @staticmethod
+    def get_result_key(seasoning: int, prompt_version: Optional[str] = None) -> str:
+        """
+        L1 と API 応答 (GET /prefetch/{text_hash}) で使う結果のキー
+        prompt_version 未指定なら旧形式 (seasoning_N) を返す
+        """
+        if not prompt_version:
+            return f"seasoning_{seasoning}"
+        return f"seasoning_{seasoning}@{prompt_version}"
+
+    @staticmethod
+    def parse_result_key(key: str) -> tuple[Optional[int], Optional[str]]:
+        """get_result_key の逆変換: (seasoning, prompt_version)。形式外なら (None, None)"""
+        name, _, version = key.partition("@")
+        if not name.startswith("seasoning_"):
+            return None, None
+        try:
+            return int(name[len("seasoning_"):]), version or None
+        except ValueError:
+            return None, None
+
+    @staticmethod
+    def current_fingerprint() -> str:
+        """現在のプロンプト・モデル構成の指紋 (CacheEntry.fingerprint)"""
+        from .config import settings
+        return SeasoningManager.get_fingerprint(
+            settings.USER_SYSTEM_PROMPT, (settings.MODEL_FAST, settings.MODEL_SMART)
+        )
 
     @staticmethod
     def sanitize_log(text: str) -> str:
@@ -28,7 +200,21 @@ class CacheManager:
         text_hash = CacheManager.get_text_hash(text)[:8]
         return f"[text:{text_hash}...len={len(text)}]"
 
-    def _check_ttl(self, cache: PrefetchCache) -> bool:
+    @staticmethod
+    def get_results(db: Session, text_hash: str, fingerprint: Optional[str] = None) -> dict:
+        """
+        テキストの結果 {seasoning_N: 結果} (GET /prefetch/{text_hash} 用)
+        現在の構成指紋 (または指定した指紋) の結果だけを返す。旧構成の結果は使われないので出さない。
+        """
+        fingerprint = fingerprint or CacheManager.current_fingerprint()
+        rows = (
+            db.query(CacheEntry.seasoning, CacheEntry.result)
+            .filter(CacheEntry.hash_id == text_hash, CacheEntry.fingerprint == fingerprint)
+            .all()
+        )
+        return {CacheManager.get_result_key(seasoning): result for seasoning, result in rows}
+
+    def _check_ttl(self, cache: CacheEntry) -> bool:
         """
         TTL (Time To Live / 賞味期限) チェック
         期限切れなら True を返す
@@ -48,33 +234,111 @@ class CacheManager:
             return True
         return False
 
-    def _enforce_limit(self, db: Session):
+    def _count_rows(self, db: Session) -> int:
+        self._row_count = db.query(func.count(CacheEntry.id)).scalar() or 0
+        self._writes_since_count = 0
+        return self._row_count
+
+    def _adjust_count(self, delta: int) -> None:
+        if self._row_count is not None:
+            self._row_count = max(0, self._row_count + delta)
+
+    def _forget(self, db: Session, hash_ids: set[str], light_removed: set[str]) -> None:
+        """削除した行を L1・類似索引から外す"""
+        for hash_id in hash_ids:
+            self.l1.invalidate(hash_id)
+        if not light_removed:
+            return
+        # 別の構成指紋の Light が残っているテキストは索引に残す
+        remaining = {
+            hash_id for (hash_id,) in db.query(CacheEntry.hash_id)
+            .filter(CacheEntry.hash_id.in_(list(light_removed)), CacheEntry.seasoning == RESOLVED_LIGHT)
+            .all()
+        }
+        for hash_id in light_removed - remaining:
+            self.near.remove(hash_id)
+
+    def _load_policy(self, db: Session) -> None:
+        """既存の行をアクセスの古い順に方針へ読み込む (last_accessed_at の索引を辿る)"""
+        self._flush_touches_locked(db)
+        keys = (
+            db.query(CacheEntry.hash_id, CacheEntry.seasoning, CacheEntry.fingerprint)
+            .order_by(CacheEntry.last_accessed_at.asc())
+            .all()
+        )
+        self.policy.load(tuple(key) for key in keys)
+
+    def _delete_keys(self, db: Session, keys: list[tuple]) -> None:
+        """方針が追い出した (hash_id, seasoning, fingerprint) の行を消す"""
+        rows = (
+            db.query(CacheEntry.id, CacheEntry.hash_id, CacheEntry.seasoning)
+            .filter(tuple_(CacheEntry.hash_id, CacheEntry.seasoning, CacheEntry.fingerprint).in_(keys))
+            .all()
+        )
+        if not rows:
+            return
+        db.query(CacheEntry).filter(CacheEntry.id.in_([r[0] for r in rows])).delete(synchronize_session=False)
+        db.commit()
+        self._adjust_count(-len(rows))
+        self._forget(db, {r[1] for r in rows}, {r[1] for r in rows if r[2] == RESOLVED_LIGHT})
+        logger.info(f"🧹 Evicted {len(rows)} entries ({self.policy.name})")
+
+    def _enforce_limit(self, db: Session, inserted: tuple = ()):
         """
         LRU (Least Recently Used / 容量制限) チェック
         上限を超えていたら、一番古いアクセスのものを削除
+
+        件数はメモリ上で数え、上限を超えたとき (と一定回数の書き込みごと) だけ COUNT(*) で確かめる。
+        削除対象は last_accessed_at の索引を古い順に辿って選ぶ。
+        W-TinyLFU の場合は新しい行を方針に渡し、方針が選んだ行を消す
+        (方針が知らない行で上限を超えたとき = 他プロセスの書き込みだけ LRU で消す)。
         """
         from .config import settings
+
+        if self.policy.tracks_residency:
+            if not self.policy.loaded:
+                # 直前に書いた行も含めて読み込まれる
+                self._load_policy(db)
+            else:
+                evicted = [victim for key in inserted for victim in self.policy.add(key)]
+                if evicted:
+                    self._delete_keys(db, evicted)
         
         max_entries = settings.CACHE_MAX_ENTRIES
-        count = db.query(PrefetchCache).count()
+        self._writes_since_count += 1
+        if (
+            self._row_count is None
+            or self._row_count > max_entries
+            or self._writes_since_count >= COUNT_REFRESH_INTERVAL
+        ):
+            self._count_rows(db)
+        count = self._row_count
         
         if count > max_entries:
-            # 溢れた分だけ削除（念の為ループではなく一括削除を検討するが、ここでは1件ずつ古い順）
             over = count - max_entries
             logger.info(f"🧹 Cache Limit Exceeded ({count} > {max_entries}). Cleaning {over} items...")
+            # 貯めた参照時刻を先に書き、最近使われた行を消さないようにする
+            self._flush_touches_locked(db)
             
-            # last_accessed_at が古い順に取得して一括削除
-            # SQLite does not support DELETE ... LIMIT directly in standard SQLAlchemy ORM bulk delete easily without subquery
-            # but usually, fetching IDs and deleting by ID is safer and widely supported.
-            
-            victims = db.query(PrefetchCache.hash_id).order_by(PrefetchCache.last_accessed_at.asc()).limit(over).all()
-            victim_ids = [v[0] for v in victims]
-            
-            if victim_ids:
-                db.query(PrefetchCache).filter(PrefetchCache.hash_id.in_(victim_ids)).delete(synchronize_session=False)
+            victims = (
+                db.query(CacheEntry.id, CacheEntry.hash_id, CacheEntry.seasoning, CacheEntry.fingerprint)
+                .order_by(CacheEntry.last_accessed_at.asc())
+                .limit(over)
+                .all()
+            )
+            if victims:
+                db.query(CacheEntry).filter(CacheEntry.id.in_([v[0] for v in victims])).delete(synchronize_session=False)
                 db.commit()
+                self._adjust_count(-len(victims))
+                for v in victims:
+                    self.policy.remove((v[1], v[2], v[3]))
+                self._forget(
+                    db,
+                    {v[1] for v in victims},
+                    {v[1] for v in victims if v[2] == RESOLVED_LIGHT},
+                )
 
-    def check_cache(self, db: Session, text: str, seasoning: int) -> Optional[ProcessingSuccess]:
+    def check_cache(self, db: Session, text: str, seasoning: int, prompt_version: Optional[str] = None) -> Optional[ProcessingSuccess]:
         """
         キャッシュを検索し、ヒットすれば結果を返す。
         ヒットしない場合はNoneを返す。
@@ -83,29 +347,46 @@ class CacheManager:
             return None
 
         text_hash = self.get_text_hash(text)
-        cache_key = f"seasoning_{seasoning}"
+        cache_key = self.get_result_key(seasoning, prompt_version)
+        policy_key = (text_hash, seasoning, prompt_version or "")
+
+        # 0. L1 Check (SQLiteに触れない。参照時刻は L2 ヒットと同じく貯めて後で書く)
+        l1_entry = self.l1.get_entry(text_hash, cache_key)
+        if l1_entry is not None:
+            cached_result, entry_id = l1_entry
+            self.policy.record(policy_key)
+            self.recent_hits[policy_key] += 1
+            if entry_id is not None:
+                self._touch(db, entry_id)
+            return {
+                "result": cached_result,
+                "seasoning": seasoning,
+                "from_cache": True,
+                "model_used": None
+            }
 
         try:
-            cache = db.query(PrefetchCache).filter(PrefetchCache.hash_id == text_hash).first()
+            cache = self._find_entry(db, text_hash, seasoning, prompt_version)
             
             # 1. TTL Check
             if cache and self._check_ttl(cache):
-                # Expired: Treat as miss (Cleanup happens later or explicitly now?)
-                # 簡易的にここで削除 or 無視。ここでは削除してしまうのがクリーン。
-                db.delete(cache)
-                db.commit()
+                # Expired: ミス扱い。削除は保守タスク (sweep_expired) がまとめて行う
+                self.policy.record(policy_key, hit=False)
                 return None
 
-            if cache and cache.results and cache_key in cache.results:
-                cached_result = cache.results[cache_key]
+            if cache and cache.result is not None:
+                cached_result = cache.result
                 
                 # エラー文字列がキャッシュされている場合はヒット扱いしない（再試行させる）
                 if cached_result.startswith("Error:"):
+                    self.policy.record(policy_key, hit=False)
                     return None
 
-                # 2. LRU Update
-                cache.last_accessed_at = datetime.utcnow()
-                db.commit()
+                # 2. LRU Update (参照時刻はメモリに貯め、ここでは書かない)
+                self.policy.record(policy_key)
+                self.recent_hits[policy_key] += 1
+                self._touch(db, cache.id)
+                self.l1.put(text_hash, cache_key, cached_result, cache.created_at, cache.id)
 
                 logger.info(f"📦 Cache Hit: {CacheManager.sanitize_log(cached_result)}")
                 return {
@@ -114,127 +395,550 @@ class CacheManager:
                     "from_cache": True,
                     "model_used": None
                 }
+            self.policy.record(policy_key, hit=False)
+            # 3. Near-duplicate (完全一致しなかった Light のみ)
+            if self._near_enabled(seasoning):
+                return self._check_near_duplicate(db, text, text_hash, seasoning, prompt_version)
         except Exception as e:
             logger.warning(f"⚠️ Cache check failed: {e}")
             return None
         
         return None
 
-    # --- v5.0 Phase 3: Warmup Logic ---
-    async def warmup_from_list(self, db: Session, templates: list[str], client, privacy, callback=None, force: bool = False) -> dict:
+    # --- Access-time Write-behind ---
+    def _touch(self, db: Session, entry_id: int) -> None:
         """
-        リスト内の定型文についてキャッシュを生成する（Warmup）。
-        直列実行＋Waitによりレートリミットを回避する。
+        ヒットした行の参照時刻を貯める
+        CACHE_TOUCH_FLUSH_HITS 件たまるか CACHE_TOUCH_FLUSH_SECONDS 秒たったら、
+        バックグラウンドでまとめて書く (リクエストの処理中は SQLite に書き込まない)
+        """
+        from .config import settings
+
+        with self._touch_lock:
+            self._touches[entry_id] = datetime.utcnow()
+            if self._touch_bind is None:
+                try:
+                    self._touch_bind = db.get_bind()
+                except Exception:
+                    pass
+            due = (
+                len(self._touches) >= settings.CACHE_TOUCH_FLUSH_HITS
+                or time.monotonic() - self._last_touch_flush >= settings.CACHE_TOUCH_FLUSH_SECONDS
+            )
+        if due:
+            self._schedule_touch_flush()
+
+    def _schedule_touch_flush(self) -> None:
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # イベントループの外 (ツール等) ではその場で書く
+            self.flush_touches()
+            return
+        task = loop.create_task(asyncio.to_thread(self.flush_touches))
+        self._pending_writes.add(task)
+        task.add_done_callback(self._pending_writes.discard)
+
+    def flush_touches(self, db: Optional[Session] = None) -> int:
+        """
+        貯めた参照時刻を1トランザクション (executemany) で書く
 
         Args:
-            db: Database session
-            templates: 文字列リスト
-            client: GeminiClient instance
-            privacy: PrivacyHandler instance
-            callback: fn(current, total, text) -> None
-            force: Trueなら既存キャッシュを無視して再生成
+            db: 書き込みに使うセッション (None なら最後にヒットしたセッションのエンジンに新しく張る)
 
         Returns:
-            dict: 処理結果統計
+            int: 更新した行数
+        """
+        with self._write_lock:
+            return self._flush_touches_locked(db)
+
+    def _flush_touches_locked(self, db: Optional[Session] = None) -> int:
+        """flush_touches の本体 (_write_lock を取った状態で呼ぶ)"""
+        with self._touch_lock:
+            touches, self._touches = self._touches, {}
+            self._last_touch_flush = time.monotonic()
+            bind = self._touch_bind
+        if not touches:
+            return 0
+        if db is None and bind is None:
+            return 0
+
+        session = db if db is not None else Session(bind=bind)
+        try:
+            session.execute(
+                _TOUCH_STMT,
+                [{"entry_id": entry_id, "accessed_at": accessed_at} for entry_id, accessed_at in touches.items()],
+            )
+            session.commit()
+        except Exception as e:
+            logger.warning(f"⚠️ Cache access-time flush failed: {e}")
+            session.rollback()
+            # 次回に持ち越す (その間に新しく参照されたものはそちらを優先)
+            with self._touch_lock:
+                for entry_id, accessed_at in touches.items():
+                    self._touches.setdefault(entry_id, accessed_at)
+            return 0
+        finally:
+            if db is None:
+                session.close()
+        return len(touches)
+
+    @staticmethod
+    def _find_entry(db: Session, text_hash: str, seasoning: int, prompt_version: Optional[str]) -> Optional[CacheEntry]:
+        """(hash, seasoning, fingerprint) の一意索引で1行引く"""
+        return (
+            db.query(CacheEntry)
+            .filter(
+                CacheEntry.hash_id == text_hash,
+                CacheEntry.seasoning == seasoning,
+                CacheEntry.fingerprint == (prompt_version or ""),
+            )
+            .first()
+        )
+
+    def cached_levels(self, db: Session, text: str, levels: list[int], prompt_version: Optional[str] = None) -> set[int]:
+        """
+        levels のうち、有効な結果 (期限内・エラー文字列でない) がキャッシュにある段階
+        check_cache と違い、参照時刻・追い出し方針・ヒット数には触れない (存在確認用)
         """
-        stats = {"total": len(templates), "processed": 0, "skipped": 0, "errors": 0}
-        levels = [RESOLVED_LIGHT, RESOLVED_MEDIUM, RESOLVED_RICH]
-        batch_size = 5  # M-03: Batch commit interval
-        pending_commits = 0
+        from .config import settings
+
+        if db is None or not levels:
+            return set()
+        deadline = datetime.utcnow() - timedelta(hours=settings.CACHE_TTL_HOURS)
+        rows = (
+            db.query(CacheEntry.seasoning, CacheEntry.created_at, CacheEntry.result)
+            .filter(
+                CacheEntry.hash_id == self.get_text_hash(text),
+                CacheEntry.fingerprint == (prompt_version or ""),
+                CacheEntry.seasoning.in_(list(levels)),
+            )
+            .all()
+        )
+        return {
+            seasoning for seasoning, created_at, result in rows
+            if result is not None and not result.startswith("Error:")
+            and (created_at is None or created_at >= deadline)
+        }
+
+    # --- Near-duplicate Layer ---
+    def _near_enabled(self, seasoning: int) -> bool:
+        """類似検索は出力が局所的な修正で済む Light のみ"""
+        from .config import settings
+        return settings.CACHE_NEAR_DUP_ENABLED and seasoning == RESOLVED_LIGHT
+
+    def _check_near_duplicate(self, db: Session, text: str, text_hash: str, seasoning: int, prompt_version: Optional[str]) -> Optional[ProcessingSuccess]:
+        """句読点や1語違いのテキストの結果を流用する"""
+        if not self.near.loaded:
+            self.load_near_index(db.get_bind())
+            return None
 
-        for i, text in enumerate(templates):
-            text = text.strip()
-            if not text:
-                continue
+        match = self.near.find(text, exclude=text_hash)
+        if match is None:
+            return None
+        hash_id, score = match
+        cache = self._find_entry(db, hash_id, seasoning, prompt_version)
+        if cache is None or self._check_ttl(cache):
+            return None
+        cached_result = cache.result
+        if cached_result is None or cached_result.startswith("Error:"):
+            return None
 
-            if callback:
-                callback(i + 1, len(templates), text)
+        self._touch(db, cache.id)
+        self.policy.record((hash_id, seasoning, prompt_version or ""))
+        logger.info(f"📦 Near-duplicate Hit ({score:.2f}): {CacheManager.sanitize_log(cached_result)}")
+        return {
+            "result": cached_result,
+            "seasoning": seasoning,
+            "from_cache": True,
+            "model_used": None,
+            "similarity": score,
+        }
 
+    def load_near_index(self, bind, background: bool = True) -> None:
+        """
+        既存の Light エントリから類似索引を構築する
+        件数が多いと数秒かかるため、既定では別スレッドで行い、終わるまでは完全一致のみで応答する
+        """
+        if self._near_loading or self.near.loaded:
+            return
+        self._near_loading = True
+
+        def _load():
+            session = Session(bind=bind)
             try:
-                text_hash = self.get_text_hash(text)
-                cache = db.query(PrefetchCache).filter(PrefetchCache.hash_id == text_hash).first()
-                
-                current_results = {}
-                
-                if not cache:
-                    # New Item
-                    cache = PrefetchCache(hash_id=text_hash, original_text=text, results={})
-                    # Don't add yet, merge later
-                else:
-                    if not force and cache.results and len(cache.results) >= 3:
-                        stats["skipped"] += 1
-                        logger.debug(f"Skipped: {text[:10]}...")
-                        if callback: callback(i + 1, len(templates), f"{text[:20]} (Skip)")
-                        continue
-                    current_results = dict(cache.results) if cache.results else {}
+                rows = (
+                    session.query(CacheEntry.hash_id, CacheEntry.original_text)
+                    .filter(CacheEntry.seasoning == RESOLVED_LIGHT)
+                    .distinct()
+                    .yield_per(1000)
+                )
+                count = self.near.add_many(
+                    (hash_id, original_text) for hash_id, original_text in rows if original_text
+                )
+                self.near.loaded = True
+                logger.info(f"🔎 Near-duplicate index built: {count} entries")
+            except Exception as e:
+                logger.warning(f"⚠️ Near-duplicate index build failed: {e}")
+            finally:
+                session.close()
+                self._near_loading = False
 
-                item_updated = False
-                
-                for season in levels:
-                    key = f"seasoning_{season}"
-                    if key in current_results and not force:
-                        continue
-
-                    # --- Generate ---
-                    if callback: callback(i + 1, len(templates), f"{text[:20]} ({season})")
-                    
-                    masked, mapping = privacy.mask(text)
-                    system_prompt = SeasoningManager.get_system_prompt(season)
-                    
-                    config = {
-                        "system": system_prompt,
-                        "params": {"temperature": 0.3}
-                    }
-
-                    # Call API
-                    res = await client.generate_content(masked, config, model=None)
-
-                    if res["success"]:
-                        final_text = res["result"]
-                        if mapping:
-                            final_text = privacy.unmask(final_text, mapping)
-                        
-                        current_results[key] = final_text
-                        item_updated = True
-                        
-                        # H-03: Exponential backoff for rate limiting
-                        base_delay = 1.5
-                        await asyncio.sleep(base_delay)
+        if background:
+            threading.Thread(target=_load, name="near-dup-index", daemon=True).start()
+        else:
+            _load()
+
+    def store_result(self, db: Session, text: str, seasoning: int, result: str, prompt_version: Optional[str] = None) -> bool:
+        """
+        成功した結果をキャッシュへ書き込む (Write-through)
+        既存エントリがあれば該当レベルのキーだけ更新する。
+
+        Returns:
+            bool: コミットできたか (失敗はログに出して False)
+        """
+        return self.store_results(db, text, {seasoning: result}, prompt_version)
+
+    def store_results(self, db: Session, text: str, results_by_level: dict[int, str], prompt_version: Optional[str] = None) -> bool:
+        """
+        複数レベルの結果を1回のコミットで書き込む
+
+        Returns:
+            bool: コミットできたか (失敗はログに出して False)
+        """
+        text_hash = self.get_text_hash(text)
+        fingerprint = prompt_version or ""
+        committed = False
+
+        with self._write_lock:
+            try:
+                existing = (
+                    db.query(CacheEntry)
+                    .filter(CacheEntry.hash_id == text_hash, CacheEntry.seasoning.in_(list(results_by_level)))
+                    .all()
+                )
+                now = datetime.utcnow()
+                current = {}
+                removed = 0
+                for row in existing:
+                    if row.fingerprint == fingerprint:
+                        current[row.seasoning] = row
+                    elif prompt_version:
+                        # 同じ段階の旧構成の結果はもう使われないので、ここで捨てる（遅延無効化）
+                        db.delete(row)
+                        removed += 1
+                        self.policy.remove((row.hash_id, row.seasoning, row.fingerprint))
+
+                created_at = {}
+                rows = {}
+                inserted = []
+                for level, result in results_by_level.items():
+                    row = current.get(level)
+                    if row is None:
+                        inserted.append((text_hash, level, fingerprint))
+                        row = CacheEntry(
+                            hash_id=text_hash,
+                            seasoning=level,
+                            fingerprint=fingerprint,
+                            original_text=text,
+                            result=result,
+                            created_at=now,
+                            last_accessed_at=now,
+                        )
+                        db.add(row)
                     else:
-                        err_msg = res.get('error')
-                        reason = res.get('blocked_reason')
-                        full_msg = f"{err_msg} ({reason})" if reason else err_msg
-                        logger.error(f"❌ API Error for '{text[:10]}' ({season}): {full_msg}")
-                        stats["errors"] += 1
-
-                if item_updated:
-                    cache.results = current_results
-                    cache.updated_at = datetime.utcnow() # T-1: Valid now (Column added)
-                    db.merge(cache)
-                    pending_commits += 1
-                    stats["processed"] += 1
-                    
-                    # M-03: Batch commits
-                    if pending_commits >= batch_size:
-                        db.commit()
-                        pending_commits = 0
-                        # Enforce Limit after batch commit
-                        self._enforce_limit(db)
-                        
-                elif not cache.results: # Is new but failed all?
-                     # If new and no results, commit emptiness or skip logic handled above
-                     pass
+                        # 作り直した結果なので賞味期限も数え直す
+                        row.result = result
+                        row.created_at = now
+                        row.updated_at = now
+                        row.last_accessed_at = now
+                    created_at[level] = row.created_at or now
+                    rows[level] = row
+                # commit 後に id を読むと行ごとに再読込が走るので、flush して先に控える
+                db.flush()
+                entry_ids = {level: row.id for level, row in rows.items()}
+                db.commit()
+                committed = True
+                self._adjust_count(len(results_by_level) - len(current) - removed)
 
+                if removed:
+                    self.l1.invalidate(text_hash)
+                for level, result in results_by_level.items():
+                    self.l1.put(
+                        text_hash, self.get_result_key(level, prompt_version), result,
+                        created_at[level], entry_ids[level],
+                    )
+                if RESOLVED_LIGHT in results_by_level and self._near_enabled(RESOLVED_LIGHT):
+                    self.near.add(text_hash, text)
+                self._enforce_limit(db, tuple(inserted))
             except Exception as e:
-                import traceback
-                traceback.print_exc()
-                logger.error(f"Example {CacheManager.sanitize_log(text)} failed: {e}")
-                stats["errors"] += 1
+                logger.warning(f"⚠️ Cache store failed: {e}")
                 db.rollback()
+        return committed
 
-        # Final commit and enforcement
-        if pending_commits > 0:
-            db.commit()
-            self._enforce_limit(db)
+    def schedule_store(self, db: Session, text: str, seasoning: int, result: str, prompt_version: Optional[str] = None) -> None:
+        """
+        Write-behind: 結果の書き込みをバックグラウンドに回す。
+        呼び出し元 (リクエスト) のセッションは応答後に閉じられるため、
+        同じエンジンに新しいセッションを張って書き込む。
+        """
+        self.schedule_store_results(db, text, {seasoning: result}, prompt_version)
+
+    def schedule_store_results(self, db: Session, text: str, results_by_level: dict[int, str], prompt_version: Optional[str] = None) -> None:
+        """schedule_store の複数レベル版"""
+        if db is None:
+            return
+
+        try:
+            bind = db.get_bind()
+        except Exception as e:
+            logger.warning(f"⚠️ Cache store skipped: {e}")
+            return
+
+        def _write():
+            session = Session(bind=bind)
+            try:
+                self.store_results(session, text, results_by_level, prompt_version)
+            finally:
+                session.close()
+
+        task = asyncio.get_running_loop().create_task(asyncio.to_thread(_write))
+        self._pending_writes.add(task)
+        task.add_done_callback(self._pending_writes.discard)
+
+    def bulk_upsert(
+        self,
+        db: Session,
+        entries: dict[tuple, dict],
+        replace: Callable[[CacheEntry, dict], bool],
+    ) -> dict:
+        """
+        持ち込んだ結果をまとめて書き込む (スナップショットの取り込み用)
+        L1・類似索引・追い出し方針・上限は、全件書いた後に after_bulk_import でまとめて整える。
+
+        Args:
+            entries: {(hash_id, seasoning, fingerprint): {"original_text", "result", "created_at", "last_accessed_at"}}
+            replace: 既存の行を持ち込んだ結果で上書きするか (row, entry) -> bool
 
+        Returns:
+            dict: {"inserted", "updated", "skipped"}
+        """
+        stats = {"inserted": 0, "updated": 0, "skipped": 0}
+        if not entries:
+            return stats
+
+        with self._write_lock:
+            try:
+                existing = {
+                    (row.hash_id, row.seasoning, row.fingerprint): row
+                    for row in db.query(CacheEntry)
+                    .filter(tuple_(CacheEntry.hash_id, CacheEntry.seasoning, CacheEntry.fingerprint).in_(list(entries)))
+                    .all()
+                }
+                now = datetime.utcnow()
+                for key, entry in entries.items():
+                    row = existing.get(key)
+                    if row is None:
+                        db.add(CacheEntry(
+                            hash_id=key[0],
+                            seasoning=key[1],
+                            fingerprint=key[2],
+                            original_text=entry["original_text"],
+                            result=entry["result"],
+                            created_at=entry["created_at"],
+                            last_accessed_at=entry["last_accessed_at"],
+                        ))
+                        stats["inserted"] += 1
+                    elif replace(row, entry):
+                        row.result = entry["result"]
+                        row.created_at = entry["created_at"]
+                        row.updated_at = now
+                        row.last_accessed_at = max(entry["last_accessed_at"], row.last_accessed_at or entry["last_accessed_at"])
+                        stats["updated"] += 1
+                    else:
+                        stats["skipped"] += 1
+                db.commit()
+            except Exception as e:
+                logger.warning(f"⚠️ Cache bulk upsert failed: {e}")
+                db.rollback()
+                raise
         return stats
+
+    def after_bulk_import(self, db: Session) -> None:
+        """
+        bulk_upsert の後始末
+        L1・類似索引・追い出し方針を捨てて作り直させ、行数を数え直して上限を超えた分を消す
+        """
+        self.l1.clear()
+        self.near.clear()
+        self.policy.clear()
+        with self._write_lock:
+            self._row_count = None
+            self._enforce_limit(db)
+
+    def reclaim_superseded(self, db: Session, fingerprint: Optional[str] = None, chunk_size: int = 500) -> dict:
+        """
+        現在の構成指紋以外で作られた行を回収する
+        id 順に chunk_size 件ずつ削除するので、表全体を1回なめるだけで終わる。
+
+        Returns:
+            dict: {"deleted": 削除した行数}
+        """
+        fingerprint = fingerprint or self.current_fingerprint()
+        deleted = 0
+        last_id = 0
+        while True:
+            rows = (
+                db.query(CacheEntry.id, CacheEntry.hash_id, CacheEntry.seasoning, CacheEntry.fingerprint)
+                .filter(CacheEntry.id > last_id, CacheEntry.fingerprint != fingerprint)
+                .order_by(CacheEntry.id.asc())
+                .limit(chunk_size)
+                .all()
+            )
+            if not rows:
+                break
+            last_id = rows[-1][0]
+            with self._write_lock:
+                try:
+                    db.query(CacheEntry).filter(CacheEntry.id.in_([r[0] for r in rows])).delete(synchronize_session=False)
+                    db.commit()
+                except Exception as e:
+                    logger.warning(f"⚠️ Cache reclaim failed: {e}")
+                    db.rollback()
+                    break
+            deleted += len(rows)
+            self._adjust_count(-len(rows))
+            for r in rows:
+                self.policy.remove((r[1], r[2], r[3]))
+            self._forget(db, {r[1] for r in rows}, {r[1] for r in rows if r[2] == RESOLVED_LIGHT})
+        if deleted:
+            logger.info(f"♻️ Reclaimed {deleted} superseded cache entries")
+        return {"deleted": deleted}
+
+    def sweep_expired(self, db: Session, chunk_size: int = 500) -> int:
+        """
+        賞味期限切れの行を消す (保守タスク用。リクエスト中は消さない)
+        created_at の索引を古い順に chunk_size 件ずつ辿り、チャンクごとにコミットする。
+
+        Returns:
+            int: 削除した行数
+        """
+        from .config import settings
+
+        cutoff = datetime.utcnow() - timedelta(hours=settings.CACHE_TTL_HOURS)
+        deleted = 0
+        while True:
+            rows = (
+                db.query(CacheEntry.id, CacheEntry.hash_id, CacheEntry.seasoning, CacheEntry.fingerprint)
+                .filter(CacheEntry.created_at < cutoff)
+                .order_by(CacheEntry.created_at.asc())
+                .limit(chunk_size)
+                .all()
+            )
+            if not rows:
+                break
+            with self._write_lock:
+                try:
+                    db.query(CacheEntry).filter(CacheEntry.id.in_([r[0] for r in rows])).delete(synchronize_session=False)
+                    db.commit()
+                except Exception as e:
+                    logger.warning(f"⚠️ Cache sweep failed: {e}")
+                    db.rollback()
+                    break
+            deleted += len(rows)
+            self._adjust_count(-len(rows))
+            for r in rows:
+                self.policy.remove((r[1], r[2], r[3]))
+                self.recent_hits.pop((r[1], r[2], r[3]), None)
+            self._forget(db, {r[1] for r in rows}, {r[1] for r in rows if r[2] == RESOLVED_LIGHT})
+            if len(rows) < chunk_size:
+                break
+        if deleted:
+            logger.info(f"🗑️ Swept {deleted} expired cache entries")
+        return deleted
+
+    def refresh_candidates(self, db: Session, ahead_hours: float, min_hits: int, limit: int) -> list[tuple[str, int]]:
+        """
+        期限切れが近く、最近よく使われている行 (先回りで作り直す対象)
+
+        Returns:
+            list: [(original_text, seasoning)] ヒット数の多い順に最大 limit 件
+        """
+        from .config import settings
+
+        hot = {key: count for key, count in self.recent_hits.items() if count >= min_hits}
+        if not hot or limit <= 0:
+            return []
+        now = datetime.utcnow()
+        expires_from = now - timedelta(hours=settings.CACHE_TTL_HOURS)
+        expires_by = expires_from + timedelta(hours=ahead_hours)
+        fingerprint = self.current_fingerprint()
+        rows = (
+            db.query(CacheEntry.hash_id, CacheEntry.seasoning, CacheEntry.original_text)
+            .filter(
+                CacheEntry.created_at >= expires_from,
+                CacheEntry.created_at < expires_by,
+                CacheEntry.fingerprint == fingerprint,
+            )
+            .order_by(CacheEntry.created_at.asc())
+            .yield_per(500)
+        )
+        candidates = [
+            (hot[(hash_id, seasoning, fingerprint)], original_text, seasoning)
+            for hash_id, seasoning, original_text in rows
+            if (hash_id, seasoning, fingerprint) in hot and original_text
+        ]
+        candidates.sort(key=lambda c: -c[0])
+        return [(text, seasoning) for _, text, seasoning in candidates[:limit]]
+
+    def decay_hits(self) -> None:
+        """最近のヒット数を半分にする (古い人気を忘れる)"""
+        self.recent_hits = Counter({key: count // 2 for key, count in self.recent_hits.items() if count > 1})
+
+    def schedule_reclaim(self, bind) -> None:
+        """reclaim_superseded を別スレッドで実行する (起動時用)"""
+        def _run():
+            session = Session(bind=bind)
+            try:
+                self.reclaim_superseded(session)
+            finally:
+                session.close()
+
+        task = asyncio.get_running_loop().create_task(asyncio.to_thread(_run))
+        self._pending_writes.add(task)
+        task.add_done_callback(self._pending_writes.discard)
+
+    async def flush_writes(self) -> None:
+        """保留中の書き込みの完了を待つ (テスト・シャットダウン用)"""
+        if self._pending_writes:
+            await asyncio.gather(*list(self._pending_writes), return_exceptions=True)
+
+    # --- v5.0 Phase 3: Warmup Logic ---
+    async def warmup_from_list(
+        self, db: Session, templates: list[str], client, privacy, callback=None, force: bool = False,
+        workers: Optional[int] = None, checkpoint_path=None,
+    ) -> dict:
+        """
+        リスト内の定型文についてキャッシュを生成する（Warmup）。
+        WarmupEngine に委譲する（並列数は WARMUP_WORKERS、流量は GeminiClient のリミッター）。
+
+        Args:
+            db: Database session
+            templates: 文字列リスト
+            client: GeminiClient instance
+            privacy: PrivacyHandler instance
+            callback: fn(current, total, text) -> None
+            force: Trueなら既存キャッシュを無視して再生成
+            workers: 並列数 (None なら設定値)
+            checkpoint_path: 指定すると完了分を記録し、中断後に再開できる
+
+        Returns:
+            dict: 処理結果統計
+        """
+        from .warmup import WarmupEngine
+
+        engine = WarmupEngine(
+            self, client, privacy,
+            workers=workers, checkpoint_path=checkpoint_path, callback=callback,
+        )
+        return await engine.run(db, templates, force=force)
@@ -15,12 +15,71 @@ class Settings(BaseSettings):
     USER_SYSTEM_PROMPT: str = ""  # ユーザーカスタム指示（50トークン上限推奨）
     PRIVACY_MODE: bool = False  # False=PII検知OFF（軽量化）、True=PII検知ON
     
+    # 🔗 同一リクエストの合流 (Single-flight)
+    GEMINI_SINGLE_FLIGHT: bool = True  # 同時に来た同一リクエストはAPI呼び出しを1回にまとめる
+
+    # 🚦 流量制御 (AIMD) とリトライ
+    GEMINI_INITIAL_CONCURRENCY: int = 4  # 同時実行数の初期値
+    GEMINI_MIN_CONCURRENCY: int = 1
+    GEMINI_MAX_CONCURRENCY: int = 16
+    GEMINI_LATENCY_TARGET_SEC: float = 5.0  # これ以内の応答なら同時実行数を増やす
+    GEMINI_MAX_RETRIES: int = 3  # 429/503 時のリトライ回数
+    GEMINI_RETRY_BASE_DELAY: float = 1.0  # 指数バックオフの初期値(秒)
+    GEMINI_RETRY_MAX_DELAY: float = 30.0  # 待ち時間の上限(秒)
+
+    GEMINI_TIMEOUT_SEC: float = 30.0  # 1回の呼び出しの上限時間(秒)
+
+    # 📦 Micro-batching (短文をまとめて1回のAPI呼び出しに, opt-in)
+    MICRO_BATCH_ENABLED: bool = False
+    MICRO_BATCH_WINDOW_MS: int = 20  # 同じ設定の短文を溜める時間
+    MICRO_BATCH_MAX_ITEMS: int = 16  # 1バッチの最大件数
+    MICRO_BATCH_MAX_CHARS: int = 200  # これより長い文はまとめない
+
+    # 🏇 Hedged Requests (MODEL_FAST のテールレイテンシ対策, opt-in)
+    HEDGE_ENABLED: bool = False
+    HEDGE_DELAY_MS: int = 0  # 複製を送るまでの待ち時間。0=直近のp90を使う
+    HEDGE_BUDGET_RATIO: float = 0.1  # 複製リクエストの上限 (全リクエストに対する割合)
+
+    # ⛔ サーキットブレーカー
+    BREAKER_FAILURE_THRESHOLD: int = 5  # 連続失敗でopen
+    BREAKER_RECOVERY_SEC: float = 30.0  # open → half_open までの秒数
+    BREAKER_HALF_OPEN_CALLS: int = 1  # half_open で通す試験呼び出し数
+    BREAKER_ENQUEUE_ON_OPEN: bool = True  # open中のキャッシュミスはSyncJobに積む
+
     # 🔒 並列処理制限 (SQLite lock回避)
     MAX_PREFETCH_WORKERS: int = 1  # プリフェッチジョブの最大並列数
+    PREFETCH_QUEUE_MAX: int = 256  # 先読みキューの上限（溢れた分は捨てる）
+    SPECULATIVE_PREFETCH: bool = False  # 履歴追加時に既定の調味レベルで投機的に先読みする
+    SPECULATIVE_QUOTA_PER_HOUR: int = 60  # ユーザーごとの投機実行の上限（回/時）
+    SPECULATIVE_MAX_LOAD: float = 0.5  # 上流の使用率がこれ以上なら投機分を捨てる
 
     # 🧹 キャッシュライフサイクル管理 (v5.0 Phase 3.5)
     CACHE_TTL_HOURS: int = 168  # 7日 (賞味期限)
-    CACHE_MAX_ENTRIES: int = 1000  # 最大保存件数 (容量制限)
+    CACHE_MAX_ENTRIES: int = 1000  # 最大保存件数 (容量制限。1行 = テキスト × 調味レベル)
+    CACHE_EVICTION_POLICY: str = "lru"  # 追い出し方針: "lru" / "tinylfu" (頻度で入場審査するW-TinyLFU)
+    CACHE_TINYLFU_WINDOW_RATIO: float = 0.01  # W-TinyLFUの窓 (新入り用LRU) の割合
+    CACHE_TOUCH_FLUSH_HITS: int = 100  # ヒット時の参照時刻をこの件数たまったらまとめて書く
+    CACHE_TOUCH_FLUSH_SECONDS: float = 5.0  # ...またはこの秒数たったら書く
+    CACHE_MAINTENANCE_ENABLED: bool = True  # 期限切れの一括削除・人気エントリの先回り再生成をバックグラウンドで行う
+    CACHE_MAINTENANCE_INTERVAL_SEC: float = 600.0  # 保守の実行間隔(秒)
+    CACHE_SWEEP_CHUNK: int = 500  # 期限切れ削除の1回のコミットあたりの件数
+    CACHE_REFRESH_AHEAD_HOURS: float = 12.0  # 期限切れまでこの時間を切った人気エントリを作り直す
+    CACHE_REFRESH_MIN_HITS: int = 3  # 「人気」とみなす最近のヒット数 (保守のたびに半減)
+    CACHE_REFRESH_MAX_PER_RUN: int = 20  # 1回の保守で作り直す上限
+    CACHE_L1_MAX_ENTRIES: int = 256  # プロセス内L1キャッシュの件数 (CACHE_MAX_ENTRIES以下に制限)
+    CACHE_FIRST: bool = True  # True=API呼び出し前にキャッシュを引く / 成功結果を書き戻す
+    TEXT_NORMALIZE: bool = True  # NFKC・改行/空白の統一・ゼロ幅文字除去をキャッシュキーとAPI入力に適用 (False=生テキストのまま)
+    WARMUP_MULTI_LEVEL: bool = True  # Warmupで3段階を1回の構造化出力で生成する
+    CACHE_PREFILL_LEVELS: bool = False  # /process後に他の2段階もバックグラウンドで生成しておく
+    CACHE_RECLAIM_ON_STARTUP: bool = True  # 起動時に旧プロンプト/モデル構成の結果をバックグラウンドで回収
+    CACHE_NEAR_DUP_ENABLED: bool = False  # Lightのみ、句読点・1語違いのテキストの結果を流用する
+    CACHE_NEAR_DUP_THRESHOLD: float = 0.8  # 類似度 (文字3-gramのJaccard推定値) の閾値
+    WARMUP_WORKERS: int = 4  # Warmupで同時に処理する定型文の数
+    WARMUP_MAX_RPS: float = 0.0  # Warmupの上流呼び出し上限 (回/秒, 0=リミッター任せ)
+
+    # 🔤 カスタム語彙の検出
+    VOCAB_INDEX_ENABLED: bool = True  # 語彙オートマトンをコンパイル済みファイル (vocab.db の隣) に書き出し、各プロセスで mmap 共有する
+    VOCAB_INDEX_PUBLISH_DELAY_SEC: float = 1.0  # 語彙の追加・削除からファイルを書き直すまでの待ち秒数 (連続した変更をまとめる)
     
     class Config:
         env_file = ".env"
@@ -0,0 +1,243 @@
+"""
+Eviction Policy Module - L2 キャッシュの追い出し方針
+
+責務:
+- LRU (既定): last_accessed_at の索引で古いものから消す (CacheManager 側で実行)
+- W-TinyLFU: 頻度を数える Count-Min Sketch で「入れるか」を決め、
+  小さな LRU 窓 + 分割 LRU (試用 / 保護) の本体で「何を消すか」を決める
+
+LRU だと Warmup の一巡や一度きりの長文の連続で、何度も使われる挨拶文が押し出される。
+W-TinyLFU では、窓から溢れた新入りは本体の最古の行より多く参照されていないと入れない。
+
+比喩: 新メニューはまず試食コーナー (窓) に置き、常連メニューより注文が多かったものだけ
+メニュー表 (本体) に載せる。メニュー表でも2回以上注文されたものは別枠で守る。
+
+キーは (hash_id, seasoning, fingerprint) = CacheEntry の一意キー。
+頻度表はプロセス内のみで、再起動後は last_accessed_at の順で本体を組み直す。
+"""
+import logging
+import threading
+from collections import OrderedDict
+from typing import Hashable, Iterable
+
+logger = logging.getLogger("core_eviction")
+
+POLICY_LRU = "lru"
+POLICY_TINYLFU = "tinylfu"
+
+SKETCH_DEPTH = 4
+SKETCH_WIDTH_FACTOR = 4
+# 4bit カウンタ相当 (これ以上は数えない)
+SKETCH_MAX_COUNT = 15
+# 容量 × この回数の記録ごとに全カウンタを半分にする (古い人気を忘れる)
+SKETCH_SAMPLE_FACTOR = 10
+
+_MASK64 = (1 << 64) - 1
+_SEEDS = (0x9E3779B97F4A7C15, 0xC2B2AE3D27D4EB4F, 0x165667B19E3779F9, 0xD6E8FEB86659FD93)
+
+
+class CountMinSketch:
+    """
+    頻度の概算表 (Count-Min Sketch)
+
+    depth 行 × width 列のカウンタ。キーごとに各行で1列を選んで数え、最小値を頻度とする。
+    衝突で多めに見積もることはあるが、少なめには見積もらない。
+    """
+
+    def __init__(self, capacity: int, depth: int = SKETCH_DEPTH):
+        # 列数は容量の4倍以上 (衝突による過大評価で一度きりのキーが入場しないように)
+        width = 64
+        while width < capacity * SKETCH_WIDTH_FACTOR:
+            width <<= 1
+        self.width = width
+        self.depth = min(depth, len(_SEEDS))
+        self._shift = 64 - (width.bit_length() - 1)
+        self._rows = [bytearray(width) for _ in range(self.depth)]
+        self.sample_size = max(1, capacity) * SKETCH_SAMPLE_FACTOR
+        self.additions = 0
+
+    def _indexes(self, key: Hashable) -> list[int]:
+        # 行ごとに別の奇数を掛け、上位ビットで列を選ぶ (乗算ハッシュ)
+        h = hash(key) & _MASK64
+        h ^= h >> 32
+        return [((h * seed) & _MASK64) >> self._shift for seed in _SEEDS[:self.depth]]
+
+    def increment(self, key: Hashable) -> None:
+        for row, index in zip(self._rows, self._indexes(key)):
+            if row[index] < SKETCH_MAX_COUNT:
+                row[index] += 1
+        self.additions += 1
+        if self.additions >= self.sample_size:
+            self._age()
+
+    def estimate(self, key: Hashable) -> int:
+        return min(row[index] for row, index in zip(self._rows, self._indexes(key)))
+
+    def _age(self) -> None:
+        for row in self._rows:
+            for i, count in enumerate(row):
+                if count:
+                    row[i] = count >> 1
+        self.additions //= 2
+
+
+class LRUPolicy:
+    """
+    既定の方針: 何も覚えず、追い出しは CacheManager が last_accessed_at の索引で行う
+    """
+
+    name = POLICY_LRU
+    tracks_residency = False
+    loaded = True
+
+    def record(self, key: Hashable, hit: bool = True) -> None:
+        pass
+
+    def add(self, key: Hashable) -> list:
+        return []
+
+    def remove(self, key: Hashable) -> None:
+        pass
+
+    def load(self, keys: Iterable[Hashable]) -> None:
+        pass
+
+    def clear(self) -> None:
+        pass
+
+    def stats(self) -> dict:
+        return {"policy": self.name}
+
+
+class WindowTinyLFUPolicy:
+    """
+    W-TinyLFU (窓 LRU + TinyLFU 入場審査 + 分割 LRU 本体)
+
+    Args:
+        capacity: 行数の上限 (CACHE_MAX_ENTRIES)
+        window_ratio: 窓の割合 (既定 1%)
+        protected_ratio: 本体のうち保護区画の割合 (既定 80%)
+    """
+
+    name = POLICY_TINYLFU
+    tracks_residency = True
+
+    def __init__(self, capacity: int, window_ratio: float = 0.01, protected_ratio: float = 0.8):
+        self.capacity = max(2, capacity)
+        self.window_capacity = max(1, int(self.capacity * window_ratio))
+        self.main_capacity = self.capacity - self.window_capacity
+        self.protected_capacity = int(self.main_capacity * protected_ratio)
+        self.sketch = CountMinSketch(self.capacity)
+        self._window: OrderedDict = OrderedDict()
+        self._probation: OrderedDict = OrderedDict()
+        self._protected: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.loaded = False
+        self.admitted = 0
+        self.rejected = 0
+
+    def __len__(self) -> int:
+        return len(self._window) + len(self._probation) + len(self._protected)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._window or key in self._probation or key in self._protected
+
+    def record(self, key: Hashable, hit: bool = True) -> None:
+        """
+        参照を記録する (ミスも頻度に数える: 何度も求められるのに入れないテキストを見つけるため)
+        """
+        with self._lock:
+            self.sketch.increment(key)
+            if not hit:
+                return
+            if key in self._window:
+                self._window.move_to_end(key)
+            elif key in self._probation:
+                # 試用区画で再び使われたら保護区画へ
+                del self._probation[key]
+                self._protected[key] = None
+                if len(self._protected) > self.protected_capacity:
+                    demoted, _ = self._protected.popitem(last=False)
+                    self._probation[demoted] = None
+            elif key in self._protected:
+                self._protected.move_to_end(key)
+
+    def add(self, key: Hashable) -> list:
+        """
+        新しい行を窓に入れる
+
+        Returns:
+            list: 追い出すキー (窓から溢れて審査に落ちた新入り、または本体の最古の行)
+        """
+        with self._lock:
+            if key in self:
+                return []
+            self._window[key] = None
+            evicted = []
+            while len(self._window) > self.window_capacity:
+                candidate, _ = self._window.popitem(last=False)
+                if len(self._probation) + len(self._protected) < self.main_capacity:
+                    self._probation[candidate] = None
+                    continue
+                segment = self._probation or self._protected
+                victim = next(iter(segment))
+                if self.sketch.estimate(candidate) > self.sketch.estimate(victim):
+                    del segment[victim]
+                    self._probation[candidate] = None
+                    evicted.append(victim)
+                    self.admitted += 1
+                else:
+                    evicted.append(candidate)
+                    self.rejected += 1
+            return evicted
+
+    def remove(self, key: Hashable) -> None:
+        """TTL・構成変更などで消えた行を忘れる"""
+        with self._lock:
+            for segment in (self._window, self._probation, self._protected):
+                if key in segment:
+                    del segment[key]
+                    return
+
+    def load(self, keys: Iterable[Hashable]) -> None:
+        """
+        既存の行を古い順に受け取り、区画を組み直す (起動後の初回のみ)
+        新しいものを窓に、残りを試用区画に置く。容量を超える古い分は覚えない
+        (DB の件数が上限を超えていれば CacheManager が LRU で消す)。
+        """
+        keys = list(keys)[-self.capacity:]
+        with self._lock:
+            self._window.clear()
+            self._probation.clear()
+            self._protected.clear()
+            split = max(0, len(keys) - self.window_capacity)
+            self._probation.update(dict.fromkeys(keys[:split]))
+            self._window.update(dict.fromkeys(keys[split:]))
+            self.loaded = True
+        logger.info(f"📊 TinyLFU policy loaded: {len(keys)} entries")
+
+    def clear(self) -> None:
+        with self._lock:
+            self._window.clear()
+            self._probation.clear()
+            self._protected.clear()
+            self.loaded = False
+
+    def stats(self) -> dict:
+        return {
+            "policy": self.name,
+            "window": len(self._window),
+            "probation": len(self._probation),
+            "protected": len(self._protected),
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+        }
+
+
+def create_policy(name: str, capacity: int, window_ratio: float = 0.01):
+    """設定値 (CACHE_EVICTION_POLICY) から方針を作る"""
+    if name == POLICY_TINYLFU:
+        return WindowTinyLFUPolicy(capacity, window_ratio=window_ratio)
+    if name != POLICY_LRU:
+        logger.warning(f"⚠️ Unknown eviction policy '{name}', falling back to LRU")
+    return LRUPolicy()
@@ -4,10 +4,21 @@ Gemini Client Module - Gemini API呼び出し
 責務: API設定、呼び出し、レスポンス処理
 """
 import os
+import json
+import time
+import asyncio
+import hashlib
 import logging
+from typing import AsyncIterator
 from google import genai
 from google.genai import types
 from .config import settings
+from .singleflight import SingleFlight
+from .limiter import get_limiter, RetryPolicy, is_overload_error, get_retry_hint
+from .breaker import get_circuit_breaker
+from .hedging import LatencyTracker, HedgeBudget, hedged, DEFAULT_HEDGE_DELAY_SEC
+from .batcher import MicroBatcher
+from .seasoning import MULTI_LEVEL_KEYS
 
 logger = logging.getLogger("gemini_client")
 
@@ -18,6 +29,15 @@ class GeminiClient:
     """
     def __init__(self):
         self.client = None
+        self.single_flight = SingleFlight()
+        self.limiter = get_limiter()
+        self.retry_policy = RetryPolicy()
+        self.breaker = get_circuit_breaker()
+        self.latency = LatencyTracker()
+        self.hedge_budget = HedgeBudget(settings.HEDGE_BUDGET_RATIO)
+        self.batcher = MicroBatcher(
+            self.generate_batch, self._generate_content, send_fallback=self._generate_content_guarded
+        )
         self._configure()
 
     def _configure(self):
@@ -46,17 +66,93 @@ class GeminiClient:
                 "blocked_reason": "APIキーが設定されていません",
             }
 
+        target_model = model or settings.MODEL_FAST
+        # 短文はマイクロバッチに回す (MICRO_BATCH_ENABLED時)
+        if settings.MICRO_BATCH_ENABLED and len(text) <= settings.MICRO_BATCH_MAX_CHARS:
+            send = lambda: self.batcher.submit(text, config, target_model)
+        else:
+            send = lambda: self._generate_content(text, config, target_model)
+
+        async def upstream() -> dict:
+            # 障害中は上流を呼ばずに即座に返す（タイムアウト待ちをしない）
+            # 実際に上流を呼ぶ先頭の呼び出しだけがブレーカーの枠 (half_open の試験枠) を使い、
+            # 実行中の同一リクエストに合流した呼び出しは試験呼び出しの結果を待つ
+            if not self.breaker.allow_request():
+                return {
+                    "success": False,
+                    "result": "",
+                    "error": "circuit_open",
+                    "blocked_reason": "Gemini APIが一時的に利用できません",
+                }
+            return await send()
+
+        if not settings.GEMINI_SINGLE_FLIGHT:
+            return await upstream()
+
+        # 同一 (入力, モデル, システムプロンプト, 温度) の実行中リクエストに合流する
+        temperature = config["params"].get("temperature", 0.3)
+        key = hashlib.sha256(
+            f"{target_model}\0{temperature}\0{config['system']}\0{text}".encode()
+        ).hexdigest()
+        result = await self.single_flight.do(key, upstream)
+        # 呼び出し元ごとに別の dict を返す（共有結果の書き換え防止）
+        return dict(result)
+
+    async def _call_with_retry(self, **kwargs):
+        """
+        リミッターの枠内で上流を呼ぶ
+        429/503 はジッター付き指数バックオフで再試行（サーバー指定の待ち時間を優先）
+        """
+        attempt = 0
+        while True:
+            try:
+                async with self.limiter.slot():
+                    started = time.monotonic()
+                    response = await asyncio.wait_for(
+                        self.client.aio.models.generate_content(**kwargs),
+                        timeout=settings.GEMINI_TIMEOUT_SEC,
+                    )
+                    self.latency.record(kwargs["model"], time.monotonic() - started)
+                    return response
+            except Exception as e:
+                if not is_overload_error(e) or attempt >= self.retry_policy.max_retries:
+                    raise
+                delay = self.retry_policy.delay(attempt, get_retry_hint(e))
+                attempt += 1
+                logger.warning(
+                    f"⏳ Rate limited. Retry {attempt}/{self.retry_policy.max_retries} in {delay:.1f}s"
+                )
+                await asyncio.sleep(delay)
+
+    def _hedge_delay(self, model: str) -> float:
+        """複製を送るまでの秒数 (設定値 or 直近p90)"""
+        if settings.HEDGE_DELAY_MS > 0:
+            return settings.HEDGE_DELAY_MS / 1000
+        p90 = self.latency.percentile(model, 90)
+        return p90 if p90 is not None else DEFAULT_HEDGE_DELAY_SEC
+
+    async def _call_upstream(self, **kwargs):
+        """MODEL_FAST は HEDGE_ENABLED 時に hedged request で呼ぶ"""
+        if settings.HEDGE_ENABLED and kwargs["model"] == settings.MODEL_FAST:
+            return await hedged(
+                lambda: self._call_with_retry(**kwargs),
+                self._hedge_delay(kwargs["model"]),
+                self.hedge_budget,
+            )
+        return await self._call_with_retry(**kwargs)
+
+    async def _generate_content(self, text: str, config: dict, target_model: str) -> dict:
         try:
-            target_model = model or settings.MODEL_FAST
             prompt = f"{config['system']}\n\n[Input]\n{text}"
 
-            response = await self.client.aio.models.generate_content(
+            response = await self._call_upstream(
                 model=target_model,
                 contents=prompt,
                 config=types.GenerateContentConfig(
                     temperature=config["params"].get("temperature", 0.3)
                 ),
             )
+            self.breaker.record_success()
 
             # Safety Filter チェック
             if response.candidates and len(response.candidates) > 0:
@@ -81,6 +177,8 @@ class GeminiClient:
         except Exception as e:
             error_msg = str(e)
             logger.error(f"Gemini API Error: {error_msg}")
+            if _is_outage_error(e):
+                self.breaker.record_failure()
             return {
                 "success": False,
                 "result": "",
@@ -88,6 +186,119 @@ class GeminiClient:
                 "blocked_reason": error_msg,
             }
 
+    async def _generate_content_guarded(self, text: str, config: dict, target_model: str) -> dict:
+        """ブレーカーを通してから1件呼ぶ (まとめ送り失敗後の個別呼び出し用)"""
+        if not self.breaker.allow_request():
+            return {
+                "success": False,
+                "result": "",
+                "error": "circuit_open",
+                "blocked_reason": "Gemini APIが一時的に利用できません",
+            }
+        return await self._generate_content(text, config, target_model)
+
+    async def generate_batch(self, texts: list[str], config: dict, model: str = None) -> dict:
+        """
+        複数の短文に同じ指示を適用し、1回の呼び出しで処理する
+        入力・出力ともに JSON 配列（件数と順序を一致させる）
+
+        Returns:
+            {"success": True, "results": [...]} または
+            {"success": False, "results": [], "error": ..., "blocked_reason": ..., "fallback": bool}
+            fallback が False なら上流障害なので、個別に送り直さない
+        """
+        try:
+            prompt = (
+                f"{config['system']}\n\n"
+                "以下のJSON配列の各要素に、上記の指示をそれぞれ個別に適用してください。\n"
+                f"出力は入力と同じ順序・同じ件数({len(texts)}件)の文字列のJSON配列のみ。\n\n"
+                f"[Input]\n{json.dumps(texts, ensure_ascii=False)}"
+            )
+            response = await self._call_upstream(
+                model=model or settings.MODEL_FAST,
+                contents=prompt,
+                config=types.GenerateContentConfig(
+                    temperature=config["params"].get("temperature", 0.3),
+                    response_mime_type="application/json",
+                ),
+            )
+            self.breaker.record_success()
+
+            results = json.loads(response.text or "")
+            if (
+                not isinstance(results, list)
+                or len(results) != len(texts)
+                or not all(isinstance(r, str) for r in results)
+            ):
+                return {
+                    "success": False,
+                    "results": [],
+                    "error": "batch_mismatch",
+                    "blocked_reason": "バッチ応答の件数または形式が不正です",
+                }
+            return {"success": True, "results": [r.strip() for r in results], "error": None, "blocked_reason": None}
+
+        except Exception as e:
+            logger.error(f"Gemini Batch Error: {e}")
+            outage = _is_outage_error(e) and not isinstance(e, ValueError)
+            if outage:
+                self.breaker.record_failure()
+            return {
+                "success": False,
+                "results": [],
+                "error": "api_error",
+                "blocked_reason": str(e),
+                "fallback": not outage,
+            }
+
+    async def generate_multi_level(self, text: str, config: dict, model: str = None) -> dict:
+        """
+        3段階 (Light/Medium/Rich) を1回の構造化出力で生成する
+        config["system"] には SeasoningManager.get_multi_level_prompt() を渡す
+
+        Returns:
+            {"success": True, "results": {30: ..., 60: ..., 100: ...}} または
+            {"success": False, "results": {}, "error": ..., "blocked_reason": ...}
+        """
+        if not self.is_configured:
+            return {"success": False, "results": {}, "error": "api_not_configured", "blocked_reason": "APIキーが設定されていません"}
+        if not self.breaker.allow_request():
+            return {"success": False, "results": {}, "error": "circuit_open", "blocked_reason": "Gemini APIが一時的に利用できません"}
+
+        try:
+            response = await self._call_upstream(
+                model=model or settings.MODEL_FAST,
+                contents=f"{config['system']}\n\n[Input]\n{text}",
+                config=types.GenerateContentConfig(
+                    temperature=config["params"].get("temperature", 0.3),
+                    response_mime_type="application/json",
+                ),
+            )
+            self.breaker.record_success()
+
+            data = json.loads(response.text or "")
+            results = {}
+            if isinstance(data, dict):
+                for level, key in MULTI_LEVEL_KEYS.items():
+                    value = data.get(key)
+                    if isinstance(value, str) and value.strip():
+                        results[level] = value.strip()
+            if not results:
+                return {
+                    "success": False,
+                    "results": {},
+                    "error": "multi_level_mismatch",
+                    "blocked_reason": "3段階応答の形式が不正です",
+                }
+            # 一部のレベルだけ欠けていても、得られた分は返す
+            return {"success": True, "results": results, "error": None, "blocked_reason": None}
+
+        except Exception as e:
+            logger.error(f"Gemini Multi-level Error: {e}")
+            if _is_outage_error(e) and not isinstance(e, ValueError):
+                self.breaker.record_failure()
+            return {"success": False, "results": {}, "error": "api_error", "blocked_reason": str(e)}
+
     def generate_content_stream(self, text: str, config: dict):
         if not self.is_configured:
             yield "Error: APIキーが設定されていません"
@@ -110,6 +321,60 @@ class GeminiClient:
         except Exception as e:
             yield f"Error: {str(e)}"
 
+    async def generate_content_stream_async(self, text: str, config: dict, model: str = None) -> AsyncIterator[str]:
+        """
+        ネイティブ非同期ストリーミング (client.aio)
+
+        スレッドプールを占有しない。呼び出し側が次のチャンクを要求するまで
+        上流を読み進めないため、送信が詰まればそのまま背圧になる。
+        ジェネレータが閉じられた／キャンセルされた時点で上流ストリームも閉じる。
+        """
+        if not self.is_configured:
+            yield "Error: APIキーが設定されていません"
+            return
+        if not self.breaker.allow_request():
+            yield "Error: Gemini APIが一時的に利用できません"
+            return
+
+        stream = None
+        try:
+            # ストリーム全体で1枠を使う
+            async with self.limiter.slot():
+                stream = await self.client.aio.models.generate_content_stream(
+                    model=model or settings.MODEL_FAST,
+                    contents=f"{config['system']}\n\n[Input]\n{text}",
+                    config=types.GenerateContentConfig(
+                        temperature=config["params"].get("temperature", 0.3)
+                    ),
+                )
+                async for chunk in stream:
+                    if chunk.text:
+                        yield chunk.text
+
+            self.breaker.record_success()
+
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            if _is_outage_error(e):
+                self.breaker.record_failure()
+            yield f"Error: {str(e)}"
+        finally:
+            # 上流のHTTPストリームを確実に打ち切る
+            if stream is not None and hasattr(stream, "aclose"):
+                await stream.aclose()
+
+
+def _is_outage_error(exc: BaseException) -> bool:
+    """
+    ブレーカーの失敗として数えるか
+    リクエスト側の誤り (429以外の4xx) は上流障害ではないので数えない
+    """
+    code = getattr(exc, "code", None)
+    if isinstance(code, int) and 400 <= code < 500 and code != 429:
+        return False
+    return True
+
 
 # --- Backward Compatibility (M-05: Lazy Initialization) ---
 _default_client = None
@@ -129,3 +394,6 @@ async def execute_gemini(text: str, config: dict, model: str = None) -> dict:
 def execute_gemini_stream(text: str, config: dict):
     return _get_client().generate_content_stream(text, config)
 
+def execute_gemini_stream_async(text: str, config: dict, model: str = None) -> AsyncIterator[str]:
+    return _get_client().generate_content_stream_async(text, config, model)
+
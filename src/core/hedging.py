@@ -0,0 +1,107 @@
+"""
+Hedging Module - テールレイテンシ対策
+
+責務:
+- モデルごとの直近レイテンシ分布 (p90 等) の追跡
+- 追い打ちリクエスト (hedge) の予算管理
+- 一定時間応答がなければ複製リクエストを送り、先に返った方を採用する
+
+比喩: タクシーがなかなか来ないとき、もう1台呼んで先に来た方に乗る。
+ただし呼びすぎないよう、回数には上限を設ける。
+"""
+import asyncio
+import logging
+import threading
+from collections import deque
+from typing import Awaitable, Callable, Optional, TypeVar
+
+logger = logging.getLogger("core_hedging")
+
+T = TypeVar("T")
+
+# 分布が揃うまで (サンプル不足時) に使う待ち時間
+DEFAULT_HEDGE_DELAY_SEC = 2.0
+MIN_SAMPLES = 20
+WINDOW_SIZE = 200
+
+
+class LatencyTracker:
+    """モデルごとの直近 WINDOW_SIZE 件のレイテンシ（秒）"""
+
+    def __init__(self, window: int = WINDOW_SIZE):
+        self._window = window
+        self._samples: dict[str, deque] = {}
+        self._lock = threading.Lock()
+
+    def record(self, model: str, latency: float) -> None:
+        with self._lock:
+            samples = self._samples.get(model)
+            if samples is None:
+                samples = self._samples[model] = deque(maxlen=self._window)
+            samples.append(latency)
+
+    def percentile(self, model: str, p: float, min_samples: int = MIN_SAMPLES) -> Optional[float]:
+        """p (0-100) パーセンタイル。サンプル不足なら None"""
+        with self._lock:
+            samples = sorted(self._samples.get(model, ()))
+        if len(samples) < min_samples:
+            return None
+        index = min(len(samples) - 1, int(len(samples) * p / 100))
+        return samples[index]
+
+
+class HedgeBudget:
+    """
+    hedge の予算 (トークンバケット)
+    リクエスト1件ごとに ratio 枚たまり、hedge 1回で1枚使う。
+    → hedge は全体の ratio 割合を超えない
+    """
+
+    def __init__(self, ratio: float, burst: float = 10.0):
+        self.ratio = ratio
+        self.burst = burst
+        self._tokens = 0.0
+        self._lock = threading.Lock()
+        self.spent = 0
+
+    def on_request(self) -> None:
+        with self._lock:
+            self._tokens = min(self.burst, self._tokens + self.ratio)
+
+    def try_spend(self) -> bool:
+        with self._lock:
+            # 浮動小数点の誤差 (0.1 × 10 = 0.999...) を吸収する
+            if self._tokens >= 1.0 - 1e-9:
+                self._tokens -= 1.0
+                self.spent += 1
+                return True
+            return False
+
+
+async def hedged(call: Callable[[], Awaitable[T]], delay: float, budget: HedgeBudget) -> T:
+    """
+    call() を実行し、delay 秒以内に終わらなければ予算の範囲で複製を送る。
+    先に成功した方の結果を返し、残りはキャンセルする。
+    両方失敗した場合は最初の呼び出しの例外を送出する。
+    """
+    budget.on_request()
+    primary = asyncio.ensure_future(call())
+    tasks = [primary]
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=delay)
+        if done or not budget.try_spend():
+            return await primary
+
+        logger.info(f"🏇 Hedging request after {delay:.2f}s")
+        tasks.append(asyncio.ensure_future(call()))
+        pending = set(tasks)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if not task.cancelled() and task.exception() is None:
+                    return task.result()
+        return primary.result()
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
@@ -0,0 +1,241 @@
+"""
+Adaptive Limiter Module - Gemini API 呼び出しの流量制御
+
+責務:
+- AIMD (加算増加・乗算減少) による同時実行数の自動調整
+- 429/503 応答の判定とリトライ待ち時間の計算（サーバーのヒントを優先）
+
+比喩: 道路の混み具合を見ながら、入口の信号の青の長さを調整する交通整理。
+"""
+import asyncio
+import logging
+import random
+import re
+import threading
+import time
+from contextlib import asynccontextmanager
+from typing import Optional
+
+from .config import settings
+
+logger = logging.getLogger("core_limiter")
+
+# 過負荷とみなすHTTPステータス
+OVERLOAD_CODES = (429, 503)
+OVERLOAD_STATUSES = ("RESOURCE_EXHAUSTED", "UNAVAILABLE")
+
+# 乗算減少の係数と、連続した減少を1回にまとめる間隔
+DECREASE_FACTOR = 0.5
+DECREASE_COOLDOWN_SEC = 1.0
+
+
+def is_overload_error(exc: BaseException) -> bool:
+    """レート制限・一時的な過負荷を示す例外か"""
+    code = getattr(exc, "code", None)
+    if code in OVERLOAD_CODES:
+        return True
+    status = getattr(exc, "status", None) or ""
+    if status in OVERLOAD_STATUSES:
+        return True
+    message = str(exc)
+    return any(s in message for s in OVERLOAD_STATUSES)
+
+
+def _parse_duration(value) -> Optional[float]:
+    """'12s' / '1.5s' / '12' 形式を秒に変換"""
+    if value is None:
+        return None
+    match = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*s?\s*", str(value))
+    return float(match.group(1)) if match else None
+
+
+def get_retry_hint(exc: BaseException) -> Optional[float]:
+    """
+    サーバーが指定した待ち時間（秒）を取り出す
+    - Retry-After ヘッダー
+    - google.rpc.RetryInfo の retryDelay
+    """
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None)
+    if headers:
+        try:
+            hint = _parse_duration(headers.get("retry-after"))
+        except Exception:
+            hint = None
+        if hint is not None:
+            return hint
+
+    details = getattr(exc, "details", None)
+    if isinstance(details, dict):
+        error = details.get("error", details)
+        for item in error.get("details", []) if isinstance(error, dict) else []:
+            if isinstance(item, dict) and "retryDelay" in item:
+                return _parse_duration(item["retryDelay"])
+    return None
+
+
+class RetryPolicy:
+    """ジッター付き指数バックオフ (Full Jitter)"""
+
+    def __init__(self, max_retries: int = None, base_delay: float = None, max_delay: float = None):
+        self.max_retries = settings.GEMINI_MAX_RETRIES if max_retries is None else max_retries
+        self.base_delay = settings.GEMINI_RETRY_BASE_DELAY if base_delay is None else base_delay
+        self.max_delay = settings.GEMINI_RETRY_MAX_DELAY if max_delay is None else max_delay
+
+    def delay(self, attempt: int, hint: Optional[float] = None) -> float:
+        """attempt回目 (0始まり) の失敗後に待つ秒数"""
+        if hint is not None:
+            # サーバー指定は守る。ただし上限は超えない
+            return min(hint, self.max_delay)
+        ceiling = min(self.max_delay, self.base_delay * (2 ** attempt))
+        return random.uniform(0, ceiling)
+
+
+class AdaptiveLimiter:
+    """
+    AIMD 同時実行数リミッター
+
+    - 応答が目標レイテンシ以内なら上限を少しずつ増やす (+1 / limit)
+    - 429/503 やタイムアウトを受けたら上限を半分にする
+    待機はループごとの Future で行い、状態は threading.Lock で守るため、
+    別スレッドの複数のイベントループから使ってもよい。
+    """
+
+    def __init__(
+        self,
+        initial: int = None,
+        min_limit: int = None,
+        max_limit: int = None,
+        latency_target: float = None,
+    ):
+        self.min_limit = settings.GEMINI_MIN_CONCURRENCY if min_limit is None else min_limit
+        self.max_limit = settings.GEMINI_MAX_CONCURRENCY if max_limit is None else max_limit
+        initial = settings.GEMINI_INITIAL_CONCURRENCY if initial is None else initial
+        self.limit = float(max(self.min_limit, min(self.max_limit, initial)))
+        self.latency_target = (
+            settings.GEMINI_LATENCY_TARGET_SEC if latency_target is None else latency_target
+        )
+        self.in_flight = 0
+        self.overloads = 0
+        self._waiters: list[asyncio.Future] = []
+        self._last_decrease = 0.0
+        self._lock = threading.Lock()
+
+    def _has_capacity(self) -> bool:
+        return self.in_flight < int(self.limit)
+
+    async def acquire(self) -> None:
+        fut = asyncio.get_running_loop().create_future()
+        with self._lock:
+            if self._has_capacity() and not self._waiters:
+                self.in_flight += 1
+                return
+            self._waiters.append(fut)
+        try:
+            await fut
+        except asyncio.CancelledError:
+            with self._lock:
+                queued = fut in self._waiters
+                if queued:
+                    self._waiters.remove(fut)
+            if not queued and fut.done() and not fut.cancelled():
+                # 枠を受け取った直後にキャンセルされた: 枠を返す
+                self.release()
+            raise
+
+    def release(self, latency: Optional[float] = None, overloaded: bool = False) -> None:
+        with self._lock:
+            self.in_flight -= 1
+            previous = self.limit
+            decreased = False
+            if overloaded:
+                decreased = self._on_overload_locked()
+            elif latency is not None:
+                self._on_success_locked(latency)
+            self._wake_locked()
+            current = self.limit
+        if decreased:
+            logger.warning(f"🚦 Overload: concurrency limit {previous:.1f} -> {current:.1f}")
+
+    def on_success(self, latency: float) -> None:
+        with self._lock:
+            self._on_success_locked(latency)
+            self._wake_locked()
+
+    def on_overload(self) -> None:
+        with self._lock:
+            previous = self.limit
+            decreased = self._on_overload_locked()
+            current = self.limit
+        if decreased:
+            logger.warning(f"🚦 Overload: concurrency limit {previous:.1f} -> {current:.1f}")
+
+    def _on_success_locked(self, latency: float) -> None:
+        if latency <= self.latency_target and self.limit < self.max_limit:
+            self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+
+    def _on_overload_locked(self) -> bool:
+        """上限を下げた場合True (_lock を保持して呼ぶ)"""
+        self.overloads += 1
+        now = time.monotonic()
+        # 同じ混雑で返ってきた429の束は1回の減少として扱う
+        if now - self._last_decrease < DECREASE_COOLDOWN_SEC:
+            return False
+        self._last_decrease = now
+        self.limit = max(float(self.min_limit), self.limit * DECREASE_FACTOR)
+        return True
+
+    def _wake_locked(self) -> None:
+        while self._waiters and self._has_capacity():
+            fut = self._waiters.pop(0)
+            if fut.done():
+                continue
+            self.in_flight += 1
+            fut.get_loop().call_soon_threadsafe(self._grant, fut)
+
+    def _grant(self, fut: asyncio.Future) -> None:
+        if fut.done():
+            # 受け渡し前に待機側がキャンセルされた: 枠を戻す
+            with self._lock:
+                self.in_flight -= 1
+                self._wake_locked()
+            return
+        fut.set_result(None)
+
+    @asynccontextmanager
+    async def slot(self):
+        """
+        上流呼び出し1回分の枠
+        レイテンシを計測し、過負荷の例外やタイムアウトなら上限を下げる
+        """
+        await self.acquire()
+        started = time.monotonic()
+        try:
+            yield
+        except BaseException as e:
+            # GEMINI_TIMEOUT_SEC 切れは、応答が目標を大きく超えた混雑のしるし
+            congested = isinstance(e, asyncio.TimeoutError) or is_overload_error(e)
+            self.release(overloaded=congested)
+            raise
+        else:
+            self.release(latency=time.monotonic() - started)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "limit": round(self.limit, 2),
+                "in_flight": self.in_flight,
+                "waiting": len(self._waiters),
+                "overloads": self.overloads,
+            }
+
+
+# シングルトン: プロセス内の全 GeminiClient で同じクォータを共有する
+_limiter: Optional[AdaptiveLimiter] = None
+
+def get_limiter() -> AdaptiveLimiter:
+    """リミッターのシングルトン取得"""
+    global _limiter
+    if _limiter is None:
+        _limiter = AdaptiveLimiter()
+    return _limiter
@@ -0,0 +1,119 @@
+"""
+Maintenance Module - キャッシュの定期保守
+
+責務:
+- 賞味期限切れの行を、リクエストとは別にチャンク単位でまとめて削除する
+- 期限切れが近く最近よく使われている行を、期限前に先読みキューで作り直す (refresh-ahead)
+- 最近のヒット数を定期的に半減させ、古い人気を忘れる
+
+作り直しは PrefetchQueue (GeminiClient のリミッター配下) に積むので、上流の流量制限を超えない。
+
+比喩: 閉店後に冷蔵庫の期限切れをまとめて捨て、よく出る仕込みは切れる前に作り足す係。
+"""
+import asyncio
+import logging
+from typing import Callable, Optional
+
+from .config import settings
+from .prefetch import PRIORITY_REFRESH
+
+logger = logging.getLogger("core_maintenance")
+
+
+class CacheMaintainer:
+    """
+    キャッシュ保守の定期タスク
+
+    start() で実行中のイベントループ上に起動し、CACHE_MAINTENANCE_INTERVAL_SEC ごとに run_once() を行う。
+
+    Args:
+        processor: CoreProcessor (cache_manager と prefetcher を使う)
+        session_factory: () -> Session。None なら src.infra.database.SessionLocal
+        interval: 実行間隔(秒)。None なら CACHE_MAINTENANCE_INTERVAL_SEC
+    """
+
+    def __init__(self, processor, session_factory: Optional[Callable] = None, interval: float = None):
+        self.processor = processor
+        self._session_factory = session_factory
+        self.interval = settings.CACHE_MAINTENANCE_INTERVAL_SEC if interval is None else interval
+        self._task: Optional[asyncio.Task] = None
+        self.runs = 0
+        self.swept = 0
+        self.refreshed = 0
+
+    @property
+    def session_factory(self) -> Callable:
+        if self._session_factory is None:
+            from src.infra.database import SessionLocal
+            self._session_factory = SessionLocal
+        return self._session_factory
+
+    def start(self) -> None:
+        """定期実行を始める (起動時に1回目を行う)"""
+        if self._task is not None and not self._task.done():
+            return
+        self._task = asyncio.get_running_loop().create_task(self._loop())
+        logger.info(f"🧽 Cache maintenance started (every {self.interval:.0f}s)")
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+
+    async def _loop(self) -> None:
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.error(f"❌ Cache maintenance failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    async def run_once(self) -> dict:
+        """
+        1回分の保守 (期限切れの削除 → 作り直しの予約 → ヒット数の半減)
+
+        Returns:
+            dict: {"swept": 削除した行数, "refreshed": 作り直しを積んだ数}
+        """
+        cache_manager = self.processor.cache_manager
+        swept, candidates = await asyncio.to_thread(self._scan)
+
+        refreshed = 0
+        for text, seasoning in candidates:
+            refreshed += self.processor.prefetcher.submit(
+                text, [seasoning], priority=PRIORITY_REFRESH, refresh=True
+            )
+        cache_manager.decay_hits()
+
+        self.runs += 1
+        self.swept += swept
+        self.refreshed += refreshed
+        if refreshed:
+            logger.info(f"🔄 Refresh-ahead queued: {refreshed}")
+        return {"swept": swept, "refreshed": refreshed}
+
+    def _scan(self) -> tuple[int, list[tuple[str, int]]]:
+        """DB 側の作業 (別スレッドで実行する)"""
+        cache_manager = self.processor.cache_manager
+        db = self.session_factory()
+        try:
+            swept = cache_manager.sweep_expired(db, chunk_size=settings.CACHE_SWEEP_CHUNK)
+            candidates = cache_manager.refresh_candidates(
+                db,
+                ahead_hours=settings.CACHE_REFRESH_AHEAD_HOURS,
+                min_hits=settings.CACHE_REFRESH_MIN_HITS,
+                limit=settings.CACHE_REFRESH_MAX_PER_RUN,
+            )
+            return swept, candidates
+        finally:
+            db.close()
+
+    def stats(self) -> dict:
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "runs": self.runs,
+            "swept": self.swept,
+            "refreshed": self.refreshed,
+        }
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Text, DateTime, JSON, Integer, Boolean
+from sqlalchemy import Column, String, Text, DateTime, JSON, Integer, Boolean, UniqueConstraint
 from sqlalchemy.ext.declarative import declarative_base
 from pydantic import BaseModel, Field
 from datetime import datetime
@@ -7,15 +7,26 @@ from typing import Dict, Optional, Any, List
 Base = declarative_base()
 
 # DB Models
-class PrefetchCache(Base):
-    __tablename__ = "prefetch_cache"
-    hash_id = Column(String, primary_key=True, index=True)
+class CacheEntry(Base):
+    """
+    先読みキャッシュ (v5.1: 1行 = テキスト × 調味レベル × 構成指紋)
+    旧 prefetch_cache (テキストごとの JSON) は init_db で移行される。
+    """
+    __tablename__ = "cache_entries"
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    hash_id = Column(String, nullable=False)
+    seasoning = Column(Integer, nullable=False)
+    fingerprint = Column(String, nullable=False, default="")  # "" = 版数なしの旧形式
     original_text = Column(Text)
-    results = Column(JSON, default={})
+    result = Column(Text)
     # v5.0 Phase 3.5: Lifecycle Management
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
-    last_accessed_at = Column(DateTime, default=datetime.utcnow)
+    last_accessed_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+    __table_args__ = (
+        UniqueConstraint("hash_id", "seasoning", "fingerprint", name="uq_cache_entry_key"),
+    )
 
 class Preset(Base):
     __tablename__ = "presets"
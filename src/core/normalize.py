@@ -0,0 +1,55 @@
+"""
+Text Normalization Module - キャッシュキー・API入力の正規化
+
+責務:
+- Unicode 正規化 (NFKC)
+- 改行の統一 (CRLF / CR → LF) と空行の折りたたみ
+- ゼロ幅文字の除去、行内の連続空白の折りたたみ、行末・前後の空白除去
+
+Windows と Android からコピーした同じ文面が、改行コードや全角スペースの違いで
+別々のキャッシュ行になるのを防ぐ。正規化の規則を変えたら NORMALIZATION_VERSION を上げる
+（キャッシュキーに含まれるので、古い規則で作った結果は使われなくなる）。
+"""
+import re
+import unicodedata
+
+from .config import settings
+
+NORMALIZATION_VERSION = "n1"
+
+# ゼロ幅スペース・結合子・単語結合子・BOM・ソフトハイフン
+_INVISIBLE = re.compile("[\u200b\u200c\u200d\u2060\ufeff\u00ad]")
+# 改行以外の空白 (行頭のインデントは残す)
+_INNER_SPACE = re.compile(r"(?<=\S)[^\S\n]+(?=\S)")
+_TRAILING_SPACE = re.compile(r"[^\S\n]+$", re.MULTILINE)
+_BLANK_LINES = re.compile(r"\n{3,}")
+
+
+def normalize_text(text: str) -> str:
+    """
+    テキストを正規形にする (冪等: 2回かけても結果は変わらない)
+    """
+    if not text:
+        return text
+    text = unicodedata.normalize("NFKC", text)
+    text = text.replace("\r\n", "\n").replace("\r", "\n").replace("\u2028", "\n").replace("\u2029", "\n")
+    text = _INVISIBLE.sub("", text)
+    text = _INNER_SPACE.sub(" ", text)
+    text = _TRAILING_SPACE.sub("", text)
+    text = _BLANK_LINES.sub("\n\n", text)
+    return text.strip()
+
+
+def prepare_text(text: str) -> str:
+    """設定 (TEXT_NORMALIZE) が有効なら正規化する"""
+    return normalize_text(text) if settings.TEXT_NORMALIZE else text
+
+
+def cache_key_text(text: str) -> str:
+    """
+    ハッシュ対象の文字列
+    正規化が有効なら規則のバージョンを前置し、規則の変更で古いキーと衝突しないようにする
+    """
+    if not settings.TEXT_NORMALIZE:
+        return text
+    return f"{NORMALIZATION_VERSION}\x00{normalize_text(text)}"
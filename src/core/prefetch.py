@@ -0,0 +1,251 @@
+"""
+Prefetch Module - 先読みキュー
+
+責務:
+- (テキスト, 調味レベル) のタスクを優先度付きキューで管理
+- ワーカープールが自前のDBセッションで処理する（リクエストのセッションは使わない）
+- 処理中・キュー内の重複と、キャッシュ済みのものを除く
+- 結果はキャッシュに書き込み、/process と GET /prefetch/{text_hash} から読める
+- 投機的先読み (履歴追加時) はユーザーごとの予算内で最低優先度で積み、
+  対話リクエストが混んできたら実行せずに捨てる
+- 期限切れ間近の人気エントリの作り直し (refresh) もここで行う
+
+比喩: 注文が来る前に、よく出るメニューを仕込んでおく厨房の下ごしらえ係。
+"""
+import asyncio
+import itertools
+import logging
+import threading
+import time
+from typing import Callable, Optional
+
+from .config import settings
+from .models import TextRequest
+from .normalize import prepare_text
+from .seasoning import SeasoningManager
+
+logger = logging.getLogger("core_prefetch")
+
+# 数値が小さいほど先に処理する
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 10
+PRIORITY_REFRESH = 15
+PRIORITY_SPECULATIVE = 20
+
+# 予算を記録するユーザー数の上限（古いものから忘れる）
+MAX_QUOTA_USERS = 1024
+
+
+class UserQuota:
+    """
+    ユーザーごとの投機実行の予算 (トークンバケット)
+    1時間あたり per_hour 枚たまり、最大 burst 枚まで貯められる。
+    """
+
+    def __init__(self, per_hour: float, burst: float = None):
+        self.rate = per_hour / 3600.0
+        self.burst = float(per_hour if burst is None else burst)
+        self._buckets: dict[str, tuple[float, float]] = {}
+        self._lock = threading.Lock()
+
+    def try_take(self, user_id: str) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(user_id, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            allowed = tokens >= 1.0
+            if allowed:
+                tokens -= 1.0
+            # 再挿入で末尾に回し、先頭 (最も古い) から忘れる
+            self._buckets[user_id] = (tokens, now)
+            if len(self._buckets) > MAX_QUOTA_USERS:
+                self._buckets.pop(next(iter(self._buckets)))
+            return allowed
+
+
+class PrefetchQueue:
+    """
+    先読みタスクの優先度付きキュー + ワーカープール
+
+    ワーカーは最初の submit 時に、そのイベントループ上で起動する。
+
+    Args:
+        processor: CoreProcessor (生成・キャッシュ書き込みに使う)
+        session_factory: () -> Session。None なら src.infra.database.SessionLocal
+        workers: ワーカー数 (None なら MAX_PREFETCH_WORKERS)
+        max_size: キューの上限 (None なら PREFETCH_QUEUE_MAX)。溢れた分は捨てる
+    """
+
+    def __init__(
+        self,
+        processor,
+        session_factory: Optional[Callable] = None,
+        workers: int = None,
+        max_size: int = None,
+    ):
+        self.processor = processor
+        self._session_factory = session_factory
+        self.workers = max(1, settings.MAX_PREFETCH_WORKERS if workers is None else workers)
+        self.max_size = settings.PREFETCH_QUEUE_MAX if max_size is None else max_size
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._tasks: list[asyncio.Task] = []
+        self._seq = itertools.count()
+        # キュー内・処理中の (hash, level)
+        self._pending: set[tuple[str, int]] = set()
+        self.completed = 0
+        self.skipped = 0
+        self.failed = 0
+        self.dropped = 0
+        self.shed = 0
+        self.quota = UserQuota(settings.SPECULATIVE_QUOTA_PER_HOUR)
+
+    @property
+    def session_factory(self) -> Callable:
+        if self._session_factory is None:
+            from src.infra.database import SessionLocal
+            self._session_factory = SessionLocal
+        return self._session_factory
+
+    def _ensure_started(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is loop and self._tasks:
+            return
+        # 別のイベントループ (テスト・ツール) では作り直す
+        self._loop = loop
+        self._queue = asyncio.PriorityQueue()
+        self._pending.clear()
+        self._tasks = [loop.create_task(self._worker()) for _ in range(self.workers)]
+        logger.info(f"🚀 Prefetch workers started ({self.workers})")
+
+    def submit(self, text: str, seasoning_levels: list[int], priority: int = PRIORITY_NORMAL, refresh: bool = False) -> int:
+        """
+        先読みタスクを積む（イベントループ上から呼ぶ）
+        refresh=True ならキャッシュ済みでも作り直す
+
+        Returns:
+            int: 新たに積んだタスク数（重複・満杯で捨てた分は含まない）
+        """
+        if not text.strip():
+            return 0
+        # /process と同じ前処理・同じハッシュにする (strip すると TEXT_NORMALIZE=False で別キーになる)
+        text = prepare_text(text)
+        self._ensure_started()
+        text_hash = self.processor.cache_manager.get_text_hash(text)
+
+        accepted = 0
+        # 10/50/90 などの旧レベルは3段階に寄せてから重複を除く
+        levels = dict.fromkeys(SeasoningManager.resolve_level(level) for level in seasoning_levels)
+        for level in levels:
+            key = (text_hash, level)
+            if key in self._pending:
+                continue
+            if self._queue.qsize() >= self.max_size:
+                self.dropped += 1
+                logger.warning("⚠️ Prefetch queue full: dropping task")
+                continue
+            self._pending.add(key)
+            self._queue.put_nowait((priority, next(self._seq), text, level, refresh))
+            accepted += 1
+        return accepted
+
+    def submit_speculative(self, text: str, seasoning: int, user_id: str) -> bool:
+        """
+        投機的先読みを積む（履歴に入ったテキストを、次の /process に備えて処理しておく）
+
+        Returns:
+            bool: 積んだか（混雑中・予算切れ・重複なら False）
+        """
+        if not self.allow_speculative(user_id):
+            return False
+        return self.submit(text, [seasoning], priority=PRIORITY_SPECULATIVE) > 0
+
+    def allow_speculative(self, user_id: str) -> bool:
+        """
+        投機的な生成を今してよいか (対話リクエストで混んでいない・利用者の予算が残っている)
+        キューを通さない投機生成 (CoreProcessor の段階プリフィル) もここで判定する
+        """
+        if self._interactive_busy():
+            self.shed += 1
+            return False
+        if not self.quota.try_take(user_id):
+            logger.debug("⏭️ Speculative quota exhausted")
+            return False
+        return True
+
+    def _interactive_busy(self) -> bool:
+        """対話リクエストで上流が混んでいるか (リミッターの待ち行列・使用率で判断)"""
+        limiter = getattr(self.processor.gemini_client, "limiter", None)
+        if limiter is None:
+            return False
+        stats = limiter.stats()
+        return stats["waiting"] > 0 or stats["in_flight"] >= stats["limit"] * settings.SPECULATIVE_MAX_LOAD
+
+    async def _worker(self) -> None:
+        queue = self._queue
+        while True:
+            priority, _, text, level, refresh = await queue.get()
+            try:
+                if priority >= PRIORITY_SPECULATIVE and self._interactive_busy():
+                    # 投機分は対話リクエストに道を譲る
+                    self.shed += 1
+                    continue
+                await self._run_one(text, level, refresh)
+            except Exception as e:
+                self.failed += 1
+                logger.error(f"❌ Prefetch failed: {e}")
+            finally:
+                self._pending.discard((self.processor.cache_manager.get_text_hash(text), level))
+                queue.task_done()
+
+    async def _run_one(self, text: str, level: int, refresh: bool = False) -> None:
+        cache_manager = self.processor.cache_manager
+        prompt_version = cache_manager.current_fingerprint()
+        db = self.session_factory()
+        try:
+            if not refresh and cache_manager.check_cache(db, text, level, prompt_version):
+                self.skipped += 1
+                return
+            # ブレーカーopen時にSyncJobは積まない（先読みは捨ててよい）
+            result = await self.processor.process(
+                TextRequest(text=text, seasoning=level), db, enqueue_on_open=False, use_cache=not refresh
+            )
+            if "error" in result:
+                self.failed += 1
+                logger.info(f"⏭️ Prefetch skipped: {result['error']}")
+                return
+            if not settings.CACHE_FIRST and not result.get("from_cache"):
+                # CACHE_FIRST=False だと process は書き込まないので、ここで書く
+                cache_manager.store_result(db, text, level, result["result"], prompt_version)
+            self.completed += 1
+        finally:
+            db.close()
+
+    def is_pending(self, text_hash: str) -> bool:
+        """このテキストの先読みがキュー内・処理中か"""
+        return any(h == text_hash for h, _ in self._pending)
+
+    async def join(self) -> None:
+        """キューが空になり、処理中のタスクが終わるまで待つ"""
+        if self._queue is not None:
+            await self._queue.join()
+        await self.processor.cache_manager.flush_writes()
+
+    async def stop(self) -> None:
+        """ワーカーを止める（キューに残ったタスクは捨てる）"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._pending.clear()
+
+    def stats(self) -> dict:
+        return {
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "pending": len(self._pending),
+            "completed": self.completed,
+            "skipped": self.skipped,
+            "failed": self.failed,
+            "dropped": self.dropped,
+            "shed": self.shed,
+        }
@@ -6,53 +6,98 @@ Privacy Module - PII検知とマスキング
 import re
 
 
+# 重なりうるパターンは、より具体的なものを先に並べる
+# (結合パターンは左から1回だけ走査し、同じ位置では先に書いた種類が勝つ)
+PII_PATTERNS = {
+    # API Keys (拡張: v4.1)
+    "API_KEY": r"(?:sk-|pk_|AIza|ghp_|gsk_|glpat-|xox[baprs]-|Bearer\s+)[a-zA-Z0-9_-]{20,}",
+    "AWS_KEY": r"AKIA[0-9A-Z]{16}",
+    # パスワード系 (v4.1)
+    "PASSWORD": r"(?i:(?:password|passwd|pwd|secret|token)\s*[=:]\s*['\"]?[^\s'\"]{8,})",
+    # 基本PII (語の途中からは始めない: 先頭から試せば同じ一致になり、無駄な試行を省ける)
+    "EMAIL": r"(?<![a-zA-Z0-9._%+-])[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}",
+    # 拡張パターン (P0-2)
+    "CREDIT_CARD": r"\d{4}[-\s]?\d{4}[-\s]?\d{4}[-\s]?\d{4}",
+    "MY_NUMBER": r"\d{4}[-\s]?\d{4}[-\s]?\d{4}",
+    "IP_ADDRESS": r"\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}",
+    "PHONE": r"\d{2,4}-\d{2,4}-\d{3,4}",
+    "ZIP": r"〒?\d{3}-\d{4}",
+    # 日本住所 (v4.1)
+    "JP_ADDRESS": r"(?:東京都|北海道|(?:京都|大阪)府|[^\s]{2,3}県)[^\s]{2,}[市区町村]",
+}
+
+# 機密キーワード
+# 大文字小文字は区別しない。英字のキーワードは英単語の一部には一致させない
+# ("Standard" の "nda" は NDA ではない)。日本語のキーワードは部分一致 ("社外秘資料" は 社外秘)。
+# scan と mask はこの規則で判定する。check_deny_list だけは英単語の途中でも部分一致で拒否する。
+SENSITIVE_KEYWORDS = [
+    "CONFIDENTIAL",
+    "NDA",
+    "INTERNAL ONLY",
+    "機密",
+    "社外秘",
+    "SECRET",
+    "PRIVATE",
+    "DO NOT SHARE",
+    "取扱注意",
+]
+
+KEYWORD_TYPE = "SENSITIVE_KEYWORD"
+_PLACEHOLDER = re.compile(r"\[(?:PII|VOCAB)_\d+\]")
+
+# 一致の先頭になり得る文字 (それ以外の位置は全分岐を試さずに飛ばす)
+# PII_PATTERNS・SENSITIVE_KEYWORDS に先頭文字の違うものを足したら、ここにも足す
+_MATCH_START = r"(?=[0-9A-Za-z〒._%+\-]|[東北京大機社取]|\S{2,3}県)"
+
+
+def _keyword_pattern(keywords: list[str]) -> str:
+    """キーワードの選択肢 (長いものを先に・大文字小文字無視)"""
+    return "(?i:" + "|".join(re.escape(kw) for kw in sorted(keywords, key=len, reverse=True)) + ")"
+
+
 class PrivacyScanner:
-    """個人情報検知（警告のみ・置換なし）"""
+    """
+    個人情報検知（警告のみ・置換なし）
+
+    全パターンを名前付きグループで1本の正規表現にまとめ、テキストを1回だけ走査する。
+    得られる一致は重ならない (同じ位置では PII_PATTERNS の順で先の種類が勝つ)。
+    """
 
     def __init__(self):
-        self.patterns = {
-            # 基本PII
-            "EMAIL": r"[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}",
-            "PHONE": r"\d{2,4}-\d{2,4}-\d{3,4}",
-            "ZIP": r"〒?\d{3}-\d{4}",
-            "MY_NUMBER": r"\d{4}[-\s]?\d{4}[-\s]?\d{4}",
-            # 拡張パターン (P0-2)
-            "IP_ADDRESS": r"\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}",
-            "CREDIT_CARD": r"\d{4}[-\s]?\d{4}[-\s]?\d{4}[-\s]?\d{4}",
-            # API Keys (拡張: v4.1)
-            "API_KEY": r"(?:sk-|pk_|AIza|ghp_|gsk_|glpat-|xox[baprs]-|Bearer\s+)[a-zA-Z0-9_-]{20,}",
-            "AWS_KEY": r"AKIA[0-9A-Z]{16}",
-            # パスワード系 (v4.1)
-            "PASSWORD": r"(?i)(?:password|passwd|pwd|secret|token)\s*[=:]\s*['\"]?[^\s'\"]{8,}",
-            # 日本住所 (v4.1)
-            "JP_ADDRESS": r"(?:東京都|北海道|(?:京都|大阪)府|[^\s]{2,3}県)[^\s]{2,}[市区町村]",
-        }
-        # 機密キーワード (大文字小文字無視)
-        self.sensitive_keywords = [
-            "CONFIDENTIAL",
-            "NDA",
-            "INTERNAL ONLY",
-            "機密",
-            "社外秘",
-            "SECRET",
-            "PRIVATE",
-            "DO NOT SHARE",
-            "取扱注意",
+        self.patterns = dict(PII_PATTERNS)
+        self.sensitive_keywords = list(SENSITIVE_KEYWORDS)
+        keywords = _keyword_pattern(self.sensitive_keywords)
+        combined = [f"(?P<{p_type}>{pattern})" for p_type, pattern in self.patterns.items()]
+        # キーワードは英単語の一部 (Standard の "nda" 等) には一致させない (マスクで文面を壊さないため)
+        combined.append(f"(?P<{KEYWORD_TYPE}>(?<![A-Za-z]){keywords}(?![A-Za-z]))")
+        self._combined = re.compile(_MATCH_START + "(?:" + "|".join(combined) + ")")
+        # Deny List 用: 部分一致で厳格に判定する
+        self._deny = re.compile(keywords)
+        self._canonical = {kw.upper(): kw for kw in self.sensitive_keywords}
+
+    def find_spans(self, text: str) -> list[tuple[int, int, str, str]]:
+        """
+        重ならない一致の位置 (左から順)
+
+        Returns:
+            list: [(start, end, 種類, 一致した文字列)]
+        """
+        return [
+            (m.start(), m.end(), m.lastgroup, m.group())
+            for m in self._combined.finditer(text)
         ]
 
     def scan(self, text: str) -> dict:
-        findings = {}
-        # Regex パターンマッチ
-        for p_type, pattern in self.patterns.items():
-            matches = re.findall(pattern, text)
-            if matches:
-                findings[p_type] = list(set(matches))
-
-        # キーワードマッチ
-        text_upper = text.upper()
-        keyword_hits = [kw for kw in self.sensitive_keywords if kw.upper() in text_upper]
+        findings: dict[str, list[str]] = {}
+        keyword_hits = set()
+        for _, _, p_type, value in self.find_spans(text):
+            if p_type == KEYWORD_TYPE:
+                keyword_hits.add(self._canonical.get(value.upper(), value))
+            else:
+                findings.setdefault(p_type, set()).add(value)
+        findings = {p_type: list(values) for p_type, values in findings.items()}
         if keyword_hits:
-            findings["SENSITIVE_KEYWORD"] = keyword_hits
+            findings[KEYWORD_TYPE] = [kw for kw in self.sensitive_keywords if kw in keyword_hits]
 
         count = sum(len(v) for v in findings.values())
         return {"has_risks": count > 0, "risks": findings, "risk_count": count}
@@ -65,11 +110,10 @@ class PrivacyScanner:
         Returns:
             tuple: (is_blocked: bool, matched_keyword: str | None)
         """
-        text_upper = text.upper()
-        for kw in self.sensitive_keywords:
-            if kw.upper() in text_upper:
-                return True, kw
-        return False, None
+        m = self._deny.search(text)
+        if m is None:
+            return False, None
+        return True, self._canonical.get(m.group().upper(), m.group())
 
 
 class PrivacyHandler:
@@ -82,49 +126,65 @@ class PrivacyHandler:
     def mask(self, text: str, use_custom_vocab: bool = True) -> tuple[str, dict]:
         """
         PIIをプレースホルダに置換してAPIに送信可能にする。
+        一致の位置から1回の join で組み立てる (同じ値には同じプレースホルダを使う)。
         Returns: (masked_text, mapping)
         """
-        findings = self.scanner.scan(text)
-
-        masked_text = text
         mapping = {}
-        counter = 0
+        placeholders: dict[str, str] = {}
+        pieces = []
+        pos = 0
 
         # 1. Regexベースのマスク
-        if findings["has_risks"]:
-            for pii_type, values in findings["risks"].items():
-                for val in values:
-                    if val in masked_text:  # まだ置換されていない場合のみ
-                        placeholder = f"[PII_{counter}]"
-                        masked_text = masked_text.replace(val, placeholder)
-                        mapping[placeholder] = val
-                        counter += 1
+        for start, end, _, value in self.scanner.find_spans(text):
+            placeholder = placeholders.get(value)
+            if placeholder is None:
+                placeholder = f"[PII_{len(mapping)}]"
+                placeholders[value] = placeholder
+                mapping[placeholder] = value
+            pieces.append(text[pos:start])
+            pieces.append(placeholder)
+            pos = end
+        pieces.append(text[pos:])
+        masked_text = "".join(pieces) if mapping else text
 
         # 2. カスタム語彙ベースのマスク（オプション）
         if use_custom_vocab:
             try:
                 from .vocab_store import get_vocab_store
                 store = get_vocab_store()
-                custom_terms = store.find_in_text(masked_text)
-                for term in custom_terms:
-                    if term in masked_text:
-                        placeholder = f"[VOCAB_{counter}]"
-                        masked_text = masked_text.replace(term, placeholder)
-                        mapping[placeholder] = term
-                        counter += 1
+                spans = store.find_spans(masked_text)
+                if spans:
+                    masked_text = self._mask_terms(masked_text, spans, mapping)
             except Exception:
                 pass  # vocab_storeが利用不可でもフォールバック
 
         return masked_text, mapping
 
+    @staticmethod
+    def _mask_terms(text: str, spans: list[tuple[int, int, str]], mapping: dict) -> str:
+        """語彙ストアのオートマトンが返した位置 (重ならない最左最長一致) で置換する"""
+        placeholders: dict[str, str] = {}
+        pieces = []
+        pos = 0
+        for start, end, term in spans:
+            placeholder = placeholders.get(term)
+            if placeholder is None:
+                placeholder = f"[VOCAB_{len(mapping)}]"
+                placeholders[term] = placeholder
+                mapping[placeholder] = term
+            pieces.append(text[pos:start])
+            pieces.append(placeholder)
+            pos = end
+        pieces.append(text[pos:])
+        return "".join(pieces)
+
     def unmask(self, text: str, mapping: dict) -> str:
         """
         プレースホルダをオリジナルのPIIに復元する。
         """
-        result = text
-        for placeholder, original in mapping.items():
-            result = result.replace(placeholder, original)
-        return result
+        if not mapping:
+            return text
+        return _PLACEHOLDER.sub(lambda m: mapping.get(m.group(), m.group()), text)
 
 
 # --- Backward Compatibility Functions ---
@@ -10,7 +10,7 @@ Logic Module - Core processing logic (Refactored for v5.0 Phase 1)
 from .config import settings
 import uuid
 from sqlalchemy.orm import Session
-from .models import TextRequest, PrefetchCache, SyncJob
+from .models import TextRequest, SyncJob
 from datetime import datetime
 import logging
 from typing import List, Optional
@@ -22,7 +22,7 @@ LONG_TEXT_THRESHOLD = 1000  # Characters threshold for model selection
 # --- Dependencies ---
 from .types import ProcessingResult, DiffLine, ScanResult, ProcessingSuccess, ProcessingError
 from .privacy import PrivacyHandler
-from .gemini import GeminiClient, execute_gemini, execute_gemini_stream
+from .gemini import GeminiClient, execute_gemini, execute_gemini_stream, execute_gemini_stream_async
 from .audit_logger import AuditLogger
 
 # ロガー設定
@@ -35,6 +35,13 @@ logger.setLevel(logging.INFO)
 
 from .seasoning import SeasoningManager
 from .cache import CacheManager
+from .prefetch import PrefetchQueue
+from .seasoning import MULTI_LEVEL_KEYS
+from .maintenance import CacheMaintainer
+from .normalize import prepare_text
+
+# 段階プリフィルの投機予算を数える利用者 (process は利用者を区別しない。監査ログと同じ)
+PREFILL_USER_ID = "anonymous"
 
 # --- Utilities ---
 # get_text_hash, sanitize_log are delegated to CacheManager
@@ -90,6 +97,9 @@ class CoreProcessor:
         self.privacy_handler = PrivacyHandler()
         self.gemini_client = GeminiClient()
         self.audit_logger = AuditLogger()
+        self._background_tasks: set = set()
+        self.prefetcher = PrefetchQueue(self)
+        self.maintainer = CacheMaintainer(self)
 
     def _select_model(self, text: str, seasoning: int) -> str:
         """CostRouter: Speed is priority. Use Flash by default."""
@@ -129,7 +139,8 @@ class CoreProcessor:
             # Reuse process method logic but need to reconstruct Request
             req = TextRequest(text=job.text, seasoning=job.seasoning)
             
-            result = await self.process(req, db)
+            # ジョブ自身を処理中なので、ブレーカーopen時に別ジョブを積まない
+            result = await self.process(req, db, enqueue_on_open=False)
             
             if "error" in result:
                 job.status = "failed"
@@ -147,6 +158,7 @@ class CoreProcessor:
         """
         遅延同期用の同期処理メソッド (v5.0 Phase 4)
         SyncManagerから呼び出される。DBセッションは呼び出し側で管理。
+        イベントループの外 (スクリプト・ワーカースレッド) 専用。ループ内では process_many を await する。
         
         Args:
             text: 処理対象テキスト
@@ -178,25 +190,62 @@ class CoreProcessor:
         except Exception as e:
             return {"success": False, "error": str(e)}
 
+    async def process_many(self, items: list[tuple[str, int]]) -> list[dict]:
+        """
+        複数件を呼び出し元のイベントループ上で並行処理する (process_syncの一括版)
+        同時に走るため、短文はGeminiClientのマイクロバッチにまとめられる。
 
-    async def process(self, req: TextRequest, db: Session = None) -> ProcessingResult:
+        Args:
+            items: [(text, seasoning), ...]
+
+        Returns:
+            list[dict]: items と同じ順序の { success, result, error }
+        """
+        import asyncio
+
+        results = await asyncio.gather(
+            *[self.process(TextRequest(text=text, seasoning=seasoning), db=None) for text, seasoning in items],
+            return_exceptions=True,
+        )
+
+        outputs = []
+        for result in results:
+            if isinstance(result, BaseException):
+                outputs.append({"success": False, "error": str(result)})
+            elif "error" in result:
+                outputs.append({"success": False, "error": result.get("message", str(result.get("error")))})
+            else:
+                outputs.append({"success": True, "result": result.get("result", "")})
+        return outputs
+
+
+    async def process(self, req: TextRequest, db: Session = None, enqueue_on_open: bool = True, use_cache: bool = True) -> ProcessingResult:
         """
         メイン処理パイプライン (v4.1 速度最優先)
+        0. Normalize Text (TEXT_NORMALIZE=True時のみ)
         1. Sanitize Log
-        2. Check Cache
+        2. Check Cache (CACHE_FIRST=True時はAPI呼び出し前)
         3. Mask PII (PRIVACY_MODE=True時のみ)
         4. Select Model
         5. API Call
         6. Unmask PII (PRIVACY_MODE=True時のみ)
+        7. Write-behind Cache (CACHE_FIRST=True時のみ)
+
+        Gemini障害でブレーカーがopenの間は、キャッシュのみで応答し、
+        ミスした場合はSyncJobに積んで即座に返す。
+        use_cache=False は手順2を飛ばして作り直す (期限前の再生成用)。
         """
         # Resolve Seasoning Level (v4.2 3-Stage)
         req.seasoning = SeasoningManager.resolve_level(req.seasoning)
+        # 改行コード・全角スペース等の揺れを吸収 (キャッシュキーとAPI入力を揃える)
+        req.text = prepare_text(req.text)
 
         # ユーザーカスタムプロンプトを統合
         system_prompt = SeasoningManager.get_system_prompt(
             req.seasoning, 
             user_prompt=settings.USER_SYSTEM_PROMPT
         )
+        prompt_version = CacheManager.current_fingerprint()
         config = {
             "system": system_prompt,
             "params": {"temperature": 0.3}
@@ -204,7 +253,12 @@ class CoreProcessor:
         logger.info(f"📩 Processing: {CacheManager.sanitize_log(req.text)} seasoning={req.seasoning}")
 
         # --- Sub-function: Cache Fallback ---
-        try_cache_fallback = lambda: self.cache_manager.check_cache(db, req.text, req.seasoning)
+        try_cache_fallback = lambda: self.cache_manager.check_cache(db, req.text, req.seasoning, prompt_version)
+
+        # 0. Cache-first: 定型文の繰り返しはAPIを呼ばずに返す
+        if settings.CACHE_FIRST and use_cache:
+            cached = try_cache_fallback()
+            if cached: return cached
 
         try:
             # 1. PII Masking (PRIVACY_MODE=False時はスキップ → 速度向上)
@@ -238,6 +292,13 @@ class CoreProcessor:
                 )
                 # ---------------------------
 
+                # Write-behind: コミットを待たずに応答する
+                if settings.CACHE_FIRST:
+                    self.cache_manager.schedule_store(db, req.text, req.seasoning, final_result, prompt_version)
+                    # 他の段階も先に作っておく（レベル切り替えを即キャッシュヒットにする）
+                    if settings.CACHE_PREFILL_LEVELS and db is not None:
+                        self._schedule_prefill_levels(db, req, masked_text, pii_mapping, prompt_version)
+
                 logger.info(f"✅ Success: {CacheManager.sanitize_log(final_result)}")
                 return {
                     "result": final_result, 
@@ -247,6 +308,10 @@ class CoreProcessor:
                 }
             else:
                 logger.warning(f"⚠️ API Failed: {result['error']}")
+                # Circuit Open: 上流を待たずにキャッシュ or 遅延同期
+                if result["error"] == "circuit_open":
+                    return self._degraded_response(req, db, try_cache_fallback, enqueue_on_open)
+
                 # Fallback
                 if result["error"] in ["api_not_configured", "api_error"]:
                     cached = try_cache_fallback()
@@ -269,10 +334,81 @@ class CoreProcessor:
                 "action": "しばらく待ってから再試行してください",
             }
 
-    async def run_prefetch(self, text: str, seasoning_levels: list[int], db: Session) -> None:
-        """先読み処理（バックグラウンド） - Legacy Placeholder"""
-        # Prefetching for spectrum is complex. Disabled for now.
-        pass
+    def _schedule_prefill_levels(self, db: Session, req: TextRequest, masked_text: str, pii_mapping: dict, prompt_version: str) -> None:
+        """
+        今回のレベル以外でキャッシュに無い段階を、バックグラウンドで作っておく
+
+        - 足りない段階が無ければ何もしない
+        - 1段階だけなら先読みキューに投機優先度で積む (3段階分を生成しない)
+        - 2段階以上なら3段階一括生成を1回呼ぶ (投機的先読みと同じく、混雑時・予算切れなら見送る)
+        """
+        import asyncio
+
+        others = [level for level in MULTI_LEVEL_KEYS if level != req.seasoning]
+        cached = self.cache_manager.cached_levels(db, req.text, others, prompt_version)
+        missing = [level for level in others if level not in cached]
+        if not missing:
+            return
+        if len(missing) == 1:
+            self.prefetcher.submit_speculative(req.text, missing[0], PREFILL_USER_ID)
+            return
+        if not self.prefetcher.allow_speculative(PREFILL_USER_ID):
+            logger.info("⏭️ Level prefill skipped: upstream busy or quota exhausted")
+            return
+
+        async def prefill():
+            config = {
+                "system": SeasoningManager.get_multi_level_prompt(user_prompt=settings.USER_SYSTEM_PROMPT),
+                "params": {"temperature": 0.3}
+            }
+            res = await self.gemini_client.generate_multi_level(masked_text, config)
+            if not res["success"]:
+                logger.info(f"⏭️ Level prefill skipped: {res.get('error')}")
+                return
+            filled = {}
+            for level, text in res["results"].items():
+                if level not in missing:
+                    continue
+                if pii_mapping:
+                    text = self.privacy_handler.unmask(text, pii_mapping)
+                filled[level] = text
+            if filled:
+                self.cache_manager.schedule_store_results(db, req.text, filled, prompt_version)
+
+        task = asyncio.get_running_loop().create_task(prefill())
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+
+    def _degraded_response(self, req: TextRequest, db: Session, try_cache_fallback, enqueue_on_open: bool) -> ProcessingResult:
+        """ブレーカーopen時の応答: キャッシュ → SyncJob登録 → エラー"""
+        cached = try_cache_fallback()
+        if cached: return cached
+
+        if db is not None and enqueue_on_open and settings.BREAKER_ENQUEUE_ON_OPEN:
+            job_id = self.create_sync_job(req, db)
+            logger.info(f"📥 Circuit open: queued as job {job_id[:8]}...")
+            return {
+                "error": "circuit_open",
+                "message": "AIサービスが一時的に利用できません。復旧後に処理します",
+                "action": f"/jobs/{job_id} で結果を確認してください",
+                "job_id": job_id,
+            }
+
+        return {
+            "error": "circuit_open",
+            "message": "AIサービスが一時的に利用できません",
+            "action": "しばらく待ってから再試行してください",
+        }
+
+    async def run_prefetch(self, text: str, seasoning_levels: list[int], db: Session = None) -> int:
+        """
+        先読み処理をキューに積む（処理はワーカーが自前のセッションで行う）
+        db はリクエスト終了後に閉じられるため使わない（互換のため引数は残す）
+
+        Returns:
+            int: 新たに積んだタスク数
+        """
+        return self.prefetcher.submit(text, seasoning_levels)
 
 # --- Backward Capability Shortcuts ---
 # main.py 等が古いままでも動くようにする (ただし main.py も更新予定)
@@ -281,5 +417,5 @@ _core = CoreProcessor()
 async def process_async(req: TextRequest, db: Session = None) -> dict:
     return await _core.process(req, db)
 
-async def run_prefetch(text: str, seasoning_levels: list[int], db: Session) -> None:
+async def run_prefetch(text: str, seasoning_levels: list[int], db: Session = None) -> int:
     return await _core.run_prefetch(text, seasoning_levels, db)
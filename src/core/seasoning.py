@@ -1,3 +1,6 @@
+import hashlib
+from functools import lru_cache
+
 # ========================================
 # Flow v4.1: 下処理の美学 (Pre-processing Philosophy)
 # ========================================
@@ -17,6 +20,17 @@ RESOLVED_LIGHT = 30
 RESOLVED_MEDIUM = 60
 RESOLVED_RICH = 100
 
+# プロンプト版数 (get_system_prompt の文面を変えたら上げる)
+# キャッシュキーに含め、旧プロンプトの出力を返さないようにする
+PROMPT_VERSION = "4.2"
+
+# 3段階一括生成 (JSON出力) のキー
+MULTI_LEVEL_KEYS = {
+    RESOLVED_LIGHT: "light",
+    RESOLVED_MEDIUM: "medium",
+    RESOLVED_RICH: "rich",
+}
+
 
 class SeasoningManager:
     """
@@ -77,6 +91,45 @@ class SeasoningManager:
             return f"{base}\n\n追加指示: {user_prompt}"
         return base
 
+    @staticmethod
+    def get_multi_level_prompt(user_prompt: str = "") -> str:
+        """
+        Light/Medium/Rich の3段階を1回で生成するためのシステムプロンプト
+        出力は {"light": ..., "medium": ..., "rich": ...} のJSONオブジェクト
+        """
+        sections = [
+            f"[{key}]\n{SeasoningManager.get_system_prompt(level)}"
+            for level, key in MULTI_LEVEL_KEYS.items()
+        ]
+        keys = ", ".join(f'"{key}"' for key in MULTI_LEVEL_KEYS.values())
+        base = (
+            "入力文に対して、以下の各指示をそれぞれ独立に適用してください。\n\n"
+            + "\n\n".join(sections)
+            + f"\n\n出力はキー {keys} を持つJSONオブジェクトのみ。各値は該当する指示の出力テキスト。"
+        )
+        if user_prompt:
+            return f"{base}\n\n追加指示: {user_prompt}"
+        return base
+
+    @staticmethod
+    @lru_cache(maxsize=32)
+    def get_fingerprint(user_prompt: str = "", models: tuple = ()) -> str:
+        """
+        キャッシュキー用の構成指紋
+
+        プロンプト版数に、実際のプロンプト文面（各段階・一括生成）・ユーザー指示・
+        モデル名のハッシュを付与する。PROMPT_VERSION を上げ忘れても、
+        文面やモデルを変えれば別キャッシュになる。
+        """
+        digest = hashlib.sha256()
+        for level in MULTI_LEVEL_KEYS:
+            digest.update(SeasoningManager.get_system_prompt(level, user_prompt).encode())
+            digest.update(b"\0")
+        digest.update(SeasoningManager.get_multi_level_prompt(user_prompt).encode())
+        digest.update(b"\0")
+        digest.update("\0".join(models).encode())
+        return f"{PROMPT_VERSION}#{digest.hexdigest()[:10]}"
+
     @staticmethod
     def get_level_label(level: int) -> str:
         """レベルの日本語ラベル"""
@@ -0,0 +1,157 @@
+"""
+Near-Duplicate Module - 類似テキストのキャッシュ検索
+
+責務:
+- 文字 n-gram の MinHash 署名 (One Permutation Hashing + 密化)
+- LSH バンド索引による候補の絞り込み
+- 署名の一致率で類似度を見積もり、閾値以上なら同一視する
+
+比喩: 指紋の一部 (バンド) が一致した人だけを呼び出して、残りの指紋を照合する。
+全員と照合しないので、登録数が増えても速い。
+
+注意: Termux 環境のため NumPy は使わず、純 Python で実装する。
+署名は1テキストあたり n-gram 数に比例する計算量で作る (順列ごとのハッシュは計算しない)。
+"""
+import logging
+import threading
+from array import array
+from typing import Iterable, Optional
+
+logger = logging.getLogger("core_similarity")
+
+NGRAM_SIZE = 3
+NUM_HASHES = 32
+BANDS = 8
+ROWS = NUM_HASHES // BANDS
+
+_EMPTY = 0xFFFFFFFF
+_MASK64 = (1 << 64) - 1
+
+
+def shingles(text: str, n: int = NGRAM_SIZE) -> set[str]:
+    """文字 n-gram の集合 (短いテキストは全体を1つとする)"""
+    if len(text) <= n:
+        return {text}
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+
+def signature(text: str) -> array:
+    """
+    MinHash 署名 (NUM_HASHES 個の 32bit 値)
+
+    One Permutation Hashing: 各 n-gram を1回だけハッシュし、
+    下位ビットでビンを選び、残りのビットの最小値をビンに残す。
+    空のビンは他の埋まったビンから借りる (密化)。
+    ハッシュは組み込み hash() を使うため、署名はプロセス内でのみ有効。
+    """
+    bins = [_EMPTY] * NUM_HASHES
+    for gram in shingles(text):
+        h = hash(gram) & _MASK64
+        index = h % NUM_HASHES
+        value = (h >> 8) & 0xFFFFFFFF
+        if value < bins[index]:
+            bins[index] = value
+
+    filled = [v != _EMPTY for v in bins]
+    if any(filled) and not all(filled):
+        for i in range(NUM_HASHES):
+            if filled[i]:
+                continue
+            # 最適密化: ビンごとに決まった順序で他のビンを探し、最初に埋まっていたビンを借りる
+            # (同じ空きビンは両方のテキストで同じ順序で探すので、一致率の推定が偏らない)
+            attempt = 0
+            while True:
+                donor = hash((i, attempt)) % NUM_HASHES
+                if filled[donor]:
+                    bins[i] = bins[donor]
+                    break
+                attempt += 1
+    return array("I", bins)
+
+
+def estimate_similarity(a: array, b: array) -> float:
+    """署名の一致率 = Jaccard 係数の推定値"""
+    return sum(1 for x, y in zip(a, b) if x == y) / NUM_HASHES
+
+
+def _band_keys(sig: array) -> list[int]:
+    return [hash((band, *sig[band * ROWS:(band + 1) * ROWS])) for band in range(BANDS)]
+
+
+class NearDuplicateIndex:
+    """
+    LSH バンド索引 (hash_id -> 署名)
+
+    8バンド × 4行: Jaccard 0.8 の組を約98%、0.5 の組を約40%の確率で候補に拾い、
+    最終判定は署名の一致率と閾値で行う。
+    """
+
+    def __init__(self, threshold: float = 0.9):
+        self.threshold = threshold
+        self._signatures: dict[str, array] = {}
+        self._bands: list[dict[int, list[str]]] = [{} for _ in range(BANDS)]
+        self._lock = threading.Lock()
+        self.loaded = False
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    def add(self, hash_id: str, text: str) -> None:
+        sig = signature(text)
+        with self._lock:
+            if hash_id in self._signatures:
+                self._remove_locked(hash_id)
+            self._signatures[hash_id] = sig
+            for band, key in zip(self._bands, _band_keys(sig)):
+                band.setdefault(key, []).append(hash_id)
+
+    def add_many(self, items: Iterable[tuple[str, str]]) -> int:
+        count = 0
+        for hash_id, text in items:
+            self.add(hash_id, text)
+            count += 1
+        return count
+
+    def remove(self, hash_id: str) -> None:
+        with self._lock:
+            self._remove_locked(hash_id)
+
+    def _remove_locked(self, hash_id: str) -> None:
+        sig = self._signatures.pop(hash_id, None)
+        if sig is None:
+            return
+        for band, key in zip(self._bands, _band_keys(sig)):
+            bucket = band.get(key)
+            if bucket is None:
+                continue
+            if hash_id in bucket:
+                bucket.remove(hash_id)
+            if not bucket:
+                del band[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._signatures.clear()
+            for band in self._bands:
+                band.clear()
+            self.loaded = False
+
+    def find(self, text: str, exclude: Optional[str] = None) -> Optional[tuple[str, float]]:
+        """
+        最も似ている登録済みテキストを探す
+
+        Returns:
+            (hash_id, 類似度) or None (閾値未満)
+        """
+        sig = signature(text)
+        with self._lock:
+            candidates = set()
+            for band, key in zip(self._bands, _band_keys(sig)):
+                candidates.update(band.get(key, ()))
+            candidates.discard(exclude)
+            best = None
+            for hash_id in candidates:
+                score = estimate_similarity(sig, self._signatures[hash_id])
+                if score >= self.threshold and (best is None or score > best[1]):
+                    best = (hash_id, score)
+        return best
@@ -0,0 +1,64 @@
+"""
+Single-flight Module - 同一リクエストの合流
+
+責務: 実行中の同一キーの呼び出しを1本にまとめ、結果（例外も含む）を共有する
+
+比喩: 同じ荷物を取りに来た人が何人いても、倉庫に走るのは1人だけ。
+"""
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Hashable
+
+logger = logging.getLogger("core_singleflight")
+
+
+class _Call:
+    """実行中の上流呼び出しと、それを待っている呼び出し元の数"""
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    同一キーの並行呼び出しを合流させる
+
+    - 最初の呼び出し元が上流タスクを起動し、後続は同じタスクを待つ
+    - 1人がキャンセルしても他の呼び出し元には影響しない
+    - 全員がいなくなったら上流タスクもキャンセルする
+    """
+
+    def __init__(self):
+        self._calls: dict[Hashable, _Call] = {}
+        self.shared = 0  # 合流によって省略された上流呼び出しの数
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        call = self._calls.get(key)
+        if call is None:
+            call = _Call(asyncio.ensure_future(fn()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda _t, k=key, c=call: self._forget(k, c))
+        else:
+            self.shared += 1
+            logger.debug("🔗 Joined in-flight request")
+
+        call.waiters += 1
+        try:
+            # shield: この呼び出し元のキャンセルを上流タスクに伝播させない
+            return await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                # 誰も待っていない上流呼び出しは打ち切る
+                self._forget(key, call)
+                call.task.cancel()
+
+    def _forget(self, key: Hashable, call: _Call) -> None:
+        # 後から同じキーで始まった別の呼び出しは消さない
+        if self._calls.get(key) is call:
+            del self._calls[key]
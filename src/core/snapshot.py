@@ -0,0 +1,236 @@
+"""
+Snapshot Module - キャッシュのスナップショット (書き出し・取り込み)
+
+責務:
+- CacheEntry を gzip 圧縮の JSON Lines で書き出す (先頭にバージョン付きヘッダ、末尾に件数)
+- 1行ずつ読みながら取り込む (ファイル全体をメモリに載せない)
+- 衝突の解決: 構成指紋が現在と違う行は取り込まない / 同じキーは新しい方を残す
+
+PC で一度 Warmup した結果を、Termux のスマホに配って API 代を払わずに温める。
+
+形式 (1行1JSON):
+    {"format": "flow-cache-snapshot", "version": 1, "normalization": "n1", "fingerprint": "...", "exported_at": "..."}
+    {"s": 30, "f": "4.2#abc", "t": "原文", "r": "結果", "c": "作成時刻", "a": "参照時刻"}
+    ...
+    {"end": true, "count": 123}
+
+ハッシュは書き出さない (取り込む側の正規化規則で原文から計算し直す)。
+"""
+import gzip
+import io
+import json
+import logging
+import zlib
+from datetime import datetime
+from typing import IO, Iterator, Optional
+
+from sqlalchemy.orm import Session
+
+from .models import CacheEntry
+from .normalize import NORMALIZATION_VERSION
+
+logger = logging.getLogger("core_snapshot")
+
+SNAPSHOT_FORMAT = "flow-cache-snapshot"
+SNAPSHOT_VERSION = 1
+
+CONFLICT_NEWER = "newer"  # 作成時刻が新しい方を残す
+CONFLICT_SKIP = "skip"  # 手元の行を残す
+CONFLICT_OVERWRITE = "overwrite"  # 常にスナップショットで上書き
+CONFLICT_POLICIES = (CONFLICT_NEWER, CONFLICT_SKIP, CONFLICT_OVERWRITE)
+
+
+class SnapshotError(ValueError):
+    """スナップショットの形式・バージョンが不正"""
+
+
+def _dumps(obj: dict) -> bytes:
+    return (json.dumps(obj, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+
+
+def _iso(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value else None
+
+
+def _parse_time(value: Optional[str]) -> Optional[datetime]:
+    return datetime.fromisoformat(value) if value else None
+
+
+def iter_snapshot(db: Session, fingerprint: Optional[str] = None, chunk_size: int = 500) -> Iterator[bytes]:
+    """
+    スナップショットを gzip のバイト列として少しずつ返す (StreamingResponse・ファイル書き出し用)
+
+    Args:
+        db: Database session
+        fingerprint: 指定するとその構成指紋の行だけ書き出す (None なら全行)
+        chunk_size: 1回に読む行数 (id のキーセットで辿る)
+    """
+    from .cache import CacheManager
+
+    compressor = zlib.compressobj(9, zlib.DEFLATED, 31)  # wbits=31: gzip 形式
+    header = {
+        "format": SNAPSHOT_FORMAT,
+        "version": SNAPSHOT_VERSION,
+        "normalization": NORMALIZATION_VERSION,
+        "fingerprint": CacheManager.current_fingerprint(),
+        "exported_at": datetime.utcnow().isoformat(),
+    }
+    yield compressor.compress(_dumps(header))
+
+    count = 0
+    last_id = 0
+    while True:
+        query = db.query(CacheEntry).filter(CacheEntry.id > last_id)
+        if fingerprint is not None:
+            query = query.filter(CacheEntry.fingerprint == fingerprint)
+        rows = query.order_by(CacheEntry.id.asc()).limit(chunk_size).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+        buf = bytearray()
+        for row in rows:
+            if row.result is None or row.result.startswith("Error:") or not row.original_text:
+                continue
+            buf += _dumps({
+                "s": row.seasoning,
+                "f": row.fingerprint or "",
+                "t": row.original_text,
+                "r": row.result,
+                "c": _iso(row.created_at),
+                "a": _iso(row.last_accessed_at),
+            })
+            count += 1
+        chunk = compressor.compress(bytes(buf))
+        if chunk:
+            yield chunk
+        db.expunge_all()
+
+    yield compressor.compress(_dumps({"end": True, "count": count}))
+    yield compressor.flush()
+    logger.info(f"📤 Snapshot exported: {count} entries")
+
+
+def export_snapshot(db: Session, path, fingerprint: Optional[str] = None) -> int:
+    """
+    スナップショットをファイルに書き出す
+
+    Returns:
+        int: 書き出したバイト数
+    """
+    size = 0
+    with open(path, "wb") as f:
+        for chunk in iter_snapshot(db, fingerprint=fingerprint):
+            f.write(chunk)
+            size += len(chunk)
+    return size
+
+
+def import_snapshot(
+    db: Session,
+    cache_manager,
+    source: IO[bytes],
+    on_conflict: str = CONFLICT_NEWER,
+    all_fingerprints: bool = False,
+    chunk_size: int = 500,
+) -> dict:
+    """
+    スナップショットを1行ずつ読みながら取り込む (chunk_size 行ごとにコミット)
+
+    Args:
+        db: Database session
+        cache_manager: CacheManager (ハッシュ計算・書き込みロック・L1 等の整合に使う)
+        source: gzip のバイナリストリーム (ファイル・アップロードの一時ファイル)
+        on_conflict: 同じ (hash, seasoning, fingerprint) があるとき "newer" / "skip" / "overwrite"
+        all_fingerprints: True なら現在と違う構成指紋の行も取り込む (既定は捨てる)
+
+    Returns:
+        dict: {"imported", "updated", "skipped", "stale", "invalid", "complete"}
+
+    Raises:
+        SnapshotError: ヘッダの形式・バージョンが不正
+    """
+    if on_conflict not in CONFLICT_POLICIES:
+        raise SnapshotError(f"unknown conflict policy: {on_conflict}")
+
+    stats = {"imported": 0, "updated": 0, "skipped": 0, "stale": 0, "invalid": 0, "complete": False}
+    fingerprint = cache_manager.current_fingerprint()
+
+    with io.TextIOWrapper(gzip.GzipFile(fileobj=source, mode="rb"), encoding="utf-8") as lines:
+        try:
+            header = json.loads(next(lines, "") or "{}")
+        except (OSError, EOFError, json.JSONDecodeError) as e:
+            raise SnapshotError(f"not a cache snapshot: {e}") from e
+        if header.get("format") != SNAPSHOT_FORMAT:
+            raise SnapshotError("not a cache snapshot")
+        if header.get("version") != SNAPSHOT_VERSION:
+            raise SnapshotError(f"unsupported snapshot version: {header.get('version')}")
+
+        batch: list[dict] = []
+        try:
+            for line in lines:
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    stats["invalid"] += 1
+                    continue
+                if not isinstance(record, dict):
+                    stats["invalid"] += 1
+                    continue
+                if record.get("end"):
+                    stats["complete"] = True
+                    break
+                if not isinstance(record.get("t"), str) or not isinstance(record.get("r"), str):
+                    stats["invalid"] += 1
+                    continue
+                if not all_fingerprints and record.get("f", "") != fingerprint:
+                    # 手元の構成では使われない結果 (起動時の回収で消える)
+                    stats["stale"] += 1
+                    continue
+                batch.append(record)
+                if len(batch) >= chunk_size:
+                    _import_batch(db, cache_manager, batch, on_conflict, stats)
+                    batch = []
+        except (OSError, EOFError) as e:
+            # 途中で切れたファイル: それまでの分は取り込み済み
+            logger.warning(f"⚠️ Snapshot truncated: {e}")
+        if batch:
+            _import_batch(db, cache_manager, batch, on_conflict, stats)
+
+    cache_manager.after_bulk_import(db)
+    logger.info(
+        f"📥 Snapshot imported: {stats['imported']} new, {stats['updated']} updated, "
+        f"{stats['skipped']} kept, {stats['stale']} stale"
+    )
+    return stats
+
+
+def _import_batch(db: Session, cache_manager, batch: list[dict], on_conflict: str, stats: dict) -> None:
+    now = datetime.utcnow()
+    entries = {}
+    for record in batch:
+        try:
+            seasoning = int(record["s"])
+            created_at = _parse_time(record.get("c")) or now
+            accessed_at = _parse_time(record.get("a")) or created_at
+        except (KeyError, TypeError, ValueError):
+            stats["invalid"] += 1
+            continue
+        key = (cache_manager.get_text_hash(record["t"]), seasoning, record.get("f", ""))
+        entries[key] = {
+            "original_text": record["t"],
+            "result": record["r"],
+            "created_at": created_at,
+            "last_accessed_at": accessed_at,
+        }
+
+    def replace(row: CacheEntry, entry: dict) -> bool:
+        if on_conflict == CONFLICT_OVERWRITE:
+            return True
+        return on_conflict == CONFLICT_NEWER and row.created_at is not None and entry["created_at"] > row.created_at
+
+    written = cache_manager.bulk_upsert(db, entries, replace)
+    stats["imported"] += written["inserted"]
+    stats["updated"] += written["updated"]
+    stats["skipped"] += written["skipped"]
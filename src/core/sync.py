@@ -67,6 +67,51 @@ class SyncManager:
             SyncJob.status == "pending"
         ).order_by(SyncJob.created_at.asc()).limit(limit).all()
 
+    def _begin_job(self, db: Session, job: SyncJob) -> None:
+        """排他制御: status を processing に変更"""
+        job.status = "processing"
+        job.updated_at = datetime.utcnow()
+        db.commit()
+        logger.info(f"⚙️ Processing Job: {job.id[:8]}...")
+
+    def _reset_jobs(self, db: Session, jobs: List[SyncJob]) -> None:
+        """processing にしたまま結果の無いジョブを pending に戻す (再試行回数は数えない)"""
+        try:
+            db.rollback()
+            for job in jobs:
+                if job.status == "processing":
+                    job.status = "pending"
+                    job.updated_at = datetime.utcnow()
+            db.commit()
+            logger.warning(f"↩️ Batch interrupted: {len(jobs)} jobs returned to pending")
+        except Exception as e:
+            logger.error(f"❌ Failed to return interrupted jobs to pending: {e}")
+            db.rollback()
+
+    def _finish_job(self, db: Session, job: SyncJob, result: Dict[str, Any]) -> bool:
+        """処理結果をジョブに反映する。成功なら True"""
+        if result.get("success"):
+            job.result = result.get("result")
+            job.status = "completed"
+            job.error_message = None
+            logger.info(f"✅ Job Completed: {job.id[:8]}")
+            db.commit()
+            return True
+
+        error = result.get("error", "Unknown error")
+        job.retry_count += 1
+        job.error_message = str(error)
+        
+        if job.retry_count >= MAX_RETRY_COUNT:
+            job.status = "failed"
+            logger.error(f"❌ Job Failed (Max Retry): {job.id[:8]} - {error}")
+        else:
+            job.status = "pending"  # 再試行可能
+            logger.warning(f"⚠️ Job Retry ({job.retry_count}/{MAX_RETRY_COUNT}): {job.id[:8]} - {error}")
+        
+        db.commit()
+        return False
+
     def process_job(self, db: Session, job: SyncJob, processor) -> bool:
         """
         個別ジョブを処理する
@@ -74,52 +119,27 @@ class SyncManager:
         Args:
             db: Database session
             job: 処理対象ジョブ
-            processor: CoreProcessor インスタンス (process メソッドを持つ)
+            processor: CoreProcessor インスタンス (process_sync メソッドを持つ)
         
         Returns:
             success: 成功なら True
         """
-        # 1. 排他制御: status を processing に変更
-        job.status = "processing"
-        job.updated_at = datetime.utcnow()
-        db.commit()
-        logger.info(f"⚙️ Processing Job: {job.id[:8]}...")
+        self._begin_job(db, job)
 
         try:
-            # 2. 処理実行
             result = processor.process_sync(job.text, job.seasoning)
-            
-            if result.get("success"):
-                job.result = result.get("result")
-                job.status = "completed"
-                job.error_message = None
-                logger.info(f"✅ Job Completed: {job.id[:8]}")
-                db.commit()
-                return True
-            else:
-                raise Exception(result.get("error", "Unknown error"))
-
         except Exception as e:
-            job.retry_count += 1
-            job.error_message = str(e)
-            
-            if job.retry_count >= MAX_RETRY_COUNT:
-                job.status = "failed"
-                logger.error(f"❌ Job Failed (Max Retry): {job.id[:8]} - {e}")
-            else:
-                job.status = "pending"  # 再試行可能
-                logger.warning(f"⚠️ Job Retry ({job.retry_count}/{MAX_RETRY_COUNT}): {job.id[:8]} - {e}")
-            
-            db.commit()
-            return False
+            result = {"success": False, "error": str(e)}
+        return self._finish_job(db, job, result)
 
-    def process_pending(self, db: Session, processor, limit: int = 10) -> Dict[str, int]:
+    async def process_pending(self, db: Session, processor, limit: int = 10) -> Dict[str, int]:
         """
         未処理ジョブをまとめて処理する (バッチ処理)
+        ジョブは並行に実行されるため、短文はマイクロバッチにまとめられる。
         
         Args:
             db: Database session
-            processor: CoreProcessor インスタンス
+            processor: CoreProcessor インスタンス (process_many メソッドを持つ)
             limit: 一度に処理する最大件数
         
         Returns:
@@ -129,10 +149,24 @@ class SyncManager:
         
         jobs = self.get_pending_jobs(db, limit)
         stats["total"] = len(jobs)
-        
+        if not jobs:
+            return stats
+
         for job in jobs:
-            success = self.process_job(db, job, processor)
-            if success:
+            self._begin_job(db, job)
+
+        try:
+            results = await processor.process_many([(job.text, job.seasoning) for job in jobs])
+        except Exception as e:
+            results = [{"success": False, "error": str(e)} for _ in jobs]
+        except BaseException:
+            # キャンセル (シャットダウン・リクエスト中断) 等: 結果の無いジョブを pending に戻してから伝える
+            # processing のまま残すと get_pending_jobs が二度と拾わない
+            self._reset_jobs(db, jobs)
+            raise
+        
+        for job, result in zip(jobs, results):
+            if self._finish_job(db, job, result):
                 stats["processed"] += 1
             else:
                 stats["failed"] += 1
@@ -2,7 +2,7 @@
 Core Types Definition
 By introducing TypedDict, we enforce type safety on dictionary structures used across the application.
 """
-from typing import TypedDict, List, Optional, Union, Literal
+from typing import TypedDict, List, Optional, Union, Literal, NotRequired
 
 class DiffLine(TypedDict):
     """Line-by-line diff result"""
@@ -16,12 +16,14 @@ class ProcessingSuccess(TypedDict):
     seasoning: int
     model_used: Optional[str]
     from_cache: Optional[bool]
+    similarity: NotRequired[float]  # 類似テキストのキャッシュを流用した場合の類似度
 
 class ProcessingError(TypedDict):
     """Failed processing result"""
     error: str
     message: Optional[str]
     action: Optional[str]
+    job_id: NotRequired[str]  # circuit_open時に積んだSyncJob
 
 # Union type for function return signatures
 ProcessingResult = Union[ProcessingSuccess, ProcessingError]
@@ -0,0 +1,175 @@
+"""
+Vocab Index Module - コンパイル済み語彙オートマトン (mmap で複数プロセスが共有)
+
+責務:
+- AhoCorasick の表を平らなバイナリファイルに書き出す (一時ファイル → os.replace で差し替え)
+- ファイルを読み取り専用で mmap し、展開せずにそのまま走査する
+- 版 (語彙のリビジョン) をヘッダに刻み、どの時点の語彙から作ったかを判別できるようにする
+
+uvicorn のワーカーやデスクトップアプリがそれぞれ2万語のトライを組み立て直さずに済み、
+ページキャッシュ上の同じファイルを共有する。
+
+形式 (ネイティブのバイト順・4バイト整数):
+    ヘッダ 64バイト: magic, 形式バージョン, バイト順の目印, ノード数, 辺数, 語数, リビジョン
+    fail[ノード数] out[ノード数] dict[ノード数] first[ノード数+1] chars[辺数] targets[辺数]
+ノード i の子は chars[first[i]:first[i+1]] (文字コード順) を二分探索して引く。
+"""
+import logging
+import mmap
+import os
+import struct
+import tempfile
+from array import array
+from bisect import bisect_left
+from pathlib import Path
+from typing import Optional
+
+from .aho_corasick import AhoCorasick
+
+logger = logging.getLogger(__name__)
+
+INDEX_MAGIC = b"FLOWACIX"
+INDEX_FORMAT_VERSION = 1
+_BYTE_ORDER_MARK = 0x01020304
+_HEADER = struct.Struct("=8sIIIIIxxxxQ")  # magic, version, bom, nodes, edges, terms, (pad), revision
+_HEADER_SIZE = 64
+
+
+class IndexFormatError(ValueError):
+    """コンパイル済みファイルが壊れている・形式が違う"""
+
+
+def compile_index(matcher: AhoCorasick, path: Path, revision: int) -> int:
+    """
+    オートマトンをファイルに書き出す (書き終えてから差し替えるので、読み手が半端な中身を見ることはない)
+
+    Returns:
+        int: 書き出したバイト数
+    """
+    fail, out, dict_link, children = matcher.tables()
+    first = [0]
+    chars: list[int] = []
+    targets: list[int] = []
+    for edges in children:
+        for code, child in edges:
+            chars.append(code)
+            targets.append(child)
+        first.append(len(chars))
+
+    header = _HEADER.pack(
+        INDEX_MAGIC, INDEX_FORMAT_VERSION, _BYTE_ORDER_MARK,
+        len(fail), len(chars), len(matcher), revision,
+    ).ljust(_HEADER_SIZE, b"\0")
+
+    path = Path(path)
+    fd, tmp = tempfile.mkstemp(prefix=path.name + ".", suffix=".tmp", dir=path.parent)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(header)
+            for values in (fail, out, dict_link, first, chars, targets):
+                array("I", values).tofile(f)
+            size = f.tell()
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+    return size
+
+
+class CompiledIndex:
+    """
+    mmap したコンパイル済みオートマトン (読み取り専用・AhoCorasick と同じ find_spans / find_terms)
+
+    古いインスタンスは参照が無くなった時点で閉じられるので、走査中に差し替えても安全。
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        with open(self.path, "rb") as f:
+            st = os.fstat(f.fileno())
+            if st.st_size < _HEADER_SIZE:
+                raise IndexFormatError("vocab index is truncated")
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, bom, nodes, edges, terms, revision = _HEADER.unpack_from(self._mmap, 0)
+        if magic != INDEX_MAGIC:
+            raise IndexFormatError("not a vocab index")
+        if version != INDEX_FORMAT_VERSION:
+            raise IndexFormatError(f"unsupported vocab index version: {version}")
+        if bom != _BYTE_ORDER_MARK:
+            raise IndexFormatError("vocab index was compiled on a machine with another byte order")
+        expected = _HEADER_SIZE + 4 * (4 * nodes + 1 + 2 * edges)
+        if st.st_size != expected:
+            raise IndexFormatError("vocab index is truncated")
+
+        self.revision = revision
+        self.term_count = terms
+        view = memoryview(self._mmap)
+        offset = _HEADER_SIZE
+        tables = []
+        for count in (nodes, nodes, nodes, nodes + 1, edges, edges):
+            tables.append(view[offset:offset + 4 * count].cast("I"))
+            offset += 4 * count
+        self._fail, self._out, self._dict, self._first, self._chars, self._targets = tables
+        # 根からの遷移は最も多く引くので dict に展開しておく (文字種の数だけ)
+        lo, hi = self._first[0], self._first[1]
+        self._root = dict(zip(self._chars[lo:hi].tolist(), self._targets[lo:hi].tolist()))
+
+    def __len__(self) -> int:
+        return self.term_count
+
+    def find_spans(self, text: str) -> list[tuple[int, int, str]]:
+        """重ならない最左最長一致 [(start, end, term)] (AhoCorasick.find_spans と同じ)"""
+        if not text or not self.term_count:
+            return []
+        fail, out, dict_link = self._fail, self._out, self._dict
+        first, chars, targets, root = self._first, self._chars, self._targets, self._root
+        longest: dict[int, int] = {}
+        state = 0
+        for i, ch in enumerate(text):
+            code = ord(ch)
+            while state:
+                lo, hi = first[state], first[state + 1]
+                if lo < hi:
+                    j = bisect_left(chars, code, lo, hi)
+                    if j < hi and chars[j] == code:
+                        state = targets[j]
+                        break
+                state = fail[state]
+            else:
+                state = root.get(code, 0)
+            node = state if out[state] else dict_link[state]
+            while node:
+                length = out[node]
+                start = i - length + 1
+                if length > longest.get(start, 0):
+                    longest[start] = length
+                node = dict_link[node]
+
+        spans = []
+        pos = 0
+        for start in sorted(longest):
+            if start < pos:
+                continue
+            end = start + longest[start]
+            spans.append((start, end, text[start:end]))
+            pos = end
+        return spans
+
+    def find_terms(self, text: str) -> list[str]:
+        """テキストに現れる語 (重複なし・出現順)"""
+        return list(dict.fromkeys(term for _, _, term in self.find_spans(text)))
+
+
+def open_index(path: Path) -> Optional[CompiledIndex]:
+    """コンパイル済みファイルを開く (無い・壊れている・mmap できないなら None)"""
+    try:
+        return CompiledIndex(path)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, struct.error) as e:
+        logger.warning(f"⚠️ Vocab index unusable ({path}): {e}")
+        return None
@@ -2,53 +2,196 @@
 Vocabulary Store - カスタム機密語彙管理
 
 FORBIDDEN依存: ChromaDB (ビルド失敗リスク)
-代替実装: SQLite + FTS5 (全文検索)
+代替実装: SQLite + FTS5 (trigram 索引で日本語も部分一致)
 
 責務:
 - ユーザー定義の機密語彙の管理
-- 部分一致検索
-- privacy.py との統合
+- 部分一致検索 (関連度順・キーセットのページ送り)
+- privacy.py との統合 (テキスト内の検出は Aho-Corasick オートマトンで1回の走査)
+- オートマトンをコンパイル済みファイル (vocab.acidx) に書き出し、各プロセスで mmap 共有
+- 一括追加・削除と CSV / JSON Lines のインポート・エクスポート
+
+語彙を変えるたびに vocab_state のリビジョンを1つ進める。コンパイル済みファイルはヘッダに
+どのリビジョンから作ったかを持つ。検出のたびに DB のリビジョンと手元のオートマトンを照合し、
+ずれていれば (同じリビジョンのファイルがあればそれを mmap、無ければ DB から) 読み直す。
 """
+import csv
+import io
+import json
 import sqlite3
+import threading
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Optional
+from typing import IO, Iterable, Iterator, Optional
 import logging
 
+from .aho_corasick import AhoCorasick
+from .vocab_index import CompiledIndex, compile_index, open_index
+
 logger = logging.getLogger(__name__)
 
 # デフォルトDBパス
 DEFAULT_DB_PATH = Path(__file__).parent.parent.parent / "data" / "vocab.db"
 
+# インポート・エクスポートの形式
+VOCAB_FORMATS = ("csv", "jsonl")
+EXPORT_FIELDS = ("term", "category", "created_at")
+
+
+class VocabFormatError(ValueError):
+    """インポート・エクスポートの形式が不正"""
+
 
 class VocabularyStore:
     """
     カスタム機密語彙のストア
     
     SQLite FTS5を使用した軽量実装（ChromaDB代替）
+    
+    接続はインスタンスごとに1本を使い回す (WAL・プリペアドステートメントのキャッシュが効く)。
+    スレッド間の排他は _db_lock で行う。ロックの順序は _db_lock → _matcher_lock。
     """
     
-    def __init__(self, db_path: Optional[Path] = None):
+    def __init__(self, db_path: Optional[Path] = None, index_path: Optional[Path] = None):
+        from .config import settings
+
         self.db_path = db_path or DEFAULT_DB_PATH
         self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.index_path = index_path or self.db_path.with_suffix(".acidx")
+        self.index_enabled = settings.VOCAB_INDEX_ENABLED
+        self.publish_delay = settings.VOCAB_INDEX_PUBLISH_DELAY_SEC
+        # テキスト内検出用のオートマトン
+        # - CompiledIndex: コンパイル済みファイルを mmap したもの (読み取り専用・プロセス間で共有)
+        # - AhoCorasick: このプロセスで語彙を変えた後の手元の版 (add/remove で差分反映)
+        self._matcher: Optional[AhoCorasick | CompiledIndex] = None
+        self._revision = 0  # _matcher が反映している語彙のリビジョン
+        self._matcher_lock = threading.Lock()
+        self._publish_timer: Optional[threading.Timer] = None
+        self._closed = False
+        self._db_lock = threading.RLock()
+        self._conn = self._connect()
         self._init_db()
-    
+
+    def _connect(self) -> sqlite3.Connection:
+        """長寿命の接続を開く (スレッドをまたいで使うので check_same_thread=False)"""
+        conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=10.0)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        # 一括操作の対象語を置く作業表 (接続ごと)
+        conn.execute("CREATE TEMP TABLE IF NOT EXISTS vocab_batch (term TEXT PRIMARY KEY, category TEXT)")
+        return conn
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """1トランザクション (例外時はロールバック)"""
+        with self._db_lock:
+            try:
+                yield self._conn
+                self._conn.commit()
+            except BaseException:
+                self._conn.rollback()
+                raise
+
+    def _query(self, sql: str, params: tuple = ()) -> list[tuple]:
+        with self._db_lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def close(self) -> None:
+        """接続を閉じる (待っている書き出しは取り消す。閉じた後の publish_index は何もしない)"""
+        with self._db_lock:
+            with self._matcher_lock:
+                self._closed = True
+                if self._publish_timer is not None:
+                    self._publish_timer.cancel()
+                    self._publish_timer = None
+            self._conn.close()
+
     def _init_db(self):
-        """データベース初期化"""
-        with sqlite3.connect(self.db_path) as conn:
-            # FTS5仮想テーブル（全文検索）
+        """データベース初期化 (旧スキーマなら移行する)"""
+        with self._transaction() as conn:
+            # 複数プロセスが同時に起動しても移行は1回だけ行われるよう、先に書き込みロックを取る
+            conn.execute("BEGIN IMMEDIATE")
+            # 語彙のリビジョン (コンパイル済みファイルの版の照合用)
             conn.execute("""
-                CREATE VIRTUAL TABLE IF NOT EXISTS vocab 
-                USING fts5(term, category, tokenize='unicode61')
+                CREATE TABLE IF NOT EXISTS vocab_state (
+                    key TEXT PRIMARY KEY,
+                    value INTEGER NOT NULL
+                )
             """)
-            # メタデータテーブル
+            conn.execute("INSERT OR IGNORE INTO vocab_state(key, value) VALUES ('revision', 0)")
+
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(vocab_meta)")]
+            migrating = bool(columns) and "id" not in columns
+            if migrating:
+                # v1: term が主キーで rowid が不定 → 整数の id を振り直す (登録順を保つ)
+                conn.execute("ALTER TABLE vocab_meta RENAME TO vocab_meta_v1")
+            # メタデータテーブル (id は FTS 索引の rowid と対応する)
             conn.execute("""
                 CREATE TABLE IF NOT EXISTS vocab_meta (
-                    term TEXT PRIMARY KEY,
+                    id INTEGER PRIMARY KEY,
+                    term TEXT NOT NULL UNIQUE,
                     category TEXT,
                     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
                 )
             """)
-            conn.commit()
+            if migrating:
+                conn.execute("""
+                    INSERT INTO vocab_meta(term, category, created_at)
+                    SELECT term, category, created_at FROM vocab_meta_v1 ORDER BY rowid
+                """)
+                conn.execute("DROP TABLE vocab_meta_v1")
+            # v1 の FTS5 (unicode61 は日本語を分かち書きしないので部分一致に使えない)
+            conn.execute("DROP TABLE IF EXISTS vocab")
+            self.fts_enabled = self._init_fts(conn, rebuild=migrating)
+        if migrating:
+            logger.info(f"🔄 Vocab store migrated: {self.count()} terms re-indexed (trigram)")
+
+    @staticmethod
+    def _init_fts(conn: sqlite3.Connection, rebuild: bool = False) -> bool:
+        """
+        trigram の FTS5 索引 (vocab_meta を外部コンテンツにし、トリガーで同期する)
+
+        Returns:
+            索引が使える場合True (trigram の無い古い SQLite では False → LIKE で検索)
+        """
+        try:
+            conn.execute("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS vocab_fts
+                USING fts5(term, content='vocab_meta', content_rowid='id', tokenize='trigram')
+            """)
+        except sqlite3.OperationalError as e:
+            logger.warning(f"⚠️ Trigram FTS unavailable, falling back to LIKE search: {e}")
+            return False
+        conn.execute("""
+            CREATE TRIGGER IF NOT EXISTS vocab_meta_ai AFTER INSERT ON vocab_meta BEGIN
+                INSERT INTO vocab_fts(rowid, term) VALUES (new.id, new.term);
+            END
+        """)
+        conn.execute("""
+            CREATE TRIGGER IF NOT EXISTS vocab_meta_ad AFTER DELETE ON vocab_meta BEGIN
+                INSERT INTO vocab_fts(vocab_fts, rowid, term) VALUES ('delete', old.id, old.term);
+            END
+        """)
+        conn.execute("""
+            CREATE TRIGGER IF NOT EXISTS vocab_meta_au AFTER UPDATE OF term ON vocab_meta BEGIN
+                INSERT INTO vocab_fts(vocab_fts, rowid, term) VALUES ('delete', old.id, old.term);
+                INSERT INTO vocab_fts(rowid, term) VALUES (new.id, new.term);
+            END
+        """)
+        if rebuild:
+            conn.execute("INSERT INTO vocab_fts(vocab_fts) VALUES ('rebuild')")
+        return True
+
+    @staticmethod
+    def _bump_revision(conn: sqlite3.Connection) -> int:
+        """リビジョンを1つ進める (語彙の変更と同じトランザクションで呼ぶ)"""
+        conn.execute("UPDATE vocab_state SET value = value + 1 WHERE key = 'revision'")
+        return VocabularyStore._read_revision(conn)
+
+    @staticmethod
+    def _read_revision(conn: sqlite3.Connection) -> int:
+        row = conn.execute("SELECT value FROM vocab_state WHERE key = 'revision'").fetchone()
+        return row[0] if row else 0
     
     def add_term(self, term: str, category: str = "custom") -> bool:
         """
@@ -62,28 +205,11 @@ class VocabularyStore:
             成功時True
         """
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                # 重複チェック
-                existing = conn.execute(
-                    "SELECT term FROM vocab_meta WHERE term = ?", (term,)
-                ).fetchone()
-                if existing:
-                    logger.info(f"語彙 '{term}' は既に登録済み")
-                    return False
-                
-                # FTSテーブルに追加
-                conn.execute(
-                    "INSERT INTO vocab(term, category) VALUES (?, ?)",
-                    (term, category)
-                )
-                # メタデータテーブルに追加
-                conn.execute(
-                    "INSERT INTO vocab_meta(term, category) VALUES (?, ?)",
-                    (term, category)
-                )
-                conn.commit()
-                logger.info(f"語彙 '{term}' ({category}) を追加")
-                return True
+            if not self.add_terms([(term, category)]):
+                logger.info(f"語彙 '{term}' は既に登録済み")
+                return False
+            logger.info(f"語彙 '{term}' ({category}) を追加")
+            return True
         except Exception as e:
             logger.error(f"語彙追加エラー: {e}")
             return False
@@ -91,14 +217,80 @@ class VocabularyStore:
     def remove_term(self, term: str) -> bool:
         """語彙を削除"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.execute("DELETE FROM vocab WHERE term = ?", (term,))
-                conn.execute("DELETE FROM vocab_meta WHERE term = ?", (term,))
-                conn.commit()
-                return True
+            self.remove_terms([term])
+            return True
         except Exception as e:
             logger.error(f"語彙削除エラー: {e}")
             return False
+
+    def _stage(self, conn: sqlite3.Connection, rows: list[tuple[str, str]]) -> None:
+        """一括操作の対象語を作業表に置く (同じ語は最初の1件)"""
+        conn.execute("DELETE FROM vocab_batch")
+        conn.executemany("INSERT OR IGNORE INTO vocab_batch(term, category) VALUES (?, ?)", rows)
+
+    def add_terms(self, terms: Iterable[str | tuple[str, str]], category: str = "custom") -> int:
+        """
+        機密語彙をまとめて追加 (1トランザクション・executemany)
+        
+        Args:
+            terms: 語 または (語, カテゴリ) の並び。空の語・登録済みの語は飛ばす
+            category: カテゴリを省いた語に使うカテゴリ
+        
+        Returns:
+            追加した件数
+        """
+        rows = []
+        for item in terms:
+            term, term_category = (item, category) if isinstance(item, str) else item
+            if term:
+                rows.append((term, term_category or category))
+        if not rows:
+            return 0
+
+        with self._db_lock:
+            with self._transaction() as conn:
+                self._stage(conn, rows)
+                new_rows = conn.execute(
+                    """
+                    SELECT b.term, b.category FROM vocab_batch b
+                    WHERE NOT EXISTS (SELECT 1 FROM vocab_meta m WHERE m.term = b.term)
+                    """
+                ).fetchall()
+                if new_rows:
+                    # メタデータテーブルに追加 (FTS 索引はトリガーで追従)
+                    conn.executemany("INSERT INTO vocab_meta(term, category) VALUES (?, ?)", new_rows)
+                    revision = self._bump_revision(conn)
+                conn.execute("DELETE FROM vocab_batch")
+            if new_rows:
+                self._apply_change(revision, added=[row[0] for row in new_rows])
+        return len(new_rows)
+
+    def remove_terms(self, terms: Iterable[str]) -> int:
+        """
+        語彙をまとめて削除 (1トランザクション)
+        
+        Returns:
+            削除した件数 (未登録の語は数えない)
+        """
+        rows = [(term, None) for term in terms if term]
+        if not rows:
+            return 0
+
+        with self._db_lock:
+            with self._transaction() as conn:
+                self._stage(conn, rows)
+                removed = [
+                    row[0] for row in conn.execute(
+                        "SELECT m.term FROM vocab_meta m JOIN vocab_batch b ON b.term = m.term"
+                    )
+                ]
+                if removed:
+                    conn.execute("DELETE FROM vocab_meta WHERE term IN (SELECT term FROM vocab_batch)")
+                    revision = self._bump_revision(conn)
+                conn.execute("DELETE FROM vocab_batch")
+            if removed:
+                self._apply_change(revision, removed=removed)
+        return len(removed)
     
     def search(self, query: str, limit: int = 10) -> list[dict]:
         """
@@ -109,55 +301,329 @@ class VocabularyStore:
             limit: 最大結果数
         
         Returns:
-            マッチした語彙のリスト
+            マッチした語彙のリスト (関連度順)
+        """
+        return self.search_page(query, limit=limit)["items"]
+
+    def search_page(self, query: str, limit: int = 10, cursor: Optional[str] = None) -> dict:
         """
-        with sqlite3.connect(self.db_path) as conn:
-            # FTS5検索（部分一致）
-            results = conn.execute(
+        部分一致検索 (キーセットでページ送り)
+        
+        3文字以上は trigram 索引で引き、bm25 の順 (短い語ほど上位) に並べる。
+        2文字以下は trigram が作れないので vocab_meta を LIKE で走査し、短い語から並べる。
+        
+        Args:
+            query: 検索クエリ
+            limit: 1ページの件数
+            cursor: 前のページの next_cursor (None なら先頭から)
+        
+        Returns:
+            dict: {"items": [{"term", "category"}], "next_cursor": 次ページがあれば文字列}
+        
+        Raises:
+            ValueError: cursor が不正
+        """
+        query = query.strip()
+        if not query or limit <= 0:
+            return {"items": [], "next_cursor": None}
+        after_rank, after_id = self._parse_cursor(cursor)
+
+        if self.fts_enabled and len(query) >= 3:
+            phrase = '"' + query.replace('"', '""') + '"'
+            rows = self._query(
                 """
-                SELECT term, category FROM vocab 
-                WHERE vocab MATCH ? 
+                SELECT f.rank, m.id, m.term, m.category FROM (
+                    SELECT rowid, rank FROM vocab_fts
+                    WHERE vocab_fts MATCH ? AND (rank > ? OR (rank = ? AND rowid > ?))
+                    ORDER BY rank, rowid
+                    LIMIT ?
+                ) f JOIN vocab_meta m ON m.id = f.rowid
+                ORDER BY f.rank, f.rowid
+                """,
+                (phrase, after_rank, after_rank, after_id, limit + 1),
+            )
+        else:
+            pattern = "%" + query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+            rows = self._query(
+                """
+                SELECT length(term) AS rank, id, term, category FROM vocab_meta
+                WHERE term LIKE ? ESCAPE '\\' AND (length(term) > ? OR (length(term) = ? AND id > ?))
+                ORDER BY rank, id
                 LIMIT ?
                 """,
-                (f'"{query}"*', limit)
-            ).fetchall()
-            return [{"term": r[0], "category": r[1]} for r in results]
-    
+                (pattern, after_rank, after_rank, after_id, limit + 1),
+            )
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = f"{rows[-1][0]!r}:{rows[-1][1]}"
+        return {
+            "items": [{"term": r[2], "category": r[3]} for r in rows],
+            "next_cursor": next_cursor,
+        }
+
+    @staticmethod
+    def _parse_cursor(cursor: Optional[str]) -> tuple[float, int]:
+        if not cursor:
+            return float("-inf"), 0
+        try:
+            rank, _, row_id = cursor.rpartition(":")
+            return float(rank), int(row_id)
+        except ValueError:
+            raise ValueError(f"invalid cursor: {cursor}") from None
+
+    def _refresh_matcher_locked(self) -> None:
+        """
+        DB の今のリビジョンに合わせてオートマトンを読み直す (_db_lock・_matcher_lock を持って呼ぶ)
+
+        コンパイル済みファイルが同じリビジョンならそれを mmap するだけ。無ければ全語彙から作る。
+        """
+        # リビジョンと語彙を同じスナップショットから読む (他のプロセスの書き込みが間に入らない)
+        began = not self._conn.in_transaction
+        if began:
+            self._conn.execute("BEGIN")
+        try:
+            revision = self._read_revision(self._conn)
+            if self.index_enabled:
+                index = open_index(self.index_path)
+                if index is not None and index.revision == revision:
+                    self._matcher, self._revision = index, revision
+                    logger.info(f"🔤 Vocab index mapped: {len(index)} terms (rev {revision})")
+                    return
+            terms = [row[0] for row in self._conn.execute("SELECT term FROM vocab_meta")]
+        finally:
+            if began:
+                self._conn.commit()
+        self._matcher, self._revision = AhoCorasick(terms), revision
+        logger.info(f"🔤 Vocab automaton built: {len(terms)} terms (rev {revision})")
+        if self.index_enabled:
+            self._publish_locked()
+
+    def _get_matcher(self) -> AhoCorasick | CompiledIndex:
+        """
+        検出用オートマトンを取得
+
+        毎回 DB のリビジョンを確かめ (主キー1行の読み出し)、他のインスタンス・プロセスが
+        語彙を変えていれば読み直す。
+        """
+        with self._db_lock:
+            revision = self._read_revision(self._conn)
+            matcher = self._matcher
+            if matcher is not None and revision == self._revision:
+                return matcher
+            with self._matcher_lock:
+                if self._matcher is None or self._revision != revision:
+                    self._refresh_matcher_locked()
+                return self._matcher
+
+    def _apply_change(self, revision: int, added=(), removed=()) -> None:
+        """語彙の変更を手元のオートマトンに反映し、コンパイル済みファイルの書き直しを予約する"""
+        with self._matcher_lock:
+            matcher = self._matcher
+            if isinstance(matcher, AhoCorasick) and revision == self._revision + 1:
+                matcher.add_many(added)
+                for term in removed:
+                    matcher.remove(term)
+                self._revision = revision
+            # それ以外 (未作成 / mmap 版は書き換えられない / 他のプロセスの変更を取りこぼしている) は
+            # 次の検出・書き出しでリビジョンの食い違いを見て DB から読み直す
+        # オートマトンを持っていなくても書き出す (他のプロセスの読み直しを mmap だけで済ませる)
+        self._schedule_publish()
+
+    def _schedule_publish(self) -> None:
+        """連続した変更をまとめてから書き直す (publish_delay 秒待つ)"""
+        if not self.index_enabled:
+            return
+        if self.publish_delay <= 0:
+            self.publish_index()
+            return
+        with self._matcher_lock:
+            if self._closed:
+                return
+            if self._publish_timer is not None:
+                self._publish_timer.cancel()
+            timer = threading.Timer(self.publish_delay, self.publish_index)
+            timer.daemon = True
+            self._publish_timer = timer
+        timer.start()
+
+    def publish_index(self) -> bool:
+        """
+        DB の今の語彙をコンパイル済みファイルに書き出す (手元のオートマトンが古ければ先に読み直す)
+
+        ファイルは読み直しを速くするためのもので、正しさは検出ごとのリビジョン照合で保つ。
+        書き出す前にプロセスが終わっても、書き出しに失敗しても、他のプロセスは DB から作り直す。
+
+        Returns:
+            書き出した場合True
+        """
+        with self._db_lock, self._matcher_lock:
+            if self._closed:
+                return False
+            self._publish_timer = None
+            if self._matcher is None or self._revision != self._read_revision(self._conn):
+                self._refresh_matcher_locked()  # 作り直した場合はここで書き出される
+            return self._publish_locked()
+
+    def _publish_locked(self) -> bool:
+        matcher, revision = self._matcher, self._revision
+        if not isinstance(matcher, AhoCorasick):
+            return False
+        current = open_index(self.index_path)
+        if current is not None and current.revision >= revision:
+            return False  # 他のプロセスが同じか新しい版を置いた
+        try:
+            size = compile_index(matcher, self.index_path, revision)
+        except OSError as e:
+            # Windows では他のプロセスが mmap 中のファイルを置き換えられない:
+            # 各プロセスは DB から自分のオートマトンを作って検出を続ける (遅くなるだけで取りこぼしはない)
+            logger.warning(f"⚠️ Vocab index publish failed: {e}")
+            return False
+        logger.info(f"📦 Vocab index published: {len(matcher)} terms, {size / 1024:.1f} KiB (rev {revision})")
+        return True
+
+    def find_spans(self, text: str) -> list[tuple[int, int, str]]:
+        """
+        テキスト内の登録語彙の位置を検出 (重ならない最左最長一致)
+
+        Returns:
+            [(start, end, term)] 左から順
+        """
+        return self._get_matcher().find_spans(text)
+
     def find_in_text(self, text: str) -> list[str]:
         """
         テキスト内に含まれる登録語彙を検出
         
+        「プロジェクト」と「プロジェクトX」が両方登録されていれば、長い方だけを返す。
+        
         Args:
             text: 検査対象テキスト
         
         Returns:
-            検出された語彙のリスト
-        """
-        with sqlite3.connect(self.db_path) as conn:
-            all_terms = conn.execute(
-                "SELECT term FROM vocab_meta"
-            ).fetchall()
-            found = []
-            for (term,) in all_terms:
-                if term in text:
-                    found.append(term)
-            return found
+            検出された語彙のリスト (重複なし・出現順)
+        """
+        return self._get_matcher().find_terms(text)
     
     def list_all(self) -> list[dict]:
         """全語彙を取得"""
-        with sqlite3.connect(self.db_path) as conn:
-            results = conn.execute(
-                "SELECT term, category, created_at FROM vocab_meta ORDER BY created_at DESC"
-            ).fetchall()
-            return [
-                {"term": r[0], "category": r[1], "created_at": r[2]} 
-                for r in results
-            ]
+        results = self._query(
+            "SELECT term, category, created_at FROM vocab_meta ORDER BY created_at DESC"
+        )
+        return [
+            {"term": r[0], "category": r[1], "created_at": r[2]} 
+            for r in results
+        ]
     
     def count(self) -> int:
         """登録語彙数を取得"""
-        with sqlite3.connect(self.db_path) as conn:
-            return conn.execute("SELECT COUNT(*) FROM vocab_meta").fetchone()[0]
+        return self._query("SELECT COUNT(*) FROM vocab_meta")[0][0]
+
+    def iter_export(self, fmt: str = "csv", chunk_size: int = 1000) -> Iterator[str]:
+        """
+        全語彙を CSV / JSON Lines で少しずつ返す (id のキーセットで辿る)
+        
+        Raises:
+            VocabFormatError: 未知の形式
+        """
+        if fmt not in VOCAB_FORMATS:
+            raise VocabFormatError(f"format must be one of {VOCAB_FORMATS}")
+        if fmt == "csv":
+            yield ",".join(EXPORT_FIELDS) + "\n"
+
+        last_id = 0
+        while True:
+            rows = self._query(
+                "SELECT id, term, category, created_at FROM vocab_meta WHERE id > ? ORDER BY id LIMIT ?",
+                (last_id, chunk_size),
+            )
+            if not rows:
+                break
+            last_id = rows[-1][0]
+            buf = io.StringIO()
+            if fmt == "csv":
+                csv.writer(buf, lineterminator="\n").writerows(row[1:] for row in rows)
+            else:
+                for row in rows:
+                    buf.write(json.dumps(dict(zip(EXPORT_FIELDS, row[1:])), ensure_ascii=False) + "\n")
+            yield buf.getvalue()
+
+    def import_terms(
+        self,
+        source: IO[str],
+        fmt: str = "csv",
+        category: str = "custom",
+        chunk_size: int = 5000,
+    ) -> dict:
+        """
+        CSV / JSON Lines を読みながら一括追加する (chunk_size 件ごとに1トランザクション)
+        
+        CSV: 1列目が語、2列目があればカテゴリ ("term,category" の見出し行は読み飛ばす)
+        JSON Lines: {"term": "...", "category": "..."} または "語" の1行1件
+        
+        Args:
+            source: テキストストリーム (ファイル・アップロードの一時ファイル)
+            fmt: "csv" / "jsonl"
+            category: カテゴリが無い行に使うカテゴリ
+        
+        Returns:
+            dict: {"added", "skipped" (登録済み・重複), "invalid"}
+        
+        Raises:
+            VocabFormatError: 未知の形式
+        """
+        if fmt not in VOCAB_FORMATS:
+            raise VocabFormatError(f"format must be one of {VOCAB_FORMATS}")
+
+        stats = {"added": 0, "skipped": 0, "invalid": 0}
+        rows = self._iter_csv(source, stats) if fmt == "csv" else self._iter_jsonl(source, stats)
+        batch: list[tuple[str, str]] = []
+        for term, term_category in rows:
+            batch.append((term, term_category or category))
+            if len(batch) >= chunk_size:
+                self._import_batch(batch, stats)
+                batch = []
+        if batch:
+            self._import_batch(batch, stats)
+        logger.info(f"📥 Vocab imported: {stats['added']} added, {stats['skipped']} skipped, {stats['invalid']} invalid")
+        return stats
+
+    def _import_batch(self, batch: list[tuple[str, str]], stats: dict) -> None:
+        added = self.add_terms(batch)
+        stats["added"] += added
+        stats["skipped"] += len(batch) - added
+
+    @staticmethod
+    def _iter_csv(source: IO[str], stats: dict) -> Iterator[tuple[str, Optional[str]]]:
+        for i, row in enumerate(csv.reader(source)):
+            if i == 0 and row and row[0].strip().lower() == "term":
+                continue  # 見出し行
+            term = row[0].strip() if row else ""
+            if not term:
+                if any(cell.strip() for cell in row):
+                    stats["invalid"] += 1
+                continue
+            yield term, row[1].strip() if len(row) > 1 else None
+
+    @staticmethod
+    def _iter_jsonl(source: IO[str], stats: dict) -> Iterator[tuple[str, Optional[str]]]:
+        for line in source:
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                stats["invalid"] += 1
+                continue
+            if isinstance(record, str):
+                record = {"term": record}
+            term = record.get("term") if isinstance(record, dict) else None
+            if not isinstance(term, str) or not term.strip():
+                stats["invalid"] += 1
+                continue
+            category = record.get("category")
+            yield term.strip(), category if isinstance(category, str) else None
 
 
 # シングルトンインスタンス
@@ -0,0 +1,303 @@
+"""
+Warmup Engine - 定型文キャッシュの一括生成
+
+責務:
+- ワーカープールによる並列生成（上流の流量は共有リミッターが制御）
+- 全ハッシュを1回のクエリでまとめて存在確認
+- チェックポイントファイルによる中断・再開
+- 進捗 (件/秒) の報告
+
+比喩: 仕込みを1人で順番にやらず、厨房の人数分で手分けする。
+どこまで仕込んだかは伝票に書いておき、中断しても続きから再開できる。
+"""
+import asyncio
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Callable, Optional
+
+from sqlalchemy.orm import Session
+
+from .config import settings
+from .models import CacheEntry
+from .normalize import prepare_text
+from .seasoning import SeasoningManager, RESOLVED_LIGHT, RESOLVED_MEDIUM, RESOLVED_RICH
+
+logger = logging.getLogger("core_warmup")
+
+LEVELS = [RESOLVED_LIGHT, RESOLVED_MEDIUM, RESOLVED_RICH]
+
+# SQLite のバインド変数上限 (999) を超えないよう IN 句を分割する
+EXISTENCE_CHUNK = 500
+
+
+class Checkpoint:
+    """
+    完了済みハッシュの記録 (1行1ハッシュの追記ファイル)
+    1件終わるごとに追記するので、途中で止まっても完了分は失われない。
+    先頭行に構成指紋を記録し、指紋が変わったら (旧構成で作った分は使われないので) 最初からやり直す。
+    """
+
+    HEADER_PREFIX = "# fingerprint "
+
+    def __init__(self, path, fingerprint: str = ""):
+        self.path = Path(path)
+        self.fingerprint = fingerprint
+        self.done: set[str] = set()
+
+    def load(self) -> set[str]:
+        self.done = set()
+        if not self.path.exists():
+            return self.done
+        with open(self.path, "r", encoding="utf-8") as f:
+            header = f.readline().strip()
+            if header != self.HEADER_PREFIX + self.fingerprint:
+                logger.info("🔁 Warmup checkpoint was made with another configuration. Starting over.")
+            else:
+                self.done = {line.strip() for line in f if line.strip()}
+                return self.done
+        self.clear()
+        return self.done
+
+    def mark(self, text_hash: str) -> None:
+        if text_hash in self.done:
+            return
+        self.done.add(text_hash)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        new_file = not self.path.exists() or self.path.stat().st_size == 0
+        with open(self.path, "a", encoding="utf-8") as f:
+            if new_file:
+                f.write(self.HEADER_PREFIX + self.fingerprint + "\n")
+            f.write(text_hash + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def clear(self) -> None:
+        self.done = set()
+        if self.path.exists():
+            self.path.unlink()
+
+
+class RatePacer:
+    """
+    ワーカー間で共有する呼び出し間隔の制御 (秒間 rate 回まで)
+    rate が 0 以下なら制限しない（同時実行数は GeminiClient のリミッターが制御する）
+    """
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next_at = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self) -> None:
+        if self.interval <= 0:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            delay = self._next_at - now
+            self._next_at = max(now, self._next_at) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class WarmupEngine:
+    """
+    並列・再開可能な Warmup
+
+    Args:
+        cache_manager: CacheManager (ハッシュ計算・書き込み・L1 無効化)
+        client: GeminiClient
+        privacy: PrivacyHandler
+        workers: 同時に処理する定型文の数
+        checkpoint_path: 指定すると完了分を記録し、次回はそこから再開する
+        callback: fn(current, total, text) -> None
+    """
+
+    def __init__(
+        self,
+        cache_manager,
+        client,
+        privacy,
+        workers: int = None,
+        checkpoint_path=None,
+        callback: Optional[Callable[[int, int, str], None]] = None,
+        max_rps: float = None,
+    ):
+        self.cache_manager = cache_manager
+        self.client = client
+        self.privacy = privacy
+        self.workers = max(1, settings.WARMUP_WORKERS if workers is None else workers)
+        self.callback = callback
+        self.pacer = RatePacer(settings.WARMUP_MAX_RPS if max_rps is None else max_rps)
+        # /process と同じ構成指紋・ユーザー指示で作る（作った結果がそのままヒットするように）
+        self.fingerprint = cache_manager.current_fingerprint()
+        self.checkpoint = Checkpoint(checkpoint_path, self.fingerprint) if checkpoint_path else None
+        self.user_prompt = settings.USER_SYSTEM_PROMPT
+        self.level_keys = [cache_manager.get_result_key(season, self.fingerprint) for season in LEVELS]
+        self.completed = 0
+        self.total = 0
+        self._started = 0.0
+
+    @property
+    def items_per_sec(self) -> float:
+        elapsed = time.monotonic() - self._started if self._started else 0.0
+        return self.completed / elapsed if elapsed > 0 else 0.0
+
+    def _fetch_existing(self, db: Session, hashes: list[str]) -> dict[str, dict]:
+        """全ハッシュの既存結果キーをまとめて取得 (hash_id -> {result_key: 結果})"""
+        existing: dict[str, dict] = {}
+        for i in range(0, len(hashes), EXISTENCE_CHUNK):
+            chunk = hashes[i:i + EXISTENCE_CHUNK]
+            rows = (
+                db.query(CacheEntry.hash_id, CacheEntry.seasoning, CacheEntry.fingerprint, CacheEntry.result)
+                .filter(CacheEntry.hash_id.in_(chunk))
+                .all()
+            )
+            for hash_id, seasoning, fingerprint, result in rows:
+                key = self.cache_manager.get_result_key(seasoning, fingerprint or None)
+                existing.setdefault(hash_id, {})[key] = result
+        return existing
+
+    async def run(self, db: Session, templates: list[str], force: bool = False) -> dict:
+        """
+        定型文リストのキャッシュを生成する
+
+        Returns:
+            dict: 処理結果統計 (total / processed / skipped / errors / resumed / items_per_sec)
+        """
+        stats = {"total": len(templates), "processed": 0, "skipped": 0, "errors": 0, "resumed": 0}
+
+        # 正規化して重複・空行を除き、ハッシュを一度だけ計算する
+        items: dict[str, str] = {}
+        for text in templates:
+            text = prepare_text(text.strip())
+            if text:
+                items.setdefault(self.cache_manager.get_text_hash(text), text)
+
+        if self.checkpoint and force:
+            # 作り直すので前回の完了記録は使わない
+            self.checkpoint.clear()
+        done = self.checkpoint.load() if self.checkpoint else set()
+        existing = self._fetch_existing(db, list(items))
+
+        queue: asyncio.Queue = asyncio.Queue()
+        for text_hash, text in items.items():
+            if text_hash in done:
+                stats["resumed"] += 1
+                continue
+            results = existing.get(text_hash, {})
+            if not force and all(k in results for k in self.level_keys):
+                stats["skipped"] += 1
+                self._mark_done(text_hash)
+                continue
+            queue.put_nowait((text_hash, text, results))
+
+        self.total = queue.qsize()
+        self.completed = 0
+        self._started = time.monotonic()
+        logger.info(
+            f"🔥 Warmup: {self.total} to generate, {stats['skipped']} cached, "
+            f"{stats['resumed']} resumed ({self.workers} workers)"
+        )
+
+        workers = [
+            asyncio.create_task(self._worker(db, queue, stats, force))
+            for _ in range(min(self.workers, self.total))
+        ]
+        try:
+            await asyncio.gather(*workers)
+        finally:
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+        stats["items_per_sec"] = round(self.items_per_sec, 2)
+        # 全件終わったらチェックポイントは不要
+        if self.checkpoint and stats["errors"] == 0:
+            self.checkpoint.clear()
+        return stats
+
+    def _mark_done(self, text_hash: str) -> None:
+        if self.checkpoint:
+            self.checkpoint.mark(text_hash)
+
+    async def _worker(self, db: Session, queue: asyncio.Queue, stats: dict, force: bool) -> None:
+        while True:
+            try:
+                text_hash, text, current = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            try:
+                generated, failed = await self._generate(text, current, force)
+                if generated:
+                    # DB 操作は await を挟まないので、ワーカー間で同じセッションを共有してよい
+                    if self.cache_manager.store_results(db, text, generated, self.fingerprint):
+                        stats["processed"] += 1
+                    else:
+                        # 書けなかった分はチェックポイントに残さず、次回作り直す
+                        failed += len(generated)
+                if failed:
+                    stats["errors"] += failed
+                else:
+                    self._mark_done(text_hash)
+            except Exception as e:
+                logger.error(f"Example {self.cache_manager.sanitize_log(text)} failed: {e}")
+                stats["errors"] += 1
+                db.rollback()
+            finally:
+                self.completed += 1
+                if self.callback:
+                    self.callback(self.completed, self.total, text)
+
+    async def _generate(self, text: str, current: dict, force: bool) -> tuple[dict, int]:
+        """
+        足りない段階を生成する
+
+        Returns:
+            (生成できた {seasoning: 結果}, 失敗した段階数)
+        """
+        missing = [
+            season for season, key in zip(LEVELS, self.level_keys)
+            if force or key not in current
+        ]
+        masked, mapping = self.privacy.mask(text)
+        generated = {}
+
+        # --- Multi-level: 2段階以上足りなければ1回の構造化出力でまとめて生成 ---
+        if settings.WARMUP_MULTI_LEVEL and len(missing) >= 2:
+            config = {
+                "system": SeasoningManager.get_multi_level_prompt(user_prompt=self.user_prompt),
+                "params": {"temperature": 0.3}
+            }
+            await self.pacer.wait()
+            res = await self.client.generate_multi_level(masked, config)
+            if res["success"]:
+                for season in missing:
+                    if season in res["results"]:
+                        generated[season] = self._unmask(res["results"][season], mapping)
+                # 生成できなかったレベルだけ個別に呼ぶ
+                missing = [season for season in missing if season not in generated]
+            else:
+                logger.warning(f"⚠️ Multi-level failed for '{text[:10]}': {res.get('error')}. Falling back.")
+
+        failed = 0
+        for season in missing:
+            config = {
+                "system": SeasoningManager.get_system_prompt(season, user_prompt=self.user_prompt),
+                "params": {"temperature": 0.3}
+            }
+            await self.pacer.wait()
+            res = await self.client.generate_content(masked, config, model=None)
+            if res["success"]:
+                generated[season] = self._unmask(res["result"], mapping)
+            else:
+                err_msg = res.get('error')
+                reason = res.get('blocked_reason')
+                full_msg = f"{err_msg} ({reason})" if reason else err_msg
+                logger.error(f"❌ API Error for '{text[:10]}' ({season}): {full_msg}")
+                failed += 1
+        return generated, failed
+
+    def _unmask(self, text: str, mapping: dict) -> str:
+        return self.privacy.unmask(text, mapping) if mapping else text
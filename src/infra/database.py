@@ -23,6 +23,107 @@ def init_db():
     with engine.connect() as conn:
         conn.execute(text("PRAGMA journal_mode=WAL"))
         conn.commit()
+    migrate_prefetch_cache(engine)
+
+
+def _legacy_prompt_version(user_prompt: str) -> str:
+    """指紋導入前のキャッシュキーの版数 (PROMPT_VERSION + ユーザー指示のハッシュ)"""
+    import hashlib
+    from src.core.seasoning import PROMPT_VERSION
+
+    if not user_prompt:
+        return PROMPT_VERSION
+    return f"{PROMPT_VERSION}+{hashlib.sha256(user_prompt.encode()).hexdigest()[:8]}"
+
+
+def migrate_prefetch_cache(bind, chunk_size: int = 500) -> int:
+    """
+    旧 prefetch_cache (テキストごとの results JSON) を cache_entries (1行 = 結果1つ) に移す
+    Alembic導入前のため、起動時に旧テーブルの有無を見て移行し、移行後は旧テーブルを削除する。
+
+    現在の構成でも同じ出力になる結果だけを現在の指紋に付け替えて移す:
+    - 現在の指紋のキー (seasoning_N@<指紋>) はそのまま
+    - 指紋導入前のキー (seasoning_N@4.2 / 4.2+<指示ハッシュ>) は現在の版数・ユーザー指示と一致するもの
+    - 版数なしのキー (seasoning_N) はユーザー指示を使わずに作られたので、ユーザー指示が空のとき
+    それ以外 (古いプロンプトの結果) は起動時の回収で消えるだけなので移さない。
+    hash_id は現在の正規化規則で original_text から作り直す (旧キーのままでは引けない)。
+
+    Returns:
+        int: 移した結果の数
+    """
+    import json
+    from src.core.cache import CacheManager
+
+    with bind.connect() as conn:
+        exists = conn.execute(
+            text("SELECT name FROM sqlite_master WHERE type='table' AND name='prefetch_cache'")
+        ).first()
+        if not exists:
+            return 0
+
+        print("🔧 Migrating DB: prefetch_cache -> cache_entries...")
+        fingerprint = CacheManager.current_fingerprint()
+        legacy_version = _legacy_prompt_version(settings.USER_SYSTEM_PROMPT)
+        compatible = {fingerprint, legacy_version}
+        if not settings.USER_SYSTEM_PROMPT:
+            compatible.add(None)
+
+        migrated = 0
+        skipped = 0
+        last_id = ""
+        while True:
+            rows = conn.execute(
+                text(
+                    "SELECT hash_id, original_text, results, created_at, updated_at, last_accessed_at "
+                    "FROM prefetch_cache WHERE hash_id > :last ORDER BY hash_id LIMIT :limit"
+                ),
+                {"last": last_id, "limit": chunk_size},
+            ).fetchall()
+            if not rows:
+                break
+            last_id = rows[-1][0]
+
+            params = []
+            for hash_id, original_text, results, created_at, updated_at, last_accessed_at in rows:
+                try:
+                    results = json.loads(results) if isinstance(results, str) else (results or {})
+                except ValueError:
+                    continue
+                if not original_text or not isinstance(results, dict):
+                    continue
+                for key, result in results.items():
+                    seasoning, version = CacheManager.parse_result_key(key)
+                    if seasoning is None or not isinstance(result, str):
+                        continue
+                    if version not in compatible:
+                        skipped += 1
+                        continue
+                    params.append({
+                        "hash_id": CacheManager.get_text_hash(original_text),
+                        "seasoning": seasoning,
+                        "fingerprint": fingerprint,
+                        "original_text": original_text,
+                        "result": result,
+                        "created_at": created_at,
+                        "updated_at": updated_at or created_at,
+                        "last_accessed_at": last_accessed_at or created_at,
+                    })
+            if params:
+                conn.execute(
+                    text(
+                        "INSERT OR IGNORE INTO cache_entries "
+                        "(hash_id, seasoning, fingerprint, original_text, result, created_at, updated_at, last_accessed_at) "
+                        "VALUES (:hash_id, :seasoning, :fingerprint, :original_text, :result, "
+                        ":created_at, :updated_at, :last_accessed_at)"
+                    ),
+                    params,
+                )
+                migrated += len(params)
+
+        conn.execute(text("DROP TABLE prefetch_cache"))
+        conn.commit()
+        print(f"✅ Migration Done. ({migrated} cache entries, {skipped} superseded results dropped)")
+        return migrated
 
 def get_db():
     db = SessionLocal()
@@ -0,0 +1,12 @@
+"""
+pytest 共通設定
+"""
+import pytest
+
+from src.core import vocab_store
+
+
+@pytest.fixture(autouse=True)
+def _isolated_vocab_store(tmp_path, monkeypatch):
+    """語彙ストアのシングルトンを一時DBに向ける (data/vocab.db・vocab.acidx を汚さない)"""
+    monkeypatch.setattr(vocab_store, "_store", vocab_store.VocabularyStore(db_path=tmp_path / "vocab.db"))
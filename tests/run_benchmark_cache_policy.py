@@ -0,0 +1,115 @@
+"""
+Benchmark: キャッシュ追い出し方針 (LRU vs W-TinyLFU) のヒット率
+
+アクセス列を再生し、同じ容量で LRU と W-TinyLFU のヒット率を比べる。
+CacheManager と同じ手順 (参照を記録 → ミスなら書き込み → 溢れた行を消す) でシミュレートする。
+
+使い方:
+    python tests/run_benchmark_cache_policy.py                  # 合成トラフィック
+    python tests/run_benchmark_cache_policy.py --trace log.txt  # 1行1テキストのアクセスログを再生
+    python tests/run_benchmark_cache_policy.py --capacity 500
+
+合成トラフィックは当アプリの使われ方を模したもの:
+- 定型の挨拶・返信 (Zipf 分布で偏る) が大半
+- 一度きりの長文が混ざる
+- 途中で Warmup (定型文リストの一巡) が走る
+"""
+import argparse
+import os
+import random
+import sys
+from collections import OrderedDict
+
+# プロジェクトルートをパスに追加
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.eviction import WindowTinyLFUPolicy
+
+
+def synthetic_trace(
+    requests: int = 50000,
+    templates: int = 2000,
+    one_off_ratio: float = 0.3,
+    warmup_size: int = 3000,
+    zipf: float = 0.9,
+    seed: int = 42,
+) -> list[str]:
+    """定型文 (Zipf) + 一度きりの長文 + 途中の Warmup 一巡"""
+    rng = random.Random(seed)
+    weights = [1.0 / (rank ** zipf) for rank in range(1, templates + 1)]
+    hot = rng.choices(range(templates), weights=weights, k=requests)
+
+    trace = []
+    warmup_at = requests // 2
+    for i, rank in enumerate(hot):
+        if i == warmup_at:
+            trace.extend(f"warmup-{n}" for n in range(warmup_size))
+        if rng.random() < one_off_ratio:
+            trace.append(f"one-off-{i}")
+        else:
+            trace.append(f"template-{rank}")
+    return trace
+
+
+def load_trace(path: str) -> list[str]:
+    from src.core.cache import CacheManager
+    with open(path, encoding="utf-8") as f:
+        return [CacheManager.get_text_hash(line.rstrip("\n")) for line in f if line.strip()]
+
+
+def replay_lru(trace: list[str], capacity: int) -> float:
+    entries: OrderedDict = OrderedDict()
+    hits = 0
+    for key in trace:
+        if key in entries:
+            entries.move_to_end(key)
+            hits += 1
+            continue
+        entries[key] = None
+        if len(entries) > capacity:
+            entries.popitem(last=False)
+    return hits / len(trace)
+
+
+def replay_tinylfu(trace: list[str], capacity: int, window_ratio: float) -> float:
+    policy = WindowTinyLFUPolicy(capacity, window_ratio=window_ratio)
+    policy.load([])
+    hits = 0
+    for key in trace:
+        if key in policy:
+            policy.record(key)
+            hits += 1
+            continue
+        policy.record(key, hit=False)
+        policy.add(key)
+    return hits / len(trace)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay an access trace against LRU and W-TinyLFU")
+    parser.add_argument("--trace", help="1行1テキストのアクセスログ (省略時は合成トラフィック)")
+    parser.add_argument("--capacity", type=int, default=None, help="行数の上限 (既定: CACHE_MAX_ENTRIES)")
+    parser.add_argument("--window", type=float, default=None, help="窓の割合 (既定: CACHE_TINYLFU_WINDOW_RATIO)")
+    args = parser.parse_args()
+
+    from src.core.config import settings
+    capacity = args.capacity or settings.CACHE_MAX_ENTRIES
+    window = settings.CACHE_TINYLFU_WINDOW_RATIO if args.window is None else args.window
+
+    if args.trace:
+        trace = load_trace(args.trace)
+        source = args.trace
+    else:
+        trace = synthetic_trace()
+        source = "synthetic"
+
+    print(f"📊 Cache policy replay ({source}: {len(trace)} requests, {len(set(trace))} unique, capacity {capacity})")
+    for name, capacity_ratio in (("1/4", 0.25), ("1/2", 0.5), ("full", 1.0)):
+        size = max(2, int(capacity * capacity_ratio))
+        lru = replay_lru(trace, size)
+        tinylfu = replay_tinylfu(trace, size, window)
+        print(f"  capacity {size:>6} ({name:>4}): LRU {lru:6.1%}  W-TinyLFU {tinylfu:6.1%}  ({tinylfu - lru:+.1%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,6 +6,7 @@ FastAPI TestClient を使用した統合テスト
 """
 import sys
 import os
+import json
 import unittest
 from unittest.mock import patch, MagicMock
 from fastapi.testclient import TestClient
@@ -132,6 +133,75 @@ class TestCoreEndpoints(unittest.TestCase):
         # Depending on implementation, may need auth
         self.assertIn(response.status_code, [200, 401, 403])
 
+    def test_cache_snapshot_export(self):
+        """GET /cache/snapshot - gzip のスナップショットを返す"""
+        import gzip
+        import json
+        response = self.client.get("/cache/snapshot", headers=self.headers)
+        if response.status_code in (401, 403):
+            return
+        self.assertEqual(response.status_code, 200)
+        header = json.loads(gzip.decompress(response.content).decode("utf-8").splitlines()[0])
+        self.assertEqual(header["format"], "flow-cache-snapshot")
+
+    def test_cache_snapshot_import_rejects_garbage(self):
+        """POST /cache/snapshot - スナップショットでない本文は 400"""
+        response = self.client.post("/cache/snapshot", content=b"not a snapshot", headers=self.headers)
+        self.assertIn(response.status_code, [400, 401, 403])
+
+
+
+class TestPrefetchAuth(unittest.TestCase):
+    """先読みは Gemini を呼ぶので認証が要ること"""
+
+    def setUp(self):
+        self.client = TestClient(app)
+
+    def test_prefetch_requires_token(self):
+        with patch("src.api.main.settings.API_TOKEN", "secret-token"):
+            response = self.client.post("/prefetch", json={"text": "test", "target_seasoning_levels": [30]})
+            self.assertEqual(response.status_code, 401)
+            response = self.client.get("/prefetch/abc")
+            self.assertEqual(response.status_code, 401)
+
+
+class TestVocabEndpoints(unittest.TestCase):
+    """語彙のインポート・エクスポートのテスト (一時DBの語彙ストアを使う)"""
+
+    def setUp(self):
+        import tempfile
+        from pathlib import Path
+        from src.core.vocab_store import VocabularyStore
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = VocabularyStore(db_path=Path(self.tmp.name) / "vocab.db")
+        self.store.publish_delay = 0
+        patcher = patch("src.api.routes.vocab.get_vocab_store", return_value=self.store)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.tmp.cleanup)
+        self.addCleanup(self.store.close)
+        self.client = TestClient(app)
+        self.headers = {}
+
+    def test_vocab_import_and_export(self):
+        """POST /vocab/import → GET /vocab/export"""
+        body = "term,category\nプロジェクトX,project\n山田部長,person\n".encode("utf-8")
+        response = self.client.post("/vocab/import?format=csv", content=body, headers=self.headers)
+        if response.status_code in (401, 403):
+            return
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["data"]["added"], 2)
+
+        response = self.client.get("/vocab/export?format=jsonl", headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        terms = [json.loads(line)["term"] for line in response.text.splitlines()]
+        self.assertEqual(terms, ["プロジェクトX", "山田部長"])
+
+    def test_vocab_import_rejects_unknown_format(self):
+        """POST /vocab/import - 未知の形式は 400"""
+        response = self.client.post("/vocab/import?format=xml", content=b"", headers=self.headers)
+        self.assertIn(response.status_code, [400, 401, 403])
+
 
 if __name__ == "__main__":
     unittest.main()
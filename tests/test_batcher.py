@@ -0,0 +1,141 @@
+"""
+MicroBatcher テスト
+"""
+import asyncio
+import json
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from src.core.batcher import MicroBatcher
+from src.core.gemini import GeminiClient
+from src.core.breaker import CircuitBreaker
+
+CONFIG = {"system": "sys", "params": {"temperature": 0.3}}
+
+
+def _ok(text):
+    return {"success": True, "result": text, "error": None, "blocked_reason": None}
+
+
+class TestMicroBatcher:
+    @pytest.mark.asyncio
+    async def test_concurrent_short_texts_share_one_batch(self):
+        send_batch = AsyncMock(side_effect=lambda texts, c, m: {
+            "success": True, "results": [t.upper() for t in texts]
+        })
+        send_one = AsyncMock()
+        batcher = MicroBatcher(send_batch, send_one, window_ms=5, max_batch=10)
+
+        results = await asyncio.gather(*[batcher.submit(t, CONFIG, "m") for t in ["a", "b", "c"]])
+
+        assert [r["result"] for r in results] == ["A", "B", "C"]
+        send_batch.assert_called_once()
+        send_one.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_single_item_uses_single_call(self):
+        send_batch = AsyncMock()
+        send_one = AsyncMock(return_value=_ok("single"))
+        batcher = MicroBatcher(send_batch, send_one, window_ms=1, max_batch=10)
+
+        result = await batcher.submit("a", CONFIG, "m")
+        assert result["result"] == "single"
+        send_batch.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_different_configs_are_not_mixed(self):
+        send_batch = AsyncMock(side_effect=lambda texts, c, m: {"success": True, "results": texts})
+        send_one = AsyncMock(side_effect=lambda t, c, m: _ok(t))
+        batcher = MicroBatcher(send_batch, send_one, window_ms=5, max_batch=10)
+        other = {"system": "other", "params": {"temperature": 0.3}}
+
+        await asyncio.gather(batcher.submit("a", CONFIG, "m"), batcher.submit("b", other, "m"))
+        send_batch.assert_not_called()
+        assert send_one.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_max_batch_flushes_immediately(self):
+        send_batch = AsyncMock(side_effect=lambda texts, c, m: {"success": True, "results": texts})
+        batcher = MicroBatcher(send_batch, AsyncMock(), window_ms=10_000, max_batch=2)
+
+        results = await asyncio.wait_for(
+            asyncio.gather(batcher.submit("a", CONFIG, "m"), batcher.submit("b", CONFIG, "m")),
+            timeout=1,
+        )
+        assert [r["result"] for r in results] == ["a", "b"]
+
+    @pytest.mark.asyncio
+    async def test_failed_batch_falls_back_to_single_calls(self):
+        send_batch = AsyncMock(return_value={"success": False, "results": [], "error": "batch_mismatch"})
+        send_one = AsyncMock(side_effect=lambda t, c, m: _ok(f"single-{t}"))
+        batcher = MicroBatcher(send_batch, send_one, window_ms=5, max_batch=10)
+
+        results = await asyncio.gather(batcher.submit("a", CONFIG, "m"), batcher.submit("b", CONFIG, "m"))
+        assert [r["result"] for r in results] == ["single-a", "single-b"]
+        assert batcher.fallbacks == 1
+
+
+    @pytest.mark.asyncio
+    async def test_outage_batch_is_not_fanned_out(self):
+        send_batch = AsyncMock(return_value={
+            "success": False, "results": [], "error": "api_error", "blocked_reason": "503", "fallback": False,
+        })
+        send_one = AsyncMock()
+        batcher = MicroBatcher(send_batch, send_one, window_ms=5, max_batch=10)
+
+        results = await asyncio.gather(batcher.submit("a", CONFIG, "m"), batcher.submit("b", CONFIG, "m"))
+        assert [r["error"] for r in results] == ["api_error", "api_error"]
+        send_one.assert_not_awaited()
+        assert batcher.fallbacks == 0
+
+class TestGeminiGenerateBatch:
+    @pytest.fixture
+    def client(self):
+        client = GeminiClient()
+        client.breaker = CircuitBreaker(failure_threshold=10)
+        client.client = MagicMock()
+        return client
+
+    @pytest.mark.asyncio
+    async def test_parses_json_array(self, client):
+        client.client.aio.models.generate_content = AsyncMock(
+            return_value=MagicMock(text=json.dumps(["おはようございます。", "お疲れ様です。"]))
+        )
+        result = await client.generate_batch(["おはよう", "おつかれ"], CONFIG, "m")
+        assert result["success"] is True
+        assert result["results"] == ["おはようございます。", "お疲れ様です。"]
+
+    @pytest.mark.asyncio
+    async def test_count_mismatch_is_failure(self, client):
+        client.client.aio.models.generate_content = AsyncMock(return_value=MagicMock(text='["only one"]'))
+        result = await client.generate_batch(["a", "b"], CONFIG, "m")
+        assert result["success"] is False
+        assert result["error"] == "batch_mismatch"
+
+    @pytest.mark.asyncio
+    async def test_outage_marks_batch_not_retryable(self, client):
+        client.client.aio.models.generate_content = AsyncMock(side_effect=RuntimeError("503 unavailable"))
+        result = await client.generate_batch(["a", "b"], CONFIG, "m")
+        assert result["success"] is False
+        assert result["fallback"] is False
+
+    @pytest.mark.asyncio
+    async def test_fallback_calls_go_through_breaker(self, client):
+        client.breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=60)
+        client.breaker.record_failure()
+        client.client.aio.models.generate_content = AsyncMock()
+        result = await client._generate_content_guarded("a", CONFIG, "m")
+        assert result["error"] == "circuit_open"
+        client.client.aio.models.generate_content.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_generate_content_routes_short_text_to_batcher(self, client):
+        client.client.aio.models.generate_content = AsyncMock(
+            return_value=MagicMock(text='["A", "B"]', candidates=[])
+        )
+        with patch("src.core.gemini.settings.MICRO_BATCH_ENABLED", True):
+            results = await asyncio.gather(
+                client.generate_content("a", CONFIG, model="m"),
+                client.generate_content("b", CONFIG, model="m"),
+            )
+        assert [r["result"] for r in results] == ["A", "B"]
+        assert client.client.aio.models.generate_content.call_count == 1
@@ -0,0 +1,138 @@
+"""
+CircuitBreaker テスト
+"""
+import time
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from src.core.breaker import CircuitBreaker, STATE_CLOSED, STATE_OPEN, STATE_HALF_OPEN
+from src.core.gemini import GeminiClient
+from src.core.processor import CoreProcessor
+from src.core.models import TextRequest
+
+
+class TestCircuitBreaker:
+    def test_opens_after_threshold(self):
+        breaker = CircuitBreaker(failure_threshold=3, recovery_timeout=60, half_open_max_calls=1)
+        for _ in range(2):
+            breaker.record_failure()
+        assert breaker.state == STATE_CLOSED
+        breaker.record_failure()
+        assert breaker.state == STATE_OPEN
+        assert breaker.allow_request() is False
+
+    def test_success_resets_failures(self):
+        breaker = CircuitBreaker(failure_threshold=2, recovery_timeout=60, half_open_max_calls=1)
+        breaker.record_failure()
+        breaker.record_success()
+        breaker.record_failure()
+        assert breaker.state == STATE_CLOSED
+
+    def test_half_open_allows_limited_probes(self):
+        breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=0.01, half_open_max_calls=1)
+        breaker.record_failure()
+        time.sleep(0.02)
+        assert breaker.state == STATE_HALF_OPEN
+        assert breaker.allow_request() is True
+        assert breaker.allow_request() is False
+
+    def test_half_open_failure_reopens(self):
+        breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=0.01, half_open_max_calls=1)
+        breaker.record_failure()
+        time.sleep(0.02)
+        assert breaker.allow_request()
+        breaker.record_failure()
+        assert breaker.snapshot()["state"] == STATE_OPEN
+
+    def test_half_open_success_closes(self):
+        breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=0.01, half_open_max_calls=1)
+        breaker.record_failure()
+        time.sleep(0.02)
+        assert breaker.allow_request()
+        breaker.record_success()
+        assert breaker.state == STATE_CLOSED
+
+
+class TestGeminiClientBreaker:
+    @pytest.mark.asyncio
+    async def test_open_circuit_skips_upstream(self):
+        client = GeminiClient()
+        client.client = MagicMock()
+        client.client.aio.models.generate_content = AsyncMock()
+        client.breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=60, half_open_max_calls=1)
+        client.breaker.record_failure()
+
+        result = await client.generate_content("text", {"system": "s", "params": {}}, model="m")
+        assert result["error"] == "circuit_open"
+        client.client.aio.models.generate_content.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_client_errors_do_not_trip(self):
+        class BadRequest(Exception):
+            code = 400
+
+        client = GeminiClient()
+        client.client = MagicMock()
+        client.client.aio.models.generate_content = AsyncMock(side_effect=BadRequest())
+        client.breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=60, half_open_max_calls=1)
+
+        await client.generate_content("text", {"system": "s", "params": {}}, model="m")
+        assert client.breaker.state == STATE_CLOSED
+
+
+    @pytest.mark.asyncio
+    async def test_joined_callers_share_half_open_probe(self):
+        """half_open の試験呼び出しに合流した呼び出しは circuit_open にならず、試験の結果を受け取ること"""
+        import asyncio
+        from unittest.mock import patch
+
+        async def slow_ok(**kwargs):
+            await asyncio.sleep(0.02)
+            return MagicMock(text="ok", candidates=[])
+
+        client = GeminiClient()
+        client.client = MagicMock()
+        client.client.aio.models.generate_content = AsyncMock(side_effect=slow_ok)
+        client.breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=0.01, half_open_max_calls=1)
+        client.breaker.record_failure()
+        time.sleep(0.02)
+
+        config = {"system": "s", "params": {}}
+        with patch("src.core.gemini.settings.GEMINI_SINGLE_FLIGHT", True), \
+                patch("src.core.gemini.settings.MICRO_BATCH_ENABLED", False):
+            results = await asyncio.gather(*[client.generate_content("text", config, model="m") for _ in range(3)])
+
+        assert [r["result"] for r in results] == ["ok", "ok", "ok"]
+        assert client.client.aio.models.generate_content.call_count == 1
+        assert client.breaker.state == STATE_CLOSED
+
+class TestProcessorDegradedMode:
+    @pytest.fixture
+    def processor(self):
+        processor = CoreProcessor()
+        processor.gemini_client = MagicMock()
+        processor.gemini_client.generate_content = AsyncMock(return_value={
+            "success": False, "result": "", "error": "circuit_open", "blocked_reason": "down"
+        })
+        return processor
+
+    @pytest.mark.asyncio
+    async def test_open_circuit_enqueues_sync_job(self, processor):
+        from sqlalchemy import create_engine
+        from sqlalchemy.orm import sessionmaker
+        from src.core.models import Base, SyncJob
+        engine = create_engine("sqlite:///:memory:")
+        Base.metadata.create_all(engine)
+        db = sessionmaker(bind=engine)()
+
+        result = await processor.process(TextRequest(text="障害中", seasoning=30), db)
+
+        assert result["error"] == "circuit_open"
+        job = db.query(SyncJob).filter_by(id=result["job_id"]).first()
+        assert job is not None and job.status == "pending"
+        db.close()
+
+    @pytest.mark.asyncio
+    async def test_open_circuit_without_db(self, processor):
+        result = await processor.process(TextRequest(text="障害中", seasoning=30), db=None)
+        assert result["error"] == "circuit_open"
+        assert "job_id" not in result
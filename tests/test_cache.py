@@ -2,7 +2,7 @@
 import pytest
 from unittest.mock import MagicMock
 from src.core.cache import CacheManager
-from src.core.models import PrefetchCache
+from src.core.models import CacheEntry
 
 class TestCacheManager:
     def setup_method(self):
@@ -31,7 +31,7 @@ class TestCacheManager:
         text_hash = CacheManager.get_text_hash(text)
         
         mock_cache = MagicMock()
-        mock_cache.results = {f"seasoning_{seasoning}": "cached_result"}
+        mock_cache.result = "cached_result"
         # Fix: created_at must be set to avoid attribute error in logging/ttl check or logic
         from datetime import datetime
         mock_cache.created_at = datetime.utcnow()
@@ -52,9 +52,9 @@ class TestCacheManager:
         result = self.manager.check_cache(self.mock_db, "text", 50)
         assert result is None
 
-    def test_check_cache_miss_key_missing(self):
+    def test_check_cache_miss_result_missing(self):
         mock_cache = MagicMock()
-        mock_cache.results = {"other_key": "res"}
+        mock_cache.result = None
         self.mock_db.query.return_value.filter.return_value.first.return_value = mock_cache
         result = self.manager.check_cache(self.mock_db, "text", 50)
         assert result is None
@@ -63,7 +63,7 @@ class TestCacheManager:
         text = "test_text"
         seasoning = 50
         mock_cache = MagicMock()
-        mock_cache.results = {f"seasoning_{seasoning}": "Error: api failed"}
+        mock_cache.result = "Error: api failed"
         self.mock_db.query.return_value.filter.return_value.first.return_value = mock_cache
         
         result = self.manager.check_cache(self.mock_db, text, seasoning)
@@ -115,8 +115,8 @@ class TestCacheManagerLRU:
     
     def test_enforce_limit_under_limit(self):
         """制限内なら削除しない"""
-        # count() が制限以下を返す
-        self.mock_db.query.return_value.count.return_value = 10  # 制限以下
+        # count が制限以下を返す
+        self.mock_db.query.return_value.scalar.return_value = 10  # 制限以下
         
         self.manager._enforce_limit(self.mock_db)
         
@@ -124,15 +124,85 @@ class TestCacheManagerLRU:
         self.mock_db.query.return_value.filter.return_value.delete.assert_not_called()
     
     def test_enforce_limit_over_limit(self):
-        """制限超過なら削除処理が実行される (CACHE_MAX_ENTRIES=100)"""
+        """制限超過なら古い順に削除される"""
+        from unittest.mock import patch
         mock_query = MagicMock()
-        mock_query.count.return_value = 150  # 100を超過
+        mock_query.scalar.return_value = 150  # 100を超過
         # order_by等のチェーンをモック
-        mock_query.order_by.return_value.limit.return_value.all.return_value = [("hash_1",)]
+        mock_query.order_by.return_value.limit.return_value.all.return_value = [(1, "hash_1", 60, "")]
+        mock_query.filter.return_value.all.return_value = []
         
         self.mock_db.query.return_value = mock_query
         
-        self.manager._enforce_limit(self.mock_db)
+        with patch("src.core.config.settings.CACHE_MAX_ENTRIES", 100):
+            self.manager._enforce_limit(self.mock_db)
         
-        # count が呼ばれたことを確認（制限チェックが実行された）
-        mock_query.count.assert_called_once()
+        mock_query.order_by.return_value.limit.assert_called_once_with(50)
+        mock_query.filter.return_value.delete.assert_called_once()
+
+    def test_enforce_limit_counts_in_memory(self):
+        """件数は毎回 COUNT(*) せず、メモリ上で数える"""
+        self.mock_db.query.return_value.scalar.return_value = 10
+        self.manager._enforce_limit(self.mock_db)
+        self.manager._enforce_limit(self.mock_db)
+        self.mock_db.query.return_value.scalar.assert_called_once()
+
+
+class TestL1Cache:
+    """L1 (プロセス内) キャッシュのテスト"""
+
+    def setup_method(self):
+        from src.core.cache import L1Cache
+        self.l1 = L1Cache(max_entries=2, ttl_hours=1)
+
+    def test_hit_and_miss_counters(self):
+        assert self.l1.get("h1", "seasoning_30") is None
+        self.l1.put("h1", "seasoning_30", "結果")
+        assert self.l1.get("h1", "seasoning_30") == "結果"
+        stats = self.l1.stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+
+    def test_lru_eviction(self):
+        self.l1.put("h1", "k", "1")
+        self.l1.put("h2", "k", "2")
+        self.l1.get("h1", "k")  # h1 を最近使用に
+        self.l1.put("h3", "k", "3")
+        assert self.l1.get("h2", "k") is None
+        assert self.l1.get("h1", "k") == "1"
+
+    def test_ttl_follows_created_at(self):
+        from datetime import datetime, timedelta
+        self.l1.put("h1", "k", "old", created_at=datetime.utcnow() - timedelta(hours=2))
+        assert self.l1.get("h1", "k") is None
+
+    def test_ttl_is_per_result_key(self):
+        """同じテキストでも、古い段階の結果は自分の作成時刻で期限切れになること"""
+        from datetime import datetime, timedelta
+        self.l1.put("h1", "seasoning_30", "new")
+        self.l1.put("h1", "seasoning_60", "old", created_at=datetime.utcnow() - timedelta(hours=2))
+        assert self.l1.get("h1", "seasoning_60") is None
+        assert self.l1.get("h1", "seasoning_30") == "new"
+
+    def test_l1_hit_skips_db(self):
+        manager = CacheManager()
+        mock_db = MagicMock()
+        text_hash = CacheManager.get_text_hash("text")
+        manager.l1.put(text_hash, "seasoning_30", "cached")
+
+        result = manager.check_cache(mock_db, "text", 30)
+        assert result["result"] == "cached"
+        mock_db.query.assert_not_called()
+
+    def test_l2_hit_populates_l1(self):
+        from datetime import datetime
+        manager = CacheManager()
+        mock_db = MagicMock()
+        mock_cache = MagicMock()
+        mock_cache.result = "cached"
+        mock_cache.created_at = datetime.utcnow()
+        mock_db.query.return_value.filter.return_value.first.return_value = mock_cache
+
+        manager.check_cache(mock_db, "text", 30)
+        manager.check_cache(mock_db, "text", 30)
+        assert mock_db.query.call_count == 1
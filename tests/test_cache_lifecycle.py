@@ -8,7 +8,7 @@ from sqlalchemy.orm import sessionmaker
 # Add src to path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
-from src.core.models import Base, PrefetchCache
+from src.core.models import Base, CacheEntry
 from src.core.cache import CacheManager
 from src.core.config import settings
 
@@ -31,10 +31,11 @@ class TestCacheLifecycle(unittest.TestCase):
         text = "old_onigiri"
         text_hash = self.mgr.get_text_hash(text)
         
-        item = PrefetchCache(
+        item = CacheEntry(
             hash_id=text_hash,
+            seasoning=30,
             original_text=text,
-            results={"seasoning_30": "stale data"},
+            result="stale data",
             created_at=old_date,
             last_accessed_at=old_date
         )
@@ -42,12 +43,14 @@ class TestCacheLifecycle(unittest.TestCase):
         self.db.commit()
 
         # 2. Check Cache
-        # ヒットしない（期限切れで削除される）はず
+        # ヒットしない（期限切れ）はず。リクエスト中は削除しない
         result = self.mgr.check_cache(self.db, text, 30)
         self.assertIsNone(result, "期限切れデータはNoneを返すべき")
-        
-        # DBからも消えているか確認
-        check = self.db.query(PrefetchCache).filter_by(hash_id=text_hash).first()
+        self.assertIsNotNone(self.db.query(CacheEntry).filter_by(hash_id=text_hash).first())
+
+        # 3. 保守タスクの一括削除で消える
+        self.assertEqual(self.mgr.sweep_expired(self.db), 1)
+        check = self.db.query(CacheEntry).filter_by(hash_id=text_hash).first()
         self.assertIsNone(check, "期限切れデータは削除されるべき")
 
     def test_lru_limit(self):
@@ -64,8 +67,8 @@ class TestCacheLifecycle(unittest.TestCase):
                 h = self.mgr.get_text_hash(t)
                 # last_accessed_at をずらす (item_0 が一番古い)
                 acc = datetime.utcnow() - timedelta(minutes=10 - i)
-                item = PrefetchCache(
-                    hash_id=h, original_text=t, results={}, 
+                item = CacheEntry(
+                    hash_id=h, seasoning=30, original_text=t, result="r", 
                     created_at=datetime.utcnow(), last_accessed_at=acc
                 )
                 self.db.add(item)
@@ -73,7 +76,7 @@ class TestCacheLifecycle(unittest.TestCase):
             self.db.commit()
             
             # Count check
-            count = self.db.query(PrefetchCache).count()
+            count = self.db.query(CacheEntry).count()
             self.assertEqual(count, 2)
             
             # 2. 3件目を追加 (制限発動)
@@ -81,8 +84,8 @@ class TestCacheLifecycle(unittest.TestCase):
             # 3件目を追加
             t3 = "item_new"
             h3 = self.mgr.get_text_hash(t3)
-            item3 = PrefetchCache(
-                hash_id=h3, original_text=t3, results={},
+            item3 = CacheEntry(
+                hash_id=h3, seasoning=30, original_text=t3, result="r",
                 created_at=datetime.utcnow(), last_accessed_at=datetime.utcnow()
             )
             self.db.add(item3)
@@ -92,18 +95,220 @@ class TestCacheLifecycle(unittest.TestCase):
             self.mgr._enforce_limit(self.db)
             
             # 残りは2件のはず
-            count = self.db.query(PrefetchCache).count()
+            count = self.db.query(CacheEntry).count()
             self.assertEqual(count, 2, "3件追加後は2件に削減されるべき")
             
             # 一番古かった item_0 (items[0]) が消えているはず
-            check_old = self.db.query(PrefetchCache).filter_by(hash_id=items[0]).first()
+            check_old = self.db.query(CacheEntry).filter_by(hash_id=items[0]).first()
             self.assertIsNone(check_old, "一番古いデータが削除されるべき")
             
             # item_1 と item_new は残っているはず
-            check_1 = self.db.query(PrefetchCache).filter_by(hash_id=items[1]).first()
-            check_new = self.db.query(PrefetchCache).filter_by(hash_id=h3).first()
+            check_1 = self.db.query(CacheEntry).filter_by(hash_id=items[1]).first()
+            check_new = self.db.query(CacheEntry).filter_by(hash_id=h3).first()
             self.assertIsNotNone(check_1)
             self.assertIsNotNone(check_new)
+    def test_warmup_multi_level_single_call(self):
+        """Warmup: 3段階を1回の呼び出しで埋めること"""
+        import asyncio
+        from unittest.mock import AsyncMock, MagicMock
+
+        client = MagicMock()
+        client.generate_multi_level = AsyncMock(return_value={
+            "success": True, "results": {30: "L", 60: "M", 100: "R"}
+        })
+        client.generate_content = AsyncMock()
+        privacy = MagicMock()
+        privacy.mask.side_effect = lambda t: (t, {})
+
+        stats = asyncio.run(self.mgr.warmup_from_list(self.db, ["お疲れ様です"], client, privacy))
+
+        self.assertEqual(stats["processed"], 1)
+        client.generate_multi_level.assert_called_once()
+        client.generate_content.assert_not_called()
+        results = CacheManager.get_results(self.db, self.mgr.get_text_hash("お疲れ様です"))
+        self.assertEqual(results["seasoning_60"], "M")
+
+    def test_warmup_multi_level_fills_gaps_individually(self):
+        """Warmup: 一括生成で欠けた段階だけ個別に呼ぶこと"""
+        import asyncio
+        from unittest.mock import AsyncMock, MagicMock
+
+        client = MagicMock()
+        client.generate_multi_level = AsyncMock(return_value={"success": True, "results": {30: "L"}})
+        client.generate_content = AsyncMock(return_value={"success": True, "result": "single"})
+        privacy = MagicMock()
+        privacy.mask.side_effect = lambda t: (t, {})
+
+        asyncio.run(self.mgr.warmup_from_list(self.db, ["お疲れ様です"], client, privacy))
+
+        self.assertEqual(client.generate_content.call_count, 2)
+        self.assertEqual(self.db.query(CacheEntry).count(), 3)
+
+    def test_store_drops_superseded_results_for_same_level(self):
+        """遅延無効化: 同じ段階を新しい指紋で書いたら旧指紋の結果を捨てること"""
+        self.mgr.store_results(self.db, "定型文", {30: "old", 60: "old-m"}, "4.2#old")
+        self.mgr.store_results(self.db, "定型文", {30: "new"}, "4.2#new")
+
+        rows = {(r.seasoning, r.fingerprint): r.result for r in self.db.query(CacheEntry).all()}
+        self.assertEqual(rows, {(30, "4.2#new"): "new", (60, "4.2#old"): "old-m"})
+
+    def test_get_results_only_current_fingerprint(self):
+        """get_results: 指定した指紋の結果だけを旧形式のキー (seasoning_N) で返すこと"""
+        self.mgr.store_results(self.db, "定型文", {30: "old", 60: "old-m"}, "4.2#old")
+        self.mgr.store_results(self.db, "定型文", {30: "new"}, "4.2#new")
+
+        text_hash = self.mgr.get_text_hash("定型文")
+        self.assertEqual(CacheManager.get_results(self.db, text_hash, "4.2#new"), {"seasoning_30": "new"})
+        self.assertEqual(CacheManager.get_results(self.db, text_hash), {})
+
+    def test_reclaim_superseded(self):
+        """旧構成の行を回収すること"""
+        self.mgr.store_results(self.db, "両方", {30: "old"}, "4.2#old")
+        self.mgr.store_results(self.db, "両方", {60: "new"}, "4.2#new")
+        self.mgr.store_results(self.db, "旧のみ", {30: "old"}, "4.2#old")
+
+        stats = self.mgr.reclaim_superseded(self.db, "4.2#new", chunk_size=1)
+
+        self.assertEqual(stats, {"deleted": 2})
+        rows = self.db.query(CacheEntry).all()
+        self.assertEqual(len(rows), 1)
+        self.assertEqual((rows[0].seasoning, rows[0].fingerprint, rows[0].result), (60, "4.2#new", "new"))
+        self.assertIsNone(self.mgr.check_cache(self.db, "両方", 30, "4.2#old"))
+
+    def test_migrate_legacy_prefetch_cache(self):
+        """旧 prefetch_cache の JSON を1行1結果に移し、旧テーブルを削除すること"""
+        import json
+        from unittest.mock import patch
+        from sqlalchemy import text
+        from src.infra.database import migrate_prefetch_cache
+
+        fingerprint = CacheManager.current_fingerprint()
+        with self.engine.connect() as conn:
+            conn.execute(text(
+                "CREATE TABLE prefetch_cache (hash_id VARCHAR PRIMARY KEY, original_text TEXT, results JSON, "
+                "created_at DATETIME, updated_at DATETIME, last_accessed_at DATETIME)"
+            ))
+            conn.execute(text("INSERT INTO prefetch_cache VALUES ('h1', '本文', :results, :now, NULL, NULL)"),
+                         {"now": datetime.utcnow(), "results": json.dumps({
+                             "seasoning_30": "版なし",
+                             "seasoning_60@4.2": "旧方式",
+                             "seasoning_100@" + fingerprint: "現行",
+                             "seasoning_60@4.1": "古いプロンプト",
+                             "junk": "x",
+                         })})
+            conn.commit()
+
+        with patch("src.core.config.settings.USER_SYSTEM_PROMPT", ""):
+            self.assertEqual(migrate_prefetch_cache(self.engine), 3)
+
+        rows = {(r.hash_id, r.seasoning, r.fingerprint): r.result for r in self.db.query(CacheEntry).all()}
+        hash_id = CacheManager.get_text_hash("本文")
+        self.assertEqual(rows, {
+            (hash_id, 30, fingerprint): "版なし",
+            (hash_id, 60, fingerprint): "旧方式",
+            (hash_id, 100, fingerprint): "現行",
+        })
+        # 移した結果は現在の構成の検索で引ける
+        self.assertEqual(self.mgr.check_cache(self.db, "本文", 60, fingerprint)["result"], "旧方式")
+        with self.engine.connect() as conn:
+            self.assertIsNone(conn.execute(text(
+                "SELECT name FROM sqlite_master WHERE name='prefetch_cache'"
+            )).first())
+
+    def test_migrate_skips_results_made_without_user_prompt(self):
+        """ユーザー指示があるなら、指示なしで作られた版なし・別指示の結果は移さないこと"""
+        import json
+        from unittest.mock import patch
+        from sqlalchemy import text
+        from src.infra.database import migrate_prefetch_cache
+
+        with self.engine.connect() as conn:
+            conn.execute(text(
+                "CREATE TABLE prefetch_cache (hash_id VARCHAR PRIMARY KEY, original_text TEXT, results JSON, "
+                "created_at DATETIME, updated_at DATETIME, last_accessed_at DATETIME)"
+            ))
+            conn.execute(text("INSERT INTO prefetch_cache VALUES ('h1', '本文', :results, '2026-01-01 00:00:00', NULL, NULL)"),
+                         {"results": json.dumps({"seasoning_30": "版なし", "seasoning_60@4.2": "指示なし"})})
+            conn.commit()
+
+        with patch("src.core.config.settings.USER_SYSTEM_PROMPT", "敬語で"):
+            self.assertEqual(migrate_prefetch_cache(self.engine), 0)
+
+    def test_hit_buffers_access_time(self):
+        """ヒットしても SQLite に書かず、flush_touches でまとめて書くこと"""
+        old = datetime.utcnow() - timedelta(hours=1)
+        self.mgr.store_result(self.db, "おはよう", 30, "おはようございます")
+        self.db.query(CacheEntry).update({"last_accessed_at": old})
+        self.db.commit()
+
+        self.mgr.l1.clear()
+        self.assertIsNotNone(self.mgr.check_cache(self.db, "おはよう", 30))
+        self.assertFalse(self.db.dirty)
+        self.assertEqual(self.db.query(CacheEntry.last_accessed_at).scalar(), old)
+
+        self.assertEqual(self.mgr.flush_touches(), 1)
+        self.db.expire_all()
+        self.assertGreater(self.db.query(CacheEntry.last_accessed_at).scalar(), old)
+
+    def test_touches_flush_after_n_hits(self):
+        """CACHE_TOUCH_FLUSH_HITS 件たまったら書くこと"""
+        from unittest.mock import patch
+        self.mgr.store_result(self.db, "了解", 30, "承知しました")
+        self.mgr.store_result(self.db, "確認", 30, "確認しました")
+        with patch("src.core.config.settings.CACHE_TOUCH_FLUSH_HITS", 2):
+            self.mgr.l1.clear()
+            self.mgr.check_cache(self.db, "了解", 30)
+            self.assertEqual(len(self.mgr._touches), 1)
+            self.mgr.check_cache(self.db, "確認", 30)
+        self.assertEqual(self.mgr._touches, {})
+
+    def test_eviction_sees_buffered_access_times(self):
+        """追い出しの前に貯めた参照時刻を書き、最近使った行を消さないこと"""
+        from unittest.mock import patch
+        with patch("src.core.config.settings.CACHE_MAX_ENTRIES", 2):
+            self.mgr.store_result(self.db, "古いがよく使う", 30, "a")
+            self.mgr.store_result(self.db, "新しい", 30, "b")
+            self.db.query(CacheEntry).filter(CacheEntry.original_text == "古いがよく使う").update(
+                {"last_accessed_at": datetime.utcnow() - timedelta(hours=1)}
+            )
+            self.db.commit()
+            self.mgr.l1.clear()
+            self.assertIsNotNone(self.mgr.check_cache(self.db, "古いがよく使う", 30))
+
+            self.mgr.store_result(self.db, "三件目", 30, "c")
+
+        texts = {r.original_text for r in self.db.query(CacheEntry).all()}
+        self.assertEqual(texts, {"古いがよく使う", "三件目"})
+
+    def test_l1_hits_keep_row_in_l2(self):
+        """L1 だけでヒットし続けた行も、L2 の LRU で最初に追い出されないこと"""
+        from unittest.mock import patch
+        with patch("src.core.config.settings.CACHE_MAX_ENTRIES", 3):
+            self.mgr.store_result(self.db, "よく使う", 30, "a")
+            self.db.query(CacheEntry).update({"last_accessed_at": datetime.utcnow() - timedelta(hours=1)})
+            self.db.commit()
+            self.mgr.store_result(self.db, "二件目", 30, "b")
+            self.mgr.store_result(self.db, "三件目", 30, "c")
+            for _ in range(10):
+                self.assertIsNotNone(self.mgr.check_cache(self.db, "よく使う", 30))
+            self.assertEqual(self.mgr.l1.hits, 10)
+
+            self.mgr.store_result(self.db, "四件目", 30, "d")
+
+        texts = {r.original_text for r in self.db.query(CacheEntry).all()}
+        self.assertEqual(texts, {"よく使う", "三件目", "四件目"})
+
+    def test_lru_and_ttl_use_indexes(self):
+        """LRU・TTL の走査が索引を使うこと（表全体の並べ替えをしない）"""
+        from sqlalchemy import text
+        with self.engine.connect() as conn:
+            for column in ("last_accessed_at", "created_at"):
+                plan = " ".join(str(row[-1]) for row in conn.execute(text(
+                    f"EXPLAIN QUERY PLAN SELECT id FROM cache_entries ORDER BY {column} LIMIT 10"
+                )))
+                self.assertIn(f"ix_cache_entries_{column}", plan)
+                self.assertNotIn("TEMP B-TREE", plan)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,114 @@
+"""
+追い出し方針テスト（Count-Min Sketch・W-TinyLFU・CacheManager への組み込み）
+"""
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from src.core.cache import CacheManager
+from src.core.eviction import CountMinSketch, LRUPolicy, WindowTinyLFUPolicy, create_policy
+from src.core.models import Base, CacheEntry
+
+
+class TestCountMinSketch:
+    def test_estimate_never_undercounts(self):
+        sketch = CountMinSketch(64)
+        for _ in range(5):
+            sketch.increment("hot")
+        sketch.increment("cold")
+        assert sketch.estimate("hot") >= 5
+        assert sketch.estimate("cold") >= 1
+        assert sketch.estimate("hot") > sketch.estimate("never")
+
+    def test_aging_halves_counts(self):
+        sketch = CountMinSketch(2)
+        for _ in range(8):
+            sketch.increment("a")
+        # 記録数が sample_size (容量2 × 10 = 20) に届くと半分になる
+        for _ in range(12):
+            sketch.increment("b")
+        assert sketch.estimate("a") <= 4
+
+
+class TestWindowTinyLFU:
+    def test_one_off_scan_does_not_flush_hot_keys(self):
+        policy = WindowTinyLFUPolicy(10, window_ratio=0.1)
+        policy.load([])
+        hot = [f"hot{i}" for i in range(5)]
+        for key in hot:
+            policy.record(key, hit=False)
+            policy.add(key)
+            for _ in range(6):
+                policy.record(key)
+
+        evicted = []
+        for i in range(50):
+            key = f"scan{i}"
+            policy.record(key, hit=False)
+            evicted += policy.add(key)
+
+        assert all(key in policy for key in hot)
+        assert not set(hot) & set(evicted)
+        assert len(policy) <= 10
+
+    def test_frequent_newcomer_is_admitted(self):
+        policy = WindowTinyLFUPolicy(4, window_ratio=0.25)
+        policy.load(["a", "b", "c", "d"])
+        for _ in range(3):
+            policy.record("new", hit=False)
+        evicted = policy.add("new") + policy.add("other")
+        # 窓から溢れた "new" は本体の最古の行より頻度が高いので入れ替わる
+        assert "new" in policy
+        assert evicted == ["a"] or "a" in evicted
+
+    def test_remove_and_stats(self):
+        policy = WindowTinyLFUPolicy(4)
+        policy.load(["a", "b"])
+        policy.remove("a")
+        assert "a" not in policy
+        assert policy.stats()["policy"] == "tinylfu"
+
+    def test_create_policy(self):
+        assert isinstance(create_policy("tinylfu", 100), WindowTinyLFUPolicy)
+        assert isinstance(create_policy("lru", 100), LRUPolicy)
+        assert isinstance(create_policy("unknown", 100), LRUPolicy)
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+
+class TestCacheManagerTinyLFU:
+    def test_hot_entry_survives_one_off_writes(self, db):
+        with patch("src.core.config.settings.CACHE_EVICTION_POLICY", "tinylfu"), \
+             patch("src.core.config.settings.CACHE_MAX_ENTRIES", 4):
+            mgr = CacheManager()
+            mgr.store_result(db, "お疲れ様です", 30, "整形済み")
+            for _ in range(3):
+                assert mgr.check_cache(db, "お疲れ様です", 30) is not None
+
+            for i in range(10):
+                text = f"一度きりの長文 {i}"
+                mgr.check_cache(db, text, 30)
+                mgr.store_result(db, text, 30, "結果")
+
+            assert db.query(CacheEntry).count() <= 4
+            mgr.l1.clear()
+            assert mgr.check_cache(db, "お疲れ様です", 30) is not None
+            assert mgr.policy.stats()["rejected"] > 0
+
+    def test_policy_loads_existing_rows(self, db):
+        with patch("src.core.config.settings.CACHE_EVICTION_POLICY", "tinylfu"), \
+             patch("src.core.config.settings.CACHE_MAX_ENTRIES", 10):
+            CacheManager().store_results(db, "既存", {30: "a", 60: "b"})
+            mgr = CacheManager()
+            mgr.store_result(db, "新規", 30, "c")
+            assert mgr.policy.loaded
+            assert len(mgr.policy) == 3
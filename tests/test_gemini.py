@@ -0,0 +1,104 @@
+"""
+GeminiClient テスト（SDKモック使用）
+"""
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from src.core.gemini import GeminiClient
+
+CONFIG = {"system": "sys", "params": {"temperature": 0.3}}
+
+
+def _chunk(text):
+    chunk = MagicMock()
+    chunk.text = text
+    return chunk
+
+
+class TestAsyncStream:
+    """generate_content_stream_async のテスト"""
+
+    @pytest.fixture
+    def client(self):
+        client = GeminiClient()
+        client.client = MagicMock()
+        return client
+
+    @pytest.mark.asyncio
+    async def test_yields_chunks(self, client):
+        async def upstream():
+            for t in ["整形", "", "済み"]:
+                yield _chunk(t)
+
+        client.client.aio.models.generate_content_stream = AsyncMock(return_value=upstream())
+
+        chunks = [c async for c in client.generate_content_stream_async("入力", CONFIG)]
+        assert chunks == ["整形", "済み"]
+
+    @pytest.mark.asyncio
+    async def test_closing_consumer_closes_upstream(self, client):
+        state = {"closed": False, "produced": 0}
+
+        async def upstream():
+            try:
+                for i in range(100):
+                    state["produced"] += 1
+                    yield _chunk(str(i))
+            finally:
+                state["closed"] = True
+
+        client.client.aio.models.generate_content_stream = AsyncMock(return_value=upstream())
+
+        stream = client.generate_content_stream_async("入力", CONFIG)
+        assert await stream.__anext__() == "0"
+        await stream.aclose()
+
+        assert state["closed"] is True
+        assert state["produced"] == 1  # 背圧: 読んだ分しか進まない
+
+    @pytest.mark.asyncio
+    async def test_error_is_reported_as_chunk(self, client):
+        client.client.aio.models.generate_content_stream = AsyncMock(side_effect=RuntimeError("down"))
+
+        chunks = [c async for c in client.generate_content_stream_async("入力", CONFIG)]
+        assert chunks == ["Error: down"]
+
+    @pytest.mark.asyncio
+    async def test_not_configured(self):
+        client = GeminiClient()
+        client.client = None
+        chunks = [c async for c in client.generate_content_stream_async("入力", CONFIG)]
+        assert chunks[0].startswith("Error:")
+
+
+class TestMultiLevel:
+    """generate_multi_level のテスト"""
+
+    @pytest.fixture
+    def client(self):
+        from src.core.breaker import CircuitBreaker
+        client = GeminiClient()
+        client.breaker = CircuitBreaker(failure_threshold=10)
+        client.client = MagicMock()
+        return client
+
+    @pytest.mark.asyncio
+    async def test_maps_keys_to_levels(self, client):
+        client.client.aio.models.generate_content = AsyncMock(return_value=MagicMock(
+            text='{"light": "L", "medium": "M", "rich": "R"}'
+        ))
+        result = await client.generate_multi_level("入力", CONFIG)
+        assert result["success"] is True
+        assert result["results"] == {30: "L", 60: "M", 100: "R"}
+
+    @pytest.mark.asyncio
+    async def test_partial_results_are_kept(self, client):
+        client.client.aio.models.generate_content = AsyncMock(return_value=MagicMock(text='{"light": "L"}'))
+        result = await client.generate_multi_level("入力", CONFIG)
+        assert result["results"] == {30: "L"}
+
+    @pytest.mark.asyncio
+    async def test_invalid_json_is_failure(self, client):
+        client.client.aio.models.generate_content = AsyncMock(return_value=MagicMock(text="not json"))
+        result = await client.generate_multi_level("入力", CONFIG)
+        assert result["success"] is False
+        assert client.breaker.state == "closed"
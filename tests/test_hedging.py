@@ -0,0 +1,110 @@
+"""
+Hedged Requests テスト
+"""
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from src.core.hedging import LatencyTracker, HedgeBudget, hedged
+from src.core.gemini import GeminiClient
+from src.core.breaker import CircuitBreaker
+
+
+class TestLatencyTracker:
+    def test_percentile_requires_samples(self):
+        tracker = LatencyTracker()
+        tracker.record("m", 1.0)
+        assert tracker.percentile("m", 90) is None
+
+    def test_p90(self):
+        tracker = LatencyTracker()
+        for i in range(100):
+            tracker.record("m", i / 100)
+        assert tracker.percentile("m", 90) == pytest.approx(0.9)
+
+
+class TestHedgeBudget:
+    def test_budget_caps_hedges(self):
+        budget = HedgeBudget(ratio=0.1)
+        spent = 0
+        for _ in range(100):
+            budget.on_request()
+            if budget.try_spend():
+                spent += 1
+        assert spent == 10
+
+
+class TestHedged:
+    @pytest.mark.asyncio
+    async def test_fast_primary_no_hedge(self):
+        budget = HedgeBudget(ratio=1.0)
+        call = AsyncMock(return_value="ok")
+        assert await hedged(call, delay=1.0, budget=budget) == "ok"
+        assert call.call_count == 1
+
+    @pytest.mark.asyncio
+    async def test_slow_primary_hedged_and_cancelled(self):
+        budget = HedgeBudget(ratio=1.0)
+        calls = []
+        cancelled = asyncio.Event()
+
+        async def call():
+            calls.append(1)
+            if len(calls) == 1:
+                try:
+                    await asyncio.sleep(10)
+                except asyncio.CancelledError:
+                    cancelled.set()
+                    raise
+            return f"call{len(calls)}"
+
+        assert await hedged(call, delay=0.01, budget=budget) == "call2"
+        await asyncio.wait_for(cancelled.wait(), timeout=1)
+
+    @pytest.mark.asyncio
+    async def test_no_budget_waits_for_primary(self):
+        budget = HedgeBudget(ratio=0.0)
+        calls = []
+
+        async def call():
+            calls.append(1)
+            await asyncio.sleep(0.03)
+            return "primary"
+
+        assert await hedged(call, delay=0.01, budget=budget) == "primary"
+        assert len(calls) == 1
+
+    @pytest.mark.asyncio
+    async def test_failed_primary_falls_to_hedge(self):
+        budget = HedgeBudget(ratio=1.0)
+        calls = []
+
+        async def call():
+            calls.append(1)
+            if len(calls) == 1:
+                await asyncio.sleep(0.02)
+                raise RuntimeError("primary failed")
+            await asyncio.sleep(0.05)
+            return "hedge"
+
+        assert await hedged(call, delay=0.01, budget=budget) == "hedge"
+
+
+class TestGeminiClientHedging:
+    @pytest.mark.asyncio
+    async def test_hedging_only_on_fast_model(self):
+        client = GeminiClient()
+        client.breaker = CircuitBreaker(failure_threshold=10)
+        client.client = MagicMock()
+        client.client.aio.models.generate_content = AsyncMock(
+            return_value=MagicMock(candidates=[], text="ok")
+        )
+        with patch("src.core.gemini.hedged", new_callable=AsyncMock) as mock_hedged, \
+             patch("src.core.gemini.settings.HEDGE_ENABLED", True):
+            mock_hedged.return_value = MagicMock(candidates=[], text="hedged")
+            from src.core.config import settings
+            fast = await client.generate_content("t", {"system": "s", "params": {}}, model=settings.MODEL_FAST)
+            other = await client.generate_content("t", {"system": "s", "params": {}}, model="models/other")
+
+        assert fast["result"] == "hedged"
+        assert other["result"] == "ok"
+        assert mock_hedged.call_count == 1
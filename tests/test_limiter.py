@@ -0,0 +1,181 @@
+"""
+AdaptiveLimiter / RetryPolicy テスト
+"""
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from src.core.limiter import (
+    AdaptiveLimiter,
+    RetryPolicy,
+    is_overload_error,
+    get_retry_hint,
+)
+from src.core.gemini import GeminiClient
+from src.core.breaker import CircuitBreaker
+
+
+class FakeAPIError(Exception):
+    def __init__(self, code, details=None, headers=None):
+        super().__init__(f"{code}")
+        self.code = code
+        self.details = details
+        self.response = MagicMock(headers=headers or {})
+
+
+class TestOverloadDetection:
+    def test_overload_codes(self):
+        assert is_overload_error(FakeAPIError(429))
+        assert is_overload_error(FakeAPIError(503))
+        assert not is_overload_error(FakeAPIError(400))
+        assert is_overload_error(Exception("429 RESOURCE_EXHAUSTED. quota"))
+
+    def test_retry_after_header(self):
+        assert get_retry_hint(FakeAPIError(429, headers={"retry-after": "7"})) == 7.0
+
+    def test_retry_info_details(self):
+        details = {"error": {"details": [
+            {"@type": "type.googleapis.com/google.rpc.RetryInfo", "retryDelay": "12s"}
+        ]}}
+        assert get_retry_hint(FakeAPIError(429, details=details)) == 12.0
+
+    def test_no_hint(self):
+        assert get_retry_hint(FakeAPIError(429)) is None
+
+
+class TestRetryPolicy:
+    def test_jitter_within_ceiling(self):
+        policy = RetryPolicy(max_retries=3, base_delay=1.0, max_delay=5.0)
+        for attempt in range(6):
+            assert 0 <= policy.delay(attempt) <= min(5.0, 2 ** attempt)
+
+    def test_hint_is_honoured_but_capped(self):
+        policy = RetryPolicy(max_retries=3, base_delay=1.0, max_delay=5.0)
+        assert policy.delay(0, hint=3.0) == 3.0
+        assert policy.delay(0, hint=60.0) == 5.0
+
+
+class TestAdaptiveLimiter:
+    def test_additive_increase(self):
+        limiter = AdaptiveLimiter(initial=2, min_limit=1, max_limit=4, latency_target=1.0)
+        for _ in range(10):
+            limiter.on_success(0.1)
+        assert 2 < limiter.limit <= 4
+
+    def test_slow_responses_do_not_increase(self):
+        limiter = AdaptiveLimiter(initial=2, min_limit=1, max_limit=4, latency_target=1.0)
+        limiter.on_success(5.0)
+        assert limiter.limit == 2
+
+    def test_multiplicative_decrease_once_per_burst(self):
+        limiter = AdaptiveLimiter(initial=8, min_limit=1, max_limit=8, latency_target=1.0)
+        limiter.on_overload()
+        limiter.on_overload()
+        assert limiter.limit == 4
+        assert limiter.overloads == 2
+
+    @pytest.mark.asyncio
+    async def test_caps_concurrency(self):
+        limiter = AdaptiveLimiter(initial=2, min_limit=1, max_limit=2, latency_target=10.0)
+        peak = 0
+
+        async def work():
+            nonlocal peak
+            async with limiter.slot():
+                peak = max(peak, limiter.in_flight)
+                await asyncio.sleep(0.01)
+
+        await asyncio.gather(*[work() for _ in range(6)])
+        assert peak == 2
+        assert limiter.in_flight == 0
+
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter_releases_nothing(self):
+        limiter = AdaptiveLimiter(initial=1, min_limit=1, max_limit=1, latency_target=10.0)
+        await limiter.acquire()
+        waiter = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        limiter.release()
+        assert limiter.in_flight == 0
+
+    @pytest.mark.asyncio
+    async def test_timeout_counts_as_overload(self):
+        """GEMINI_TIMEOUT_SEC 切れの枠は過負荷として返され、上限が下がる"""
+        limiter = AdaptiveLimiter(initial=4, min_limit=1, max_limit=4, latency_target=10.0)
+        with pytest.raises(asyncio.TimeoutError):
+            async with limiter.slot():
+                await asyncio.wait_for(asyncio.sleep(1), timeout=0.01)
+        assert limiter.limit == 2
+        assert limiter.overloads == 1
+        assert limiter.in_flight == 0
+
+    def test_loops_on_threads_share_the_cap(self):
+        """別スレッドのイベントループが同時に使っても上限を超えて通さない"""
+        import threading
+        limiter = AdaptiveLimiter(initial=2, min_limit=1, max_limit=2, latency_target=10.0)
+        peak = 0
+        peak_lock = threading.Lock()
+
+        async def work():
+            nonlocal peak
+            async with limiter.slot():
+                with peak_lock:
+                    peak = max(peak, limiter.in_flight)
+                await asyncio.sleep(0.001)
+
+        async def burst():
+            await asyncio.gather(*[work() for _ in range(30)])
+
+        threads = [threading.Thread(target=asyncio.run, args=(burst(),)) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join(timeout=10)
+        assert peak <= 2
+        assert limiter.in_flight == 0
+        assert limiter.stats()["waiting"] == 0
+
+
+class TestGeminiRetry:
+    @pytest.mark.asyncio
+    async def test_retries_429_then_succeeds(self):
+        client = GeminiClient()
+        client.breaker = CircuitBreaker(failure_threshold=10)
+        client.limiter = AdaptiveLimiter(initial=2, min_limit=1, max_limit=2, latency_target=10.0)
+        client.retry_policy = RetryPolicy(max_retries=2, base_delay=0.0, max_delay=0.0)
+        response = MagicMock(candidates=[], text="ok")
+        client.client = MagicMock()
+        client.client.aio.models.generate_content = AsyncMock(
+            side_effect=[FakeAPIError(429), response]
+        )
+
+        result = await client.generate_content("text", {"system": "s", "params": {}}, model="m")
+        assert result["success"] is True
+        assert client.client.aio.models.generate_content.call_count == 2
+        assert client.limiter.overloads == 1
+
+    @pytest.mark.asyncio
+    async def test_gives_up_after_max_retries(self):
+        client = GeminiClient()
+        client.breaker = CircuitBreaker(failure_threshold=10)
+        client.limiter = AdaptiveLimiter(initial=2, min_limit=1, max_limit=2, latency_target=10.0)
+        client.retry_policy = RetryPolicy(max_retries=1, base_delay=0.0, max_delay=0.0)
+        client.client = MagicMock()
+        client.client.aio.models.generate_content = AsyncMock(side_effect=FakeAPIError(429))
+
+        result = await client.generate_content("text", {"system": "s", "params": {}}, model="m")
+        assert result["error"] == "api_error"
+        assert client.client.aio.models.generate_content.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_non_overload_errors_are_not_retried(self):
+        client = GeminiClient()
+        client.breaker = CircuitBreaker(failure_threshold=10)
+        client.client = MagicMock()
+        client.client.aio.models.generate_content = AsyncMock(side_effect=FakeAPIError(400))
+
+        result = await client.generate_content("text", {"system": "s", "params": {}}, model="m")
+        assert result["error"] == "api_error"
+        assert client.client.aio.models.generate_content.call_count == 1
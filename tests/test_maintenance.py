@@ -0,0 +1,99 @@
+"""
+CacheMaintainer テスト（期限切れの一括削除・人気エントリの先回り再生成）
+"""
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from src.core.config import settings
+from src.core.limiter import AdaptiveLimiter
+from src.core.maintenance import CacheMaintainer
+from src.core.models import Base, CacheEntry
+from src.core.prefetch import PrefetchQueue
+from src.core.processor import CoreProcessor
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'cache.db'}")
+    Base.metadata.create_all(engine)
+    return sessionmaker(bind=engine)
+
+
+@pytest.fixture
+def processor(session_factory):
+    processor = CoreProcessor()
+    processor.gemini_client = MagicMock()
+    processor.gemini_client.generate_content = AsyncMock(
+        return_value={"success": True, "result": "作り直し"}
+    )
+    processor.gemini_client.limiter = AdaptiveLimiter()
+    processor.prefetcher = PrefetchQueue(processor, session_factory=session_factory, workers=1)
+    processor.maintainer = CacheMaintainer(processor, session_factory=session_factory)
+    return processor
+
+
+def _age(db, text_hash: str, hours: float) -> None:
+    created = datetime.utcnow() - timedelta(hours=hours)
+    db.query(CacheEntry).filter(CacheEntry.hash_id == text_hash).update({"created_at": created})
+    db.commit()
+
+
+class TestSweep:
+    def test_sweeps_expired_in_chunks(self, processor, session_factory):
+        mgr = processor.cache_manager
+        db = session_factory()
+        for i in range(5):
+            mgr.store_result(db, f"古い{i}", 30, "r", mgr.current_fingerprint())
+            _age(db, mgr.get_text_hash(f"古い{i}"), settings.CACHE_TTL_HOURS + 1)
+        mgr.store_result(db, "新しい", 30, "r", mgr.current_fingerprint())
+
+        assert mgr.sweep_expired(db, chunk_size=2) == 5
+        assert db.query(CacheEntry).count() == 1
+        db.close()
+
+
+class TestRefreshAhead:
+    @pytest.mark.asyncio
+    async def test_hot_entry_is_refreshed_before_expiry(self, processor, session_factory):
+        mgr = processor.cache_manager
+        fingerprint = mgr.current_fingerprint()
+        db = session_factory()
+        mgr.store_result(db, "お疲れ様です", 30, "古い結果", fingerprint)
+        mgr.store_result(db, "たまに使う", 30, "古い結果", fingerprint)
+        for text in ("お疲れ様です", "たまに使う"):
+            _age(db, mgr.get_text_hash(text), settings.CACHE_TTL_HOURS - 1)
+        for _ in range(settings.CACHE_REFRESH_MIN_HITS):
+            assert mgr.check_cache(db, "お疲れ様です", 30, fingerprint) is not None
+        db.close()
+
+        stats = await processor.maintainer.run_once()
+        await processor.prefetcher.join()
+
+        assert stats == {"swept": 0, "refreshed": 1}
+        processor.gemini_client.generate_content.assert_called_once()
+        db = session_factory()
+        row = db.query(CacheEntry).filter(CacheEntry.hash_id == mgr.get_text_hash("お疲れ様です")).one()
+        assert row.result == "作り直し"
+        # 賞味期限は数え直される
+        assert row.created_at > datetime.utcnow() - timedelta(hours=1)
+        db.close()
+        await processor.prefetcher.stop()
+
+    def test_hits_decay(self, processor):
+        mgr = processor.cache_manager
+        mgr.recent_hits[("h", 30, "")] = 4
+        mgr.recent_hits[("c", 30, "")] = 1
+        mgr.decay_hits()
+        assert dict(mgr.recent_hits) == {("h", 30, ""): 2}
+
+    @pytest.mark.asyncio
+    async def test_start_and_stop(self, processor):
+        processor.maintainer.interval = 3600
+        processor.maintainer.start()
+        assert processor.maintainer.stats()["running"] is True
+        await processor.maintainer.stop()
+        assert processor.maintainer.stats()["running"] is False
@@ -0,0 +1,45 @@
+"""
+テキスト正規化テスト
+"""
+from unittest.mock import patch
+
+from src.core.cache import CacheManager
+from src.core.normalize import normalize_text
+
+
+class TestNormalizeText:
+    def test_newlines_unified(self):
+        assert normalize_text("一行目\r\n二行目\r三行目") == "一行目\n二行目\n三行目"
+
+    def test_nfkc_and_full_width_space(self):
+        assert normalize_text("ＡＢＣ　１２３") == "ABC 123"
+
+    def test_zero_width_removed(self):
+        assert normalize_text("お疲れ\u200b様です\ufeff") == "お疲れ様です"
+
+    def test_whitespace_folding_and_trim(self):
+        assert normalize_text("  了解   です  \n\n\n\nよろしく \t") == "了解 です\n\nよろしく"
+
+    def test_indentation_kept(self):
+        assert normalize_text("- 項目\n    - 子項目") == "- 項目\n    - 子項目"
+
+    def test_idempotent(self):
+        text = "ＡＢＣ　\r\n\r\n\r\n  x\u200b  y  "
+        assert normalize_text(normalize_text(text)) == normalize_text(text)
+
+
+class TestNormalizedHash:
+    def test_windows_and_android_copies_share_key(self):
+        windows = "お疲れ様です。\r\n本日の件、承知しました。\r\n"
+        android = "お疲れ様です。\n本日の件、承知しました。"
+        assert CacheManager.get_text_hash(windows) == CacheManager.get_text_hash(android)
+
+    def test_opt_out_hashes_raw_text(self):
+        with patch("src.core.config.settings.TEXT_NORMALIZE", False):
+            assert CacheManager.get_text_hash("a\r\n") != CacheManager.get_text_hash("a\n")
+
+    def test_key_is_versioned(self):
+        """正規化の有無 (規則のバージョン) で別キーになる"""
+        normalized = CacheManager.get_text_hash("abc")
+        with patch("src.core.config.settings.TEXT_NORMALIZE", False):
+            assert CacheManager.get_text_hash("abc") != normalized
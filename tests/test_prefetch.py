@@ -0,0 +1,161 @@
+"""
+PrefetchQueue テスト（優先度・重複排除・自前セッション）
+"""
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from src.core.limiter import AdaptiveLimiter
+from src.core.models import Base, TextRequest
+from src.core.prefetch import PrefetchQueue, PRIORITY_HIGH
+from src.core.processor import CoreProcessor
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    # Write-behindは別スレッド・別セッションで書くためファイルDBを使う
+    engine = create_engine(f"sqlite:///{tmp_path / 'cache.db'}")
+    Base.metadata.create_all(engine)
+    return sessionmaker(bind=engine)
+
+
+@pytest.fixture
+def processor(session_factory):
+    processor = CoreProcessor()
+    processor.gemini_client = MagicMock()
+    processor.gemini_client.generate_content = AsyncMock(
+        return_value={"success": True, "result": "整形済み"}
+    )
+    processor.gemini_client.limiter = AdaptiveLimiter()
+    processor.prefetcher = PrefetchQueue(processor, session_factory=session_factory, workers=1)
+    return processor
+
+
+class TestPrefetchQueue:
+    @pytest.mark.asyncio
+    async def test_prefetch_makes_process_a_cache_hit(self, processor, session_factory):
+        queued = await processor.run_prefetch("お疲れ様です", [30])
+        assert queued == 1
+        await processor.prefetcher.join()
+
+        db = session_factory()
+        result = await processor.process(TextRequest(text="お疲れ様です", seasoning=30), db)
+        db.close()
+
+        assert result["from_cache"] is True
+        processor.gemini_client.generate_content.assert_called_once()
+        await processor.prefetcher.stop()
+
+    @pytest.mark.asyncio
+    async def test_surrounding_space_keeps_route_hash(self, processor, session_factory):
+        """TEXT_NORMALIZE=False でも、前後の空白ごと /process と同じキーで先読みすること"""
+        from unittest.mock import patch
+        from src.core.cache import CacheManager
+
+        text = " お疲れ様です \n"
+        with patch("src.core.config.settings.TEXT_NORMALIZE", False):
+            await processor.run_prefetch(text, [30])
+            await processor.prefetcher.join()
+            assert processor.gemini_client.generate_content.call_args[0][0] == text
+
+            db = session_factory()
+            assert CacheManager.get_results(db, CacheManager.get_text_hash(text)) == {"seasoning_30": "整形済み"}
+            result = await processor.process(TextRequest(text=text, seasoning=30), db)
+            db.close()
+
+        assert result["from_cache"] is True
+        await processor.prefetcher.stop()
+
+    @pytest.mark.asyncio
+    async def test_duplicates_are_merged(self, processor):
+        # 10 と 30 はどちらも Light に寄せられる
+        assert processor.prefetcher.submit("同じ文", [10, 30]) == 1
+        assert processor.prefetcher.submit("同じ文", [30]) == 0
+        await processor.prefetcher.join()
+        assert processor.gemini_client.generate_content.call_count == 1
+        await processor.prefetcher.stop()
+
+    @pytest.mark.asyncio
+    async def test_cached_entries_are_skipped(self, processor):
+        processor.prefetcher.submit("キャッシュ済み", [30])
+        await processor.prefetcher.join()
+        processor.prefetcher.submit("キャッシュ済み", [30])
+        await processor.prefetcher.join()
+
+        assert processor.prefetcher.skipped == 1
+        assert processor.gemini_client.generate_content.call_count == 1
+        await processor.prefetcher.stop()
+
+    @pytest.mark.asyncio
+    async def test_priority_order(self, processor):
+        order = []
+
+        async def generate(text, config, model=None):
+            order.append(text)
+            return {"success": True, "result": text}
+
+        processor.gemini_client.generate_content = AsyncMock(side_effect=generate)
+        prefetcher = processor.prefetcher
+        # ワーカーが動き出す前に積む
+        prefetcher.submit("先", [30])
+        prefetcher.submit("後", [30])
+        prefetcher.submit("急ぎ", [30], priority=PRIORITY_HIGH)
+        await prefetcher.join()
+
+        assert order == ["急ぎ", "先", "後"]
+        await prefetcher.stop()
+
+    @pytest.mark.asyncio
+    async def test_queue_full_drops(self, processor):
+        processor.prefetcher.max_size = 1
+        assert processor.prefetcher.submit("一", [30, 60, 100]) == 1
+        assert processor.prefetcher.dropped == 2
+        await processor.prefetcher.stop()
+
+
+class TestSpeculative:
+    """投機的先読み（予算・混雑時の破棄）"""
+
+    def test_user_quota(self):
+        from src.core.prefetch import UserQuota
+        quota = UserQuota(per_hour=2)
+        assert quota.try_take("a") and quota.try_take("a")
+        assert not quota.try_take("a")
+        assert quota.try_take("b")  # 他のユーザーは別枠
+
+    @pytest.mark.asyncio
+    async def test_speculative_then_process_hits_cache(self, processor, session_factory):
+        assert processor.prefetcher.submit_speculative("コピーした文", 30, "user") is True
+        await processor.prefetcher.join()
+
+        db = session_factory()
+        result = await processor.process(TextRequest(text="コピーした文", seasoning=30), db)
+        db.close()
+        assert result["from_cache"] is True
+        await processor.prefetcher.stop()
+
+    @pytest.mark.asyncio
+    async def test_quota_exhausted(self, processor):
+        from src.core.prefetch import UserQuota
+        processor.prefetcher.quota = UserQuota(per_hour=1)
+        assert processor.prefetcher.submit_speculative("一", 30, "user") is True
+        assert processor.prefetcher.submit_speculative("二", 30, "user") is False
+        await processor.prefetcher.stop()
+
+    @pytest.mark.asyncio
+    async def test_shed_when_interactive_load_rises(self, processor):
+        limiter = AdaptiveLimiter(initial=2, min_limit=1, max_limit=2)
+        processor.gemini_client.limiter = limiter
+        assert processor.prefetcher.submit_speculative("投機", 30, "user") is True
+
+        # ワーカーが取り出す前に対話リクエストで枠が埋まる
+        limiter.in_flight = 2
+        await processor.prefetcher.join()
+
+        assert processor.prefetcher.shed == 1
+        processor.gemini_client.generate_content.assert_not_called()
+        # 混雑中は積むこと自体をしない
+        assert processor.prefetcher.submit_speculative("投機2", 30, "user") is False
+        await processor.prefetcher.stop()
@@ -162,3 +162,32 @@ class TestPrivacyScanner:
         assert keyword is None
 
 
+
+    # 単一パス走査 (v5.x)
+    def test_spans_do_not_overlap(self, scanner):
+        """カード番号はマイナンバー・電話番号として重複検出しない"""
+        result = scanner.scan("Pay with 4532-1234-5678-9012")
+        assert result["risks"] == {"CREDIT_CARD": ["4532-1234-5678-9012"]}
+        spans = scanner.find_spans("a@b.co 090-1234-5678 a@b.co")
+        assert [s[2] for s in spans] == ["EMAIL", "PHONE", "EMAIL"]
+        assert all(a[1] <= b[0] for a, b in zip(spans, spans[1:]))
+
+    def test_repeated_value_shares_placeholder(self):
+        text = "foo@bar.com / 090-0000-0000 / foo@bar.com"
+        masked, mapping = mask_pii(text, use_custom_vocab=False)
+        assert masked == "[PII_0] / [PII_1] / [PII_0]"
+        assert unmask_pii(masked, mapping) == text
+
+    def test_keyword_inside_word_is_not_masked(self):
+        text = "Standard agenda. confidential memo."
+        masked, _ = mask_pii(text, use_custom_vocab=False)
+        assert masked.startswith("Standard agenda.")
+        assert "confidential" not in masked
+
+    def test_keyword_matching_rules(self, scanner):
+        """キーワード: 大文字小文字は無視、英字は語の一部に一致しない、日本語は部分一致"""
+        assert scanner.scan("nda を締結")["risks"] == {"SENSITIVE_KEYWORD": ["NDA"]}
+        assert scanner.scan("Standard agenda")["risks"] == {}
+        assert scanner.scan("社外秘資料です")["risks"] == {"SENSITIVE_KEYWORD": ["社外秘"]}
+        # Deny List は英単語の途中でも拒否する
+        assert scanner.check_deny_list("Standard agenda") == (True, "NDA")
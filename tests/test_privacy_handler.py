@@ -12,7 +12,7 @@ class TestPrivacyHandler:
         """カスタム語彙ストアを使用したマスク処理のテスト"""
         # Mockのセットアップ
         mock_store = MagicMock()
-        mock_store.find_in_text.return_value = ["Project Titan"]
+        mock_store.find_spans.side_effect = lambda t: [(18, 31, "Project Titan")] if "Project Titan" in t else []
         mock_get_store.return_value = mock_store
 
         text = "Meeting regarding Project Titan."
@@ -38,5 +38,22 @@ class TestPrivacyHandler:
         assert masked == text
         assert mapping == {}
 
+    @patch("src.core.vocab_store.get_vocab_store")
+    def test_mask_vocab_uses_store_spans(self, mock_get_store, handler, tmp_path):
+        """語彙は語彙ストアの位置 (最左最長) で置換し、同じ語は同じプレースホルダにすること"""
+        from src.core.vocab_store import VocabularyStore
+        store = VocabularyStore(db_path=tmp_path / "vocab.db")
+        store.add_term("プロジェクト")
+        store.add_term("プロジェクトX")
+        mock_get_store.return_value = store
+
+        text = "プロジェクトXとプロジェクトとプロジェクトX"
+        masked, mapping = handler.mask(text, use_custom_vocab=True)
+
+        assert masked == "[VOCAB_0]と[VOCAB_1]と[VOCAB_0]"
+        assert mapping == {"[VOCAB_0]": "プロジェクトX", "[VOCAB_1]": "プロジェクト"}
+        assert handler.unmask(masked, mapping) == text
+        store.close()
+
     def test_handler_initialization(self, handler):
         assert handler.scanner is not None
@@ -6,6 +6,7 @@ CoreProcessor 統合テスト
 - CoreProcessor._select_model（モデル選択ロジック）
 - CoreProcessor.process（Gemini APIモック使用）
 """
+import asyncio
 import pytest
 from unittest.mock import AsyncMock, patch, MagicMock
 from src.core.processor import (
@@ -14,7 +15,8 @@ from src.core.processor import (
     generate_diff,
     CoreProcessor,
 )
-from src.core.models import TextRequest
+from src.core.models import TextRequest, CacheEntry
+from src.core.cache import CacheManager
 
 
 class TestUtilities:
@@ -155,3 +157,105 @@ class TestCoreProcessorProcess:
             # APIが呼ばれたことを確認 (モックを通して確認)
             processor.gemini_client.generate_content.assert_called_once()
 
+
+
+class TestCoreProcessorCacheFirst:
+    """Cache-first / Write-behind テスト"""
+
+    @pytest.fixture
+    def db(self, tmp_path):
+        # Write-behindは別スレッド・別セッションで書くためファイルDBを使う
+        from sqlalchemy import create_engine
+        from sqlalchemy.orm import sessionmaker
+        from src.core.models import Base
+        engine = create_engine(f"sqlite:///{tmp_path / 'cache.db'}")
+        Base.metadata.create_all(engine)
+        session = sessionmaker(bind=engine)()
+        yield session
+        session.close()
+
+    @pytest.fixture
+    def processor(self):
+        processor = CoreProcessor()
+        processor.gemini_client = MagicMock()
+        processor.gemini_client.generate_content = AsyncMock(
+            return_value={"success": True, "result": "整形済み"}
+        )
+        return processor
+
+    @pytest.mark.asyncio
+    async def test_second_call_served_from_cache(self, processor, db):
+        """成功結果が書き戻され、2回目はAPIを呼ばない"""
+        first = await processor.process(TextRequest(text="お疲れ様です", seasoning=30), db)
+        assert first["from_cache"] is False
+        await processor.cache_manager.flush_writes()
+
+        second = await processor.process(TextRequest(text="お疲れ様です", seasoning=30), db)
+        assert second["from_cache"] is True
+        assert second["result"] == "整形済み"
+        processor.gemini_client.generate_content.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_prompt_version_separates_entries(self, processor, db):
+        """ユーザー指示を変えると別キャッシュになる"""
+        await processor.process(TextRequest(text="お疲れ様です", seasoning=30), db)
+        await processor.cache_manager.flush_writes()
+
+        with patch("src.core.processor.settings.USER_SYSTEM_PROMPT", "敬語で"):
+            result = await processor.process(TextRequest(text="お疲れ様です", seasoning=30), db)
+
+        assert result["from_cache"] is False
+        assert processor.gemini_client.generate_content.call_count == 2
+
+    @pytest.fixture
+    def prefill(self, processor):
+        from src.core.limiter import AdaptiveLimiter
+        processor.gemini_client.limiter = AdaptiveLimiter()
+        processor.gemini_client.generate_multi_level = AsyncMock(
+            return_value={"success": True, "results": {30: "L", 60: "M", 100: "R"}}
+        )
+        with patch("src.core.processor.settings.CACHE_PREFILL_LEVELS", True):
+            yield processor
+
+    @pytest.mark.asyncio
+    async def test_prefill_fills_only_missing_levels(self, prefill, db):
+        """他の段階が2つ足りなければ一括生成を1回呼び、足りない段階だけ書く"""
+        await prefill.process(TextRequest(text="お疲れ様です", seasoning=30), db)
+        await asyncio.gather(*prefill._background_tasks)
+        await prefill.cache_manager.flush_writes()
+
+        prefill.gemini_client.generate_multi_level.assert_called_once()
+        rows = {r.seasoning: r.result for r in db.query(CacheEntry).all()}
+        assert rows == {30: "整形済み", 60: "M", 100: "R"}
+
+    @pytest.mark.asyncio
+    async def test_prefill_skipped_when_levels_cached(self, prefill, db):
+        """他の段階がキャッシュ済みなら何も生成しない"""
+        prefill.cache_manager.store_results(db, "お疲れ様です", {60: "m", 100: "r"}, CacheManager.current_fingerprint())
+        prefill.prefetcher.submit_speculative = MagicMock()
+
+        await prefill.process(TextRequest(text="お疲れ様です", seasoning=30), db)
+
+        prefill.gemini_client.generate_multi_level.assert_not_called()
+        prefill.prefetcher.submit_speculative.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_prefill_single_missing_level_goes_to_queue(self, prefill, db):
+        """足りないのが1段階なら、3段階分は作らず先読みキューに投機優先度で積む"""
+        prefill.cache_manager.store_results(db, "お疲れ様です", {60: "m"}, CacheManager.current_fingerprint())
+        prefill.prefetcher.submit_speculative = MagicMock(return_value=True)
+
+        await prefill.process(TextRequest(text="お疲れ様です", seasoning=30), db)
+
+        prefill.gemini_client.generate_multi_level.assert_not_called()
+        prefill.prefetcher.submit_speculative.assert_called_once_with("お疲れ様です", 100, "anonymous")
+
+    @pytest.mark.asyncio
+    async def test_prefill_shed_when_upstream_busy(self, prefill, db):
+        """対話リクエストで上流が混んでいれば一括生成を見送る"""
+        prefill.prefetcher._interactive_busy = MagicMock(return_value=True)
+
+        await prefill.process(TextRequest(text="お疲れ様です", seasoning=30), db)
+
+        prefill.gemini_client.generate_multi_level.assert_not_called()
+        assert prefill.prefetcher.shed == 1
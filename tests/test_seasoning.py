@@ -86,6 +86,27 @@ class TestSeasoningManager(unittest.TestCase):
         prompt_over = SeasoningManager.get_system_prompt(150)
         self.assertIn("深く解釈", prompt_over)
 
+    def test_get_multi_level_prompt(self):
+        """get_multi_level_prompt: 3段階の指示とJSONキーを含むこと"""
+        prompt = SeasoningManager.get_multi_level_prompt()
+        for key in ("light", "medium", "rich"):
+            self.assertIn(f'"{key}"', prompt)
+        self.assertIn("誤字脱字", prompt)
+        self.assertIn("JSON", prompt)
+        self.assertNotIn("追加指示:", prompt)
+
+    def test_get_fingerprint(self):
+        """get_fingerprint: ユーザー指示・モデル・プロンプト文面で指紋が変わること"""
+        from unittest.mock import patch
+        from src.core.seasoning import PROMPT_VERSION
+        base = SeasoningManager.get_fingerprint("", ("flash", "pro"))
+        self.assertTrue(base.startswith(PROMPT_VERSION))
+        self.assertEqual(base, SeasoningManager.get_fingerprint("", ("flash", "pro")))
+        self.assertNotEqual(base, SeasoningManager.get_fingerprint("敬語で", ("flash", "pro")))
+        self.assertNotEqual(base, SeasoningManager.get_fingerprint("", ("flash-2", "pro")))
+        with patch.object(SeasoningManager, "get_system_prompt", return_value="新しい文面"):
+            self.assertNotEqual(base, SeasoningManager.get_fingerprint.__wrapped__("", ("flash", "pro")))
+
 
 if __name__ == "__main__":
     unittest.main()
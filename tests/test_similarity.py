@@ -0,0 +1,78 @@
+"""
+類似テキスト索引 (MinHash + LSH) テスト
+"""
+import pytest
+from unittest.mock import patch
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from src.core.cache import CacheManager
+from src.core.models import Base
+from src.core.seasoning import PROMPT_VERSION
+from src.core.similarity import NearDuplicateIndex, estimate_similarity, signature
+
+BASE = "今日の会議は15時からに変更になりました。資料は共有フォルダに置いてあります。よろしくお願いします"
+
+
+class TestSignature:
+    def test_identical_texts_match(self):
+        assert estimate_similarity(signature(BASE), signature(BASE)) == 1.0
+
+    def test_small_edit_is_similar(self):
+        assert estimate_similarity(signature(BASE), signature(BASE + "。")) >= 0.8
+
+    def test_unrelated_texts_differ(self):
+        assert estimate_similarity(signature(BASE), signature("明日の打ち合わせは中止です")) < 0.3
+
+
+class TestNearDuplicateIndex:
+    def test_find_and_remove(self):
+        index = NearDuplicateIndex(threshold=0.8)
+        index.add("a", BASE)
+        index.add("b", "明日の打ち合わせは中止です")
+
+        match = index.find(BASE + "。")
+        assert match is not None and match[0] == "a"
+
+        index.remove("a")
+        assert index.find(BASE + "。") is None
+        assert len(index) == 1
+
+    def test_exclude_self(self):
+        index = NearDuplicateIndex(threshold=0.8)
+        index.add("a", BASE)
+        assert index.find(BASE, exclude="a") is None
+
+
+class TestCacheNearDuplicate:
+    @pytest.fixture
+    def db(self):
+        engine = create_engine("sqlite:///:memory:")
+        Base.metadata.create_all(engine)
+        session = sessionmaker(bind=engine)()
+        yield session
+        session.close()
+
+    def test_light_only(self, db):
+        with patch("src.core.config.settings.CACHE_NEAR_DUP_ENABLED", True):
+            mgr = CacheManager()
+            mgr.load_near_index(db.get_bind(), background=False)
+            mgr.store_results(db, BASE, {30: "軽い整形", 60: "標準の整形"}, PROMPT_VERSION)
+
+            light = mgr.check_cache(db, BASE + "。", 30, PROMPT_VERSION)
+            assert light["result"] == "軽い整形"
+            assert light["similarity"] >= 0.8
+            assert mgr.check_cache(db, BASE + "。", 60, PROMPT_VERSION) is None
+
+    def test_disabled_by_default(self, db):
+        mgr = CacheManager()
+        mgr.store_results(db, BASE, {30: "軽い整形"}, PROMPT_VERSION)
+        assert mgr.check_cache(db, BASE + "。", 30, PROMPT_VERSION) is None
+
+    def test_index_built_from_existing_rows(self, db):
+        CacheManager().store_results(db, BASE, {30: "軽い整形"}, PROMPT_VERSION)
+        with patch("src.core.config.settings.CACHE_NEAR_DUP_ENABLED", True):
+            mgr = CacheManager()
+            mgr.load_near_index(db.get_bind(), background=False)
+            assert len(mgr.near) == 1
+            assert mgr.check_cache(db, BASE + "。", 30, PROMPT_VERSION)["result"] == "軽い整形"
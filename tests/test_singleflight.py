@@ -0,0 +1,104 @@
+"""
+SingleFlight テスト
+"""
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from src.core.singleflight import SingleFlight
+from src.core.gemini import GeminiClient
+
+
+class TestSingleFlight:
+    """同一キーの合流テスト"""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_calls_share_one_upstream(self):
+        sf = SingleFlight()
+        calls = 0
+
+        async def upstream():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return "ok"
+
+        results = await asyncio.gather(*[sf.do("k", upstream) for _ in range(5)])
+        assert results == ["ok"] * 5
+        assert calls == 1
+        assert sf.shared == 4
+        assert sf.in_flight == 0
+
+    @pytest.mark.asyncio
+    async def test_error_is_shared(self):
+        sf = SingleFlight()
+
+        async def upstream():
+            await asyncio.sleep(0.01)
+            raise ValueError("boom")
+
+        results = await asyncio.gather(
+            sf.do("k", upstream), sf.do("k", upstream), return_exceptions=True
+        )
+        assert all(isinstance(r, ValueError) for r in results)
+
+    @pytest.mark.asyncio
+    async def test_one_caller_cancel_does_not_affect_others(self):
+        sf = SingleFlight()
+        started = asyncio.Event()
+
+        async def upstream():
+            started.set()
+            await asyncio.sleep(0.05)
+            return "ok"
+
+        first = asyncio.create_task(sf.do("k", upstream))
+        second = asyncio.create_task(sf.do("k", upstream))
+        await started.wait()
+        first.cancel()
+
+        assert await second == "ok"
+        with pytest.raises(asyncio.CancelledError):
+            await first
+
+    @pytest.mark.asyncio
+    async def test_upstream_cancelled_when_all_callers_leave(self):
+        sf = SingleFlight()
+        cancelled = asyncio.Event()
+
+        async def upstream():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        caller = asyncio.create_task(sf.do("k", upstream))
+        await asyncio.sleep(0.01)
+        caller.cancel()
+        await asyncio.wait_for(cancelled.wait(), timeout=1)
+        assert sf.in_flight == 0
+
+
+class TestGeminiClientSingleFlight:
+    """GeminiClient.generate_content の合流"""
+
+    @pytest.mark.asyncio
+    async def test_duplicate_requests_cost_one_call(self):
+        client = GeminiClient()
+        response = MagicMock()
+        response.candidates = []
+        response.text = "整形済み"
+
+        async def slow_generate(**kwargs):
+            await asyncio.sleep(0.01)
+            return response
+
+        client.client = MagicMock()
+        client.client.aio.models.generate_content = AsyncMock(side_effect=slow_generate)
+        config = {"system": "sys", "params": {"temperature": 0.3}}
+
+        results = await asyncio.gather(
+            *[client.generate_content("同じ文", config, model="m") for _ in range(3)]
+        )
+        assert all(r["result"] == "整形済み" for r in results)
+        assert client.client.aio.models.generate_content.call_count == 1
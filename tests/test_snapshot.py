@@ -0,0 +1,120 @@
+"""
+キャッシュスナップショットテスト（書き出し・ストリーミング取り込み・衝突の解決）
+"""
+import gzip
+import io
+import json
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from src.core.cache import CacheManager
+from src.core.models import Base, CacheEntry
+from src.core.snapshot import SnapshotError, export_snapshot, import_snapshot, iter_snapshot
+
+
+def _session():
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(engine)
+    return sessionmaker(bind=engine)()
+
+
+@pytest.fixture
+def source():
+    db = _session()
+    mgr = CacheManager()
+    fingerprint = mgr.current_fingerprint()
+    mgr.store_results(db, "お疲れ様です", {30: "お疲れ様です。", 60: "お疲れさまでございます。"}, fingerprint)
+    mgr.store_result(db, "承知しました", 30, "承知いたしました。", fingerprint)
+    mgr.store_result(db, "旧構成", 30, "旧", "0.0#old")
+    yield db
+    db.close()
+
+
+def _snapshot(db, **kwargs) -> io.BytesIO:
+    return io.BytesIO(b"".join(iter_snapshot(db, **kwargs)))
+
+
+class TestSnapshot:
+    def test_round_trip(self, source):
+        target = _session()
+        stats = import_snapshot(target, CacheManager(), _snapshot(source))
+
+        assert stats["imported"] == 3
+        assert stats["stale"] == 1
+        assert stats["complete"] is True
+        mgr = CacheManager()
+        hit = mgr.check_cache(target, "お疲れ様です", 60, mgr.current_fingerprint())
+        assert hit["result"] == "お疲れさまでございます。"
+        target.close()
+
+    def test_header_and_footer(self, source, tmp_path):
+        path = tmp_path / "snap.jsonl.gz"
+        export_snapshot(source, path, fingerprint=CacheManager.current_fingerprint())
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            lines = [json.loads(line) for line in f]
+        assert lines[0]["format"] == "flow-cache-snapshot"
+        assert lines[0]["version"] == 1
+        assert lines[-1] == {"end": True, "count": 3}
+
+    def test_conflict_keeps_newer(self, source):
+        target = _session()
+        mgr = CacheManager()
+        mgr.store_result(target, "承知しました", 30, "手元の新しい結果", mgr.current_fingerprint())
+
+        stats = import_snapshot(target, CacheManager(), _snapshot(source))
+        assert stats["skipped"] == 1
+        row = target.query(CacheEntry).filter(CacheEntry.original_text == "承知しました").one()
+        assert row.result == "手元の新しい結果"
+
+        # 手元の方が古ければスナップショットで上書き
+        row.created_at = datetime.utcnow() - timedelta(days=1)
+        target.commit()
+        stats = import_snapshot(target, CacheManager(), _snapshot(source))
+        assert stats["updated"] == 1
+        target.refresh(row)
+        assert row.result == "承知いたしました。"
+        target.close()
+
+    def test_conflict_skip_and_all_fingerprints(self, source):
+        target = _session()
+        mgr = CacheManager()
+        mgr.store_result(target, "承知しました", 30, "古い", mgr.current_fingerprint())
+        row = target.query(CacheEntry).one()
+        row.created_at = datetime.utcnow() - timedelta(days=1)
+        target.commit()
+
+        stats = import_snapshot(target, mgr, _snapshot(source), on_conflict="skip", all_fingerprints=True)
+        assert stats["skipped"] == 1
+        assert stats["stale"] == 0
+        assert target.query(CacheEntry).count() == 4
+        target.close()
+
+    def test_rejects_non_snapshot(self):
+        with pytest.raises(SnapshotError):
+            import_snapshot(_session(), CacheManager(), io.BytesIO(b"plain text"))
+        bad = io.BytesIO(gzip.compress(b'{"format": "flow-cache-snapshot", "version": 99}\n'))
+        with pytest.raises(SnapshotError):
+            import_snapshot(_session(), CacheManager(), bad)
+
+    def test_truncated_snapshot_imports_prefix(self, source):
+        data = _snapshot(source, fingerprint=CacheManager.current_fingerprint()).getvalue()
+        # 全行を1チャンクで取り込ませないよう chunk_size=1 にして、末尾を切る
+        target = _session()
+        stats = import_snapshot(target, CacheManager(), io.BytesIO(data[:-20]), chunk_size=1)
+        assert stats["complete"] is False
+        assert stats["imported"] >= 1
+        target.close()
+
+    def test_non_object_lines_are_invalid(self, source):
+        lines = gzip.decompress(_snapshot(source).getvalue()).decode().splitlines()
+        # ヘッダの直後に JSON としては正しいがオブジェクトでない行を混ぜる
+        data = "\n".join([lines[0], "1", "[]", '"text"', *lines[1:]]) + "\n"
+        target = _session()
+        stats = import_snapshot(target, CacheManager(), io.BytesIO(gzip.compress(data.encode())))
+        assert stats["invalid"] == 3
+        assert stats["imported"] == 3
+        assert stats["complete"] is True
+        target.close()
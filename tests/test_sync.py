@@ -4,8 +4,9 @@ v5.0 Phase 4
 """
 import sys
 import os
+import asyncio
 import unittest
-from unittest.mock import Mock, patch
+from unittest.mock import Mock, AsyncMock, patch
 from datetime import datetime
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
@@ -104,6 +105,53 @@ class TestSyncManager(unittest.TestCase):
         self.assertEqual(job.status, "failed")
         self.assertEqual(job.retry_count, MAX_RETRY_COUNT)
 
+    def test_process_pending_runs_jobs_together(self):
+        """process_pending: 全ジョブを1回の process_many で処理すること"""
+        self.mgr.enqueue(self.db, "first", 30)
+        self.mgr.enqueue(self.db, "second", 30)
+
+        mock_processor = Mock()
+        mock_processor.process_many = AsyncMock(return_value=[
+            {"success": True, "result": "ok"},
+            {"success": False, "error": "API error"},
+        ])
+
+        stats = asyncio.run(self.mgr.process_pending(self.db, mock_processor))
+
+        mock_processor.process_many.assert_awaited_once()
+        self.assertEqual(stats, {"processed": 1, "failed": 1, "total": 2})
+
+    def test_process_pending_runs_on_callers_loop(self):
+        """process_pending: 実行中のイベントループ内 (APIルート) から呼んでも動くこと"""
+        from src.core.processor import CoreProcessor
+
+        self.mgr.enqueue(self.db, "first", 30)
+        self.mgr.enqueue(self.db, "second", 30)
+
+        processor = CoreProcessor.__new__(CoreProcessor)
+        processor.process = AsyncMock(side_effect=[{"result": "ok"}, {"error": "api_error", "message": "down"}])
+
+        async def route():
+            return await self.mgr.process_pending(self.db, processor)
+
+        stats = asyncio.run(route())
+
+        self.assertEqual(stats, {"processed": 1, "failed": 1, "total": 2})
+
+    def test_process_pending_cancelled_returns_jobs_to_pending(self):
+        """process_pending: 処理中にキャンセルされたら、ジョブを pending に戻してから伝えること"""
+        self.mgr.enqueue(self.db, "first", 30)
+        self.mgr.enqueue(self.db, "second", 30)
+
+        mock_processor = Mock()
+        mock_processor.process_many = AsyncMock(side_effect=asyncio.CancelledError())
+
+        with self.assertRaises(asyncio.CancelledError):
+            asyncio.run(self.mgr.process_pending(self.db, mock_processor))
+
+        self.assertEqual(len(self.mgr.get_pending_jobs(self.db)), 2)
+        self.assertTrue(all(job.retry_count == 0 for job in self.db.query(SyncJob).all()))
+
     def test_get_result(self):
         """get_result: ジョブIDから結果を取得できること"""
         job_id = self.mgr.enqueue(self.db, "result text", 30)
@@ -1,11 +1,18 @@
 """
 VocabularyStore テスト
 """
+import csv
+import io
+import json
 import pytest
+import random
+import sqlite3
 import tempfile
 import os
 from pathlib import Path
-from src.core.vocab_store import VocabularyStore
+from src.core.aho_corasick import AhoCorasick
+from src.core.vocab_index import CompiledIndex, compile_index, open_index
+from src.core.vocab_store import VocabFormatError, VocabularyStore
 
 
 class TestVocabularyStore:
@@ -16,6 +23,7 @@ class TestVocabularyStore:
         """テスト用の一時DBを使用"""
         db_path = tmp_path / "test_vocab.db"
         store = VocabularyStore(db_path=db_path)
+        store.publish_delay = 0  # コンパイル済みファイルを同期で書き直す
         yield store
         # 明示的クリーンアップ不要（tmp_pathがpytestで管理）
     
@@ -67,3 +75,276 @@ class TestVocabularyStore:
         assert store.count() == 0
         assert store.list_all() == []
         assert store.find_in_text("テスト") == []
+
+    def test_find_in_text_longest_match(self, store):
+        """重なる語彙は長い方だけ・出現順"""
+        store.add_term("プロジェクト", "custom")
+        store.add_term("プロジェクトX", "project")
+        store.add_term("山田", "person")
+
+        found = store.find_in_text("山田さんとプロジェクトXとプロジェクトの件")
+        assert found == ["山田", "プロジェクトX", "プロジェクト"]
+
+    def test_automaton_follows_add_and_remove(self, store):
+        """検出後の追加・削除がオートマトンに反映される"""
+        store.add_term("極秘計画", "secret")
+        assert store.find_in_text("極秘計画と新計画") == ["極秘計画"]
+
+        store.add_term("新計画", "secret")
+        store.remove_term("極秘計画")
+        assert store.find_in_text("極秘計画と新計画") == ["新計画"]
+        assert store.find_spans("極秘計画と新計画") == [(5, 8, "新計画")]
+
+
+    def test_bulk_add_and_remove(self, store):
+        """一括追加・削除 (登録済み・重複・空の語は数えない)"""
+        store.add_term("既存", "custom")
+        added = store.add_terms(["既存", "新規A", ("新規B", "person"), "新規A", ""], category="project")
+        assert added == 2
+        assert store.count() == 3
+        assert {v["term"]: v["category"] for v in store.list_all()}["新規B"] == "person"
+        assert store.find_in_text("新規Aと新規B") == ["新規A", "新規B"]
+
+        assert store.remove_terms(["新規A", "未登録"]) == 1
+        assert store.count() == 2
+        assert store.find_in_text("新規Aと新規B") == ["新規B"]
+        assert store.search("新規B")
+
+    def test_csv_round_trip(self, store, tmp_path):
+        """CSV のインポート・エクスポート"""
+        source = io.StringIO("term,category\nプロジェクトX,project\n山田部長\n\n,orphan\nプロジェクトX,project\n")
+        stats = store.import_terms(source, "csv", category="custom", chunk_size=2)
+        assert stats == {"added": 2, "skipped": 1, "invalid": 1}
+
+        exported = "".join(store.iter_export("csv", chunk_size=1))
+        rows = list(csv.DictReader(io.StringIO(exported)))
+        assert [(r["term"], r["category"]) for r in rows] == [("プロジェクトX", "project"), ("山田部長", "custom")]
+
+        other = VocabularyStore(db_path=tmp_path / "other.db")
+        assert other.import_terms(io.StringIO(exported), "csv")["added"] == 2
+
+    def test_jsonl_round_trip(self, store, tmp_path):
+        """JSON Lines のインポート・エクスポート"""
+        source = io.StringIO('{"term": "極秘計画", "category": "secret"}\n"新計画"\nnot json\n{"term": 1}\n')
+        stats = store.import_terms(source, "jsonl")
+        assert stats == {"added": 2, "skipped": 0, "invalid": 2}
+
+        lines = [json.loads(line) for line in "".join(store.iter_export("jsonl")).splitlines()]
+        assert [(r["term"], r["category"]) for r in lines] == [("極秘計画", "secret"), ("新計画", "custom")]
+
+    def test_unknown_format(self, store):
+        with pytest.raises(VocabFormatError):
+            store.import_terms(io.StringIO(""), "xml")
+        with pytest.raises(VocabFormatError):
+            list(store.iter_export("xml"))
+
+    def test_thread_safe_adds(self, store):
+        """複数スレッドから同じ接続で書いても取りこぼさない"""
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            list(pool.map(lambda i: store.add_terms([f"語{i}-{j}" for j in range(50)]), range(8)))
+        assert store.count() == 400
+
+
+    def test_substring_search_japanese(self, store):
+        """trigram 索引: 日本語の語の途中からでも引ける"""
+        store.add_terms(["プロジェクトX", "新プロジェクトX計画", "営業部門"])
+        assert [r["term"] for r in store.search("ジェクトX")] == ["プロジェクトX", "新プロジェクトX計画"]
+        assert store.search("存在しない語") == []
+        # 3文字未満は LIKE で走査 (短い語から)
+        assert [r["term"] for r in store.search("部")] == ["営業部門"]
+        assert [r["term"] for r in store.search("X")] == ["プロジェクトX", "新プロジェクトX計画"]
+
+    def test_search_keyset_pagination(self, store):
+        """next_cursor を辿ると重複・取りこぼしなく全件に届く"""
+        store.add_terms([f"案件{i:03d}号" for i in range(25)])
+        for query in ("案件", "件0", "件01"):
+            seen = []
+            cursor = None
+            while True:
+                page = store.search_page(query, limit=10, cursor=cursor)
+                seen.extend(r["term"] for r in page["items"])
+                cursor = page["next_cursor"]
+                if cursor is None:
+                    break
+            expected = [f"案件{i:03d}号" for i in range(25) if query in f"案件{i:03d}号"]
+            assert sorted(seen) == expected
+            assert len(seen) == len(set(seen))
+
+    def test_search_rejects_bad_cursor(self, store):
+        with pytest.raises(ValueError):
+            store.search_page("案件", cursor="garbage")
+
+    def test_migrates_v1_schema(self, tmp_path):
+        """旧スキーマ (unicode61 の FTS・term 主キー) から移行する"""
+        db_path = tmp_path / "legacy.db"
+        conn = sqlite3.connect(db_path)
+        conn.execute("CREATE VIRTUAL TABLE vocab USING fts5(term, category, tokenize='unicode61')")
+        conn.execute("""
+            CREATE TABLE vocab_meta (
+                term TEXT PRIMARY KEY,
+                category TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        for term, category in (("プロジェクトX", "project"), ("山田部長", "person")):
+            conn.execute("INSERT INTO vocab(term, category) VALUES (?, ?)", (term, category))
+            conn.execute("INSERT INTO vocab_meta(term, category) VALUES (?, ?)", (term, category))
+        conn.commit()
+        conn.close()
+
+        store = VocabularyStore(db_path=db_path)
+        assert store.count() == 2
+        assert [r["term"] for r in store.search("ロジェク")] == ["プロジェクトX"]
+        assert store.find_in_text("山田部長とプロジェクトX") == ["山田部長", "プロジェクトX"]
+        store.remove_term("プロジェクトX")
+        assert store.search("ロジェク") == []
+        store.close()
+        # 2回目の起動では何もしない
+        assert VocabularyStore(db_path=db_path).count() == 1
+
+
+    def test_sees_writes_from_other_store(self, store, tmp_path):
+        """別インスタンス (別プロセス相当) の追加・削除も次の検出に反映される"""
+        store.index_enabled = False
+        store.add_term("既存語", "custom")
+        assert store.find_in_text("秘密Zと既存語") == ["既存語"]
+
+        other = VocabularyStore(db_path=store.db_path)
+        other.index_enabled = False
+        other.add_term("秘密Z", "secret")
+        assert store.find_in_text("秘密Zと既存語") == ["秘密Z", "既存語"]
+        other.remove_term("既存語")
+        assert store.find_in_text("秘密Zと既存語") == ["秘密Z"]
+
+
+class TestAhoCorasick:
+    """Aho-Corasick オートマトンのテスト"""
+
+    def test_leftmost_longest(self):
+        ac = AhoCorasick(["he", "she", "hers", "his"])
+        assert ac.find_spans("ushers") == [(1, 4, "she")]
+        assert ac.find_spans("hershis") == [(0, 4, "hers"), (4, 7, "his")]
+
+    def test_matches_brute_force(self):
+        rng = random.Random(0)
+        terms = {"".join(rng.choice("abc") for _ in range(rng.randint(1, 4))) for _ in range(30)}
+        ac = AhoCorasick(terms)
+        for _ in range(200):
+            text = "".join(rng.choice("abcd") for _ in range(rng.randint(0, 30)))
+            expected = []
+            pos = 0
+            while pos < len(text):
+                hits = [t for t in terms if text.startswith(t, pos)]
+                if hits:
+                    term = max(hits, key=len)
+                    expected.append((pos, pos + len(term), term))
+                    pos += len(term)
+                else:
+                    pos += 1
+            assert ac.find_spans(text) == expected
+
+    def test_remove_keeps_other_terms(self):
+        ac = AhoCorasick(["abc", "bc", "c"])
+        assert ac.remove("bc")
+        assert not ac.remove("bc")
+        assert ac.find_spans("xbc") == [(2, 3, "c")]
+        assert ac.add("bc")
+        assert ac.find_spans("xbc") == [(1, 3, "bc")]
+        assert len(ac) == 3
+
+
+class TestCompiledIndex:
+    """コンパイル済み (mmap) オートマトンのテスト"""
+
+    def test_matches_automaton(self, tmp_path):
+        rng = random.Random(1)
+        terms = {"".join(rng.choice("abcあい") for _ in range(rng.randint(1, 5))) for _ in range(50)}
+        ac = AhoCorasick(terms)
+        path = tmp_path / "vocab.acidx"
+        compile_index(ac, path, revision=7)
+
+        index = CompiledIndex(path)
+        assert index.revision == 7
+        assert len(index) == len(terms)
+        for _ in range(200):
+            text = "".join(rng.choice("abcdあいう") for _ in range(rng.randint(0, 40)))
+            assert index.find_spans(text) == ac.find_spans(text)
+
+    def test_rejects_broken_file(self, tmp_path):
+        path = tmp_path / "vocab.acidx"
+        path.write_bytes(b"not an index" * 10)
+        assert open_index(path) is None
+        assert open_index(tmp_path / "missing.acidx") is None
+
+    def test_fresh_store_change_reaches_other_store(self, tmp_path):
+        """検出前のストアが追加した語も、別のストアで見つかり、ファイルにも書き出される"""
+        db_path = tmp_path / "vocab.db"
+        reader = VocabularyStore(db_path=db_path)
+        assert reader.find_in_text("秘密Zの件") == []
+
+        writer = VocabularyStore(db_path=db_path)
+        writer.publish_delay = 0
+        writer.add_term("秘密Z", "secret")
+        assert open_index(db_path.with_suffix(".acidx")).revision == 1
+        assert reader.find_in_text("秘密Zの件") == ["秘密Z"]
+        assert isinstance(reader._matcher, CompiledIndex)
+
+    def test_publish_failure_falls_back_to_db(self, tmp_path, monkeypatch):
+        """ファイルを置き換えられなくても (Windows の mmap 中など) 別のストアは DB から検出する"""
+        db_path = tmp_path / "vocab.db"
+        reader = VocabularyStore(db_path=db_path)
+        reader.find_in_text("")
+
+        def fail(*args, **kwargs):
+            raise PermissionError("file is mapped")
+        monkeypatch.setattr("src.core.vocab_store.compile_index", fail)
+        writer = VocabularyStore(db_path=db_path)
+        writer.publish_delay = 0
+        writer.add_term("秘密Z", "secret")
+        assert reader.find_in_text("秘密Zの件") == ["秘密Z"]
+
+    def test_close_cancels_pending_publish(self, tmp_path):
+        """閉じた後に遅延書き出しが走らない (閉じた接続に触れない) こと"""
+        db_path = tmp_path / "vocab.db"
+        store = VocabularyStore(db_path=db_path)
+        store.find_in_text("")
+        store.publish_delay = 60
+        store.add_term("秘密Z", "secret")
+        timer = store._publish_timer
+        assert timer is not None
+
+        store.close()
+        assert store._publish_timer is None
+        assert timer.finished.is_set()
+        assert store.publish_index() is False
+
+    def test_workers_share_and_hot_swap(self, tmp_path):
+        """別プロセス相当の2つのストア: 片方の変更がファイル経由でもう片方に届く"""
+        db_path = tmp_path / "vocab.db"
+        writer = VocabularyStore(db_path=db_path)
+        writer.publish_delay = 0
+        writer.add_term("プロジェクトX", "project")
+        assert writer.find_in_text("プロジェクトXの件") == ["プロジェクトX"]
+
+        reader = VocabularyStore(db_path=db_path)
+        assert reader.find_in_text("プロジェクトXの件") == ["プロジェクトX"]
+        assert isinstance(reader._matcher, CompiledIndex)
+
+        writer.add_term("山田部長", "person")
+        assert reader.find_in_text("山田部長とプロジェクトX") == ["山田部長", "プロジェクトX"]
+        assert reader._revision == writer._revision
+
+    def test_stale_index_is_rebuilt(self, tmp_path):
+        db_path = tmp_path / "vocab.db"
+        store = VocabularyStore(db_path=db_path)
+        store.add_term("旧語彙", "custom")
+        store.find_in_text("")
+        store.publish_index()
+        # ファイルを作った後に別経路で語彙が変わった (リビジョンが食い違う)
+        other = VocabularyStore(db_path=db_path)
+        other.add_term("新語彙", "custom")
+
+        fresh = VocabularyStore(db_path=db_path)
+        assert fresh.find_in_text("旧語彙と新語彙") == ["旧語彙", "新語彙"]
+        assert open_index(db_path.with_suffix(".acidx")).revision == 2
@@ -0,0 +1,141 @@
+"""
+WarmupEngine テスト（並列・一括存在確認・チェックポイント）
+"""
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from src.core.cache import CacheManager
+from src.core.models import Base, CacheEntry
+from src.core.warmup import Checkpoint, WarmupEngine
+
+ALL_LEVELS = {"success": True, "results": {30: "L", 60: "M", 100: "R"}}
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def privacy():
+    privacy = MagicMock()
+    privacy.mask.side_effect = lambda t: (t, {})
+    return privacy
+
+
+def _client(delay: float = 0.0, state: dict = None):
+    client = MagicMock()
+
+    async def multi_level(text, config):
+        if state is not None:
+            state["active"] += 1
+            state["peak"] = max(state["peak"], state["active"])
+        await asyncio.sleep(delay)
+        if state is not None:
+            state["active"] -= 1
+        return ALL_LEVELS
+
+    client.generate_multi_level = AsyncMock(side_effect=multi_level)
+    client.generate_content = AsyncMock(return_value={"success": True, "result": "single"})
+    return client
+
+
+class TestWarmupEngine:
+    def test_workers_run_in_parallel(self, db, privacy):
+        state = {"active": 0, "peak": 0}
+        engine = WarmupEngine(CacheManager(), _client(0.01, state), privacy, workers=4)
+
+        stats = asyncio.run(engine.run(db, [f"定型文{i}" for i in range(8)]))
+
+        assert stats["processed"] == 8
+        assert state["peak"] == 4
+        assert db.query(CacheEntry.hash_id).distinct().count() == 8
+        assert stats["items_per_sec"] > 0
+
+    def test_skips_fully_cached_with_bulk_query(self, db, privacy):
+        mgr = CacheManager()
+        mgr.store_results(db, "既存", {30: "a", 60: "b", 100: "c"}, mgr.current_fingerprint())
+        client = _client()
+
+        stats = asyncio.run(WarmupEngine(mgr, client, privacy).run(db, ["既存", "新規", "新規", " "]))
+
+        assert stats["skipped"] == 1
+        assert stats["processed"] == 1
+        assert client.generate_multi_level.call_count == 1
+
+    def test_resumes_from_checkpoint(self, db, privacy, tmp_path):
+        path = tmp_path / "warmup.txt"
+        mgr = CacheManager()
+        Checkpoint(path, mgr.current_fingerprint()).mark(mgr.get_text_hash("済み"))
+        client = _client()
+
+        stats = asyncio.run(
+            WarmupEngine(mgr, client, privacy, checkpoint_path=path).run(db, ["済み", "未処理"])
+        )
+
+        assert stats["resumed"] == 1
+        assert stats["processed"] == 1
+        # 全件成功したらチェックポイントは消える
+        assert not path.exists()
+
+    def test_checkpoint_kept_on_errors(self, db, privacy, tmp_path):
+        path = tmp_path / "warmup.txt"
+        client = _client()
+        client.generate_multi_level = AsyncMock(return_value={"success": False, "error": "down"})
+        client.generate_content = AsyncMock(side_effect=[
+            {"success": True, "result": "a"}, {"success": True, "result": "b"}, {"success": True, "result": "c"},
+            {"success": False, "error": "down"}, {"success": False, "error": "down"}, {"success": False, "error": "down"},
+        ])
+
+        stats = asyncio.run(
+            WarmupEngine(CacheManager(), client, privacy, workers=1, checkpoint_path=path).run(db, ["一", "二"])
+        )
+
+        assert stats["errors"] == 3
+        assert Checkpoint(path, CacheManager.current_fingerprint()).load() == {CacheManager.get_text_hash("一")}
+
+    def test_checkpoint_from_other_fingerprint_is_discarded(self, db, privacy, tmp_path):
+        path = tmp_path / "warmup.txt"
+        mgr = CacheManager()
+        Checkpoint(path, "0.0#old").mark(mgr.get_text_hash("済み"))
+        client = _client()
+
+        stats = asyncio.run(
+            WarmupEngine(mgr, client, privacy, checkpoint_path=path).run(db, ["済み", "未処理"])
+        )
+
+        assert stats["resumed"] == 0
+        assert stats["processed"] == 2
+
+    def test_force_ignores_checkpoint(self, db, privacy, tmp_path):
+        path = tmp_path / "warmup.txt"
+        mgr = CacheManager()
+        Checkpoint(path, mgr.current_fingerprint()).mark(mgr.get_text_hash("済み"))
+        client = _client()
+
+        stats = asyncio.run(
+            WarmupEngine(mgr, client, privacy, checkpoint_path=path).run(db, ["済み"], force=True)
+        )
+
+        assert stats["resumed"] == 0
+        assert stats["processed"] == 1
+
+    def test_failed_store_stays_out_of_checkpoint(self, db, privacy, tmp_path):
+        path = tmp_path / "warmup.txt"
+        mgr = CacheManager()
+        mgr.store_results = MagicMock(return_value=False)
+
+        stats = asyncio.run(
+            WarmupEngine(mgr, _client(), privacy, workers=1, checkpoint_path=path).run(db, ["一"])
+        )
+
+        assert stats["processed"] == 0
+        assert stats["errors"] == 3
+        assert Checkpoint(path, mgr.current_fingerprint()).load() == set()
@@ -0,0 +1,98 @@
+"""
+Cache Snapshot Tool
+
+キャッシュを gzip のスナップショットに書き出し、別の端末で取り込む。
+PC で Warmup した結果を Termux のスマホに配れば、スマホ側では API を呼ばずに温まる。
+
+Usage:
+    python tools/cache_snapshot.py export --out data/cache_snapshot.jsonl.gz
+    python tools/cache_snapshot.py import data/cache_snapshot.jsonl.gz --on-conflict newer
+"""
+import sys
+import os
+import argparse
+from pathlib import Path
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+try:
+    from dotenv import load_dotenv
+    load_dotenv()  # Load .env explicitly
+except ImportError:
+    pass
+
+from src.core.cache import CacheManager
+from src.core.snapshot import CONFLICT_NEWER, CONFLICT_POLICIES, SnapshotError, export_snapshot, import_snapshot
+from src.infra.database import SessionLocal, init_db
+
+# Fix Windows Unicode Output
+if sys.platform == "win32":
+    sys.stdout.reconfigure(encoding='utf-8')
+
+
+def cmd_export(args) -> int:
+    fingerprint = None if args.all_fingerprints else CacheManager.current_fingerprint()
+    out = Path(args.out)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    db = SessionLocal()
+    try:
+        size = export_snapshot(db, out, fingerprint=fingerprint)
+    finally:
+        db.close()
+    print(f"✅ Exported to {out} ({size / 1024:.1f} KiB)")
+    return 0
+
+
+def cmd_import(args) -> int:
+    path = Path(args.file)
+    if not path.exists():
+        print(f"❌ Error: File not found: {path}")
+        return 1
+    db = SessionLocal()
+    try:
+        with open(path, "rb") as f:
+            stats = import_snapshot(
+                db, CacheManager(), f,
+                on_conflict=args.on_conflict, all_fingerprints=args.all_fingerprints,
+            )
+    except SnapshotError as e:
+        print(f"❌ Error: {e}")
+        return 1
+    finally:
+        db.close()
+
+    print("✅ Import Completed!")
+    print(f"   Imported: {stats['imported']}")
+    print(f"   Updated:  {stats['updated']}")
+    print(f"   Kept:     {stats['skipped']}")
+    print(f"   Stale:    {stats['stale']} (other prompt/model fingerprint)")
+    print(f"   Invalid:  {stats['invalid']}")
+    if not stats["complete"]:
+        print("⚠️ Snapshot was truncated: only the rows before the cut were imported.")
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Cache Snapshot Export/Import Tool")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_export = sub.add_parser("export", help="キャッシュをスナップショットに書き出す")
+    p_export.add_argument("--out", default="data/cache_snapshot.jsonl.gz", help="出力ファイル")
+    p_export.add_argument("--all-fingerprints", action="store_true", help="旧プロンプト/モデル構成の行も含める")
+    p_export.set_defaults(func=cmd_export)
+
+    p_import = sub.add_parser("import", help="スナップショットを取り込む")
+    p_import.add_argument("file", help="スナップショットファイル (.jsonl.gz)")
+    p_import.add_argument("--on-conflict", choices=CONFLICT_POLICIES, default=CONFLICT_NEWER,
+                          help="同じキーがあるとき: newer=作成時刻が新しい方 / skip=手元を残す / overwrite=上書き")
+    p_import.add_argument("--all-fingerprints", action="store_true", help="手元と違う構成指紋の行も取り込む")
+    p_import.set_defaults(func=cmd_import)
+
+    args = parser.parse_args()
+    init_db()
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,6 +2,7 @@ import sys
 import os
 import asyncio
 import argparse
+import time
 from pathlib import Path
 from datetime import datetime
 
@@ -28,6 +29,9 @@ async def main():
     parser = argparse.ArgumentParser(description="Prefetch Cache Warmup Tool")
     parser.add_argument("--force", action="store_true", help="既存キャッシュを再生成する")
     parser.add_argument("--file", default="docs/prefetch_templates.md", help="テンプレートファイルのパス")
+    parser.add_argument("--workers", type=int, default=settings.WARMUP_WORKERS, help="同時に処理する定型文の数")
+    parser.add_argument("--checkpoint", default="data/warmup_checkpoint.txt", help="再開用チェックポイントファイル")
+    parser.add_argument("--restart", action="store_true", help="チェックポイントを捨てて最初からやり直す")
     args = parser.parse_args()
 
     # Check File
@@ -75,16 +79,28 @@ async def main():
         print("Please set GEMINI_API_KEY in .env or environment variables.")
         sys.exit(1)
 
+    # Checkpoint
+    checkpoint_path = Path(args.checkpoint)
+    if (args.restart or args.force) and checkpoint_path.exists():
+        checkpoint_path.unlink()
+        print("🧹 Checkpoint cleared.")
+    elif checkpoint_path.exists():
+        print(f"⏯️ Resuming from checkpoint: {checkpoint_path}")
+
     # Progress Callback
+    started = time.monotonic()
+
     def progress_callback(current, total, text):
         bar_len = 20
         filled = int(bar_len * current / total)
         bar = "█" * filled + "-" * (bar_len - filled)
+        rate = current / max(time.monotonic() - started, 1e-6)
+        eta = (total - current) / rate if rate > 0 else 0
         # Clear line to avoid spamming
-        print(f"\r[{bar}] {current}/{total} : {text[:30]:<30}", end="", flush=True)
+        print(f"\r[{bar}] {current}/{total} {rate:.2f} items/s ETA {eta:.0f}s : {text[:30]:<30}", end="", flush=True)
 
     # Execute Warmup
-    print("\n🚀 Starting Warmup... (This may take a while)")
+    print(f"\n🚀 Starting Warmup with {args.workers} workers... (This may take a while)")
     print("   Press Ctrl+C to abort.")
     
     db_gen = get_db()
@@ -97,16 +113,20 @@ async def main():
             client=processor.gemini_client,
             privacy=processor.privacy_handler,
             callback=progress_callback,
-            force=args.force
+            force=args.force,
+            workers=args.workers,
+            checkpoint_path=checkpoint_path,
         )
         print("\n\n✅ Warmup Completed!")
         print(f"   Total:     {stats['total']}")
         print(f"   Processed: {stats['processed']}")
         print(f"   Skipped:   {stats['skipped']}")
         print(f"   Errors:    {stats['errors']}")
+        print(f"   Resumed:   {stats['resumed']}")
+        print(f"   Rate:      {stats['items_per_sec']} items/s")
         
-    except KeyboardInterrupt:
-        print("\n\n⚠️ Aborted by user.")
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        print("\n\n⚠️ Aborted by user. Re-run to resume from the checkpoint.")
     except Exception as e:
         with open("warmup_error.txt", "a", encoding="utf-8") as f:
             f.write(f"\n[{datetime.utcnow()}] Unexpected Error: {e}\n")